@@ -1,11 +1,18 @@
 import argparse
+import cProfile
+import multiprocessing
 import os
 import sys
 import time
 from pathlib import Path
 
 from checks import *
-from utils import utils
+from utils import perf, project_index, utils, xml_cache
+from utils.check_scheduler import CheckScheduler
+from utils.discontinuation_db import get_discontinuation_db
+from utils.project_index import ProjectIndex
+from utils.scan_cache import ScanResultCache, default_cache_file
+from utils.scan_engine import EXECUTORS, ScanEngine
 
 
 def parse_args():
@@ -42,6 +49,37 @@ def parse_args():
         type=str,
         help="Custom output file path. If not provided, defaults to 'as4_to_as6_analyzer_result.txt' in the project folder.",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Rescan all files instead of reusing the results of unchanged files from the previous run.",
+    )
+    parser.add_argument(
+        "--executor",
+        choices=EXECUTORS,
+        default="threads",
+        help="How files are scanned: in a thread pool (default), a process pool or serially.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Number of parallel workers for scanning files. Defaults to the number of CPUs.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Adds a performance section with time, files, bytes read and parse counts per check.",
+    )
+    parser.add_argument(
+        "--profile-output",
+        type=str,
+        metavar="FILE",
+        help="Implies --profile and writes cProfile statistics to FILE. Scans and checks then run serially.",
+    )
+    project_index.add_arguments(parser)
+    xml_cache.add_arguments(parser)
     # Parse the arguments
 
     # Fallback if no arguments are provided (e.g. when run from GUI)
@@ -90,6 +128,7 @@ def main():
     utils.log(f"Script version: {build_version}")
 
     args = parse_args()
+    xml_cache.configure(args)
     apj_file = utils.get_and_check_project_file(args.project_path)
 
     utils.log(f"Project path validated: {args.project_path}")
@@ -112,6 +151,14 @@ def main():
         )
         start_time = time.time()
 
+        profile = args.profile or bool(args.profile_output)
+        perf.profiler.reset(enabled=profile)
+        # cProfile only sees the calling thread, so everything runs in it
+        serial = bool(args.profile_output)
+        profiler = cProfile.Profile() if serial else None
+        if profiler:
+            profiler.enable()
+
         # Validate naming and basic structure
         check_project_path_and_name(args.project_path, apj_file, log, args.verbose)
 
@@ -121,42 +168,131 @@ def main():
         logical_path = project_path / "Logical"
         physical_path = project_path / "Physical"
 
+        # Walk the project tree once; all checks look files up in this index
+        with perf.profiler.measure("index"):
+            excludes = project_index.ExcludeRules.for_project(
+                project_path, args.exclude
+            )
+            index = ProjectIndex(project_path, excludes)
+
+        # Evaluate the per-file rules of all checks in one pass over the files,
+        # reusing the results of files that did not change since the last run
+        cache = None
+        if not args.no_cache:
+            cache = ScanResultCache(
+                default_cache_file(project_path),
+                project_path,
+                get_discontinuation_db().version,
+            )
+        engine = ScanEngine(
+            index,
+            cache=cache,
+            executor="serial" if serial else args.executor,
+            jobs=args.jobs,
+        )
+        register_file_compatibility_rules(engine, project_path)
+        register_hardware_rules(engine, physical_path)
+        register_file_device_rules(engine, physical_path)
+        register_library_rules(engine, logical_path)
+        register_function_rules(engine, logical_path)
+        register_access_security_rules(engine, physical_path)
+        register_visual_components_rules(engine, logical_path)
+        with perf.profiler.measure("scan"):
+            scan_results = engine.run()
+
+        # The checks only read the project, so they run side by side; their
+        # output is written in report order once each section is complete
+        verbose = args.verbose
+        scheduler = CheckScheduler(log, max_workers=1 if serial else args.jobs)
+
         # Generic file compatibility checks
-        check_files_for_compatibility(project_path, log, args.verbose)
+        scheduler.add(
+            "file-compat",
+            lambda log: check_files_for_compatibility(
+                project_path, log, verbose, index=index, scan_results=scan_results
+            ),
+        )
 
         # Hardware & configuration checks
-        check_ar(physical_path, log, args.verbose)
-        check_uad_files(physical_path, log, args.verbose)
-        check_hardware(physical_path, log, args.verbose)
-        check_file_devices(physical_path, log, args.verbose)
+        scheduler.add(
+            "ar", lambda log: check_ar(physical_path, log, verbose, index=index)
+        )
+        scheduler.add(
+            "opcua",
+            lambda log: check_uad_files(physical_path, log, verbose, index=index),
+        )
+        scheduler.add(
+            "hardware",
+            lambda log: check_hardware(
+                physical_path, log, verbose, index=index, scan_results=scan_results
+            ),
+        )
+        scheduler.add(
+            "file-devices",
+            lambda log: check_file_devices(
+                physical_path, log, verbose, index=index, scan_results=scan_results
+            ),
+        )
 
         # Software/libraries/function checks
-        check_libraries(logical_path, log, args.verbose)
-        check_functions(logical_path, log, args.verbose)
+        scheduler.add(
+            "libraries",
+            lambda log: check_libraries(
+                logical_path, log, verbose, index=index, scan_results=scan_results
+            ),
+        )
+        scheduler.add(
+            "functions",
+            lambda log: check_functions(
+                logical_path, log, verbose, index=index, scan_results=scan_results
+            ),
+        )
 
         # Access & Security (UserRoleSystem + ANSL in .hw)
-        check_access_security(physical_path, log, args.verbose)
+        scheduler.add(
+            "access-security",
+            lambda log: check_access_security(
+                physical_path, log, verbose, index=index, scan_results=scan_results
+            ),
+        )
 
         # Special-domain checks
-        check_safety(apj_path, log, args.verbose)  # Safety system issues
-        check_vision_settings(apj_path, log, args.verbose)  # mappVision issues
-        check_mapp_view(apj_path, log, args.verbose)  # mappView issues
-        check_widget_lib_usage(
-            logical_path, log, args.verbose
+        scheduler.add(
+            "safety", lambda log: check_safety(apj_path, log, verbose, index=index)
+        )  # Safety system issues
+        scheduler.add(
+            "mapp-vision",
+            lambda log: check_vision_settings(apj_path, log, verbose, index=index),
+        )  # mappVision issues
+        scheduler.add(
+            "mapp-view",
+            lambda log: check_mapp_view(apj_path, log, verbose, index=index),
+        )  # mappView issues
+        scheduler.add(
+            "mapp-wdk",
+            lambda log: check_widget_lib_usage(logical_path, log, verbose, index=index),
         )  # Detect widget libraries (WDK usage or User Widget Libraries from AS4)
-        check_mapp_version(
-            apj_path, log, args.verbose
+        scheduler.add(
+            "mapp-services",
+            lambda log: check_mapp_version(apj_path, log, verbose, index=index),
         )  # mappService/mapp version issues
-        check_mapp_control(
-            apj_path, log, args.verbose
+        scheduler.add(
+            "mapp-control",
+            lambda log: check_mapp_control(apj_path, log, verbose, index=index),
         )  # MT* libraries requiring mappControl upgrade
-        check_scene_viewer(
-            apj_path, log, args.verbose
+        scheduler.add(
+            "scene-viewer",
+            lambda log: check_scene_viewer(apj_path, log, verbose, index=index),
         )  # Scene Viewer usage & requirements
-        check_visual_components(
-            apj_path, log, args.verbose
+        scheduler.add(
+            "visual-components",
+            lambda log: check_visual_components(
+                apj_path, log, verbose, index=index, scan_results=scan_results
+            ),
         )  # Visual Components VC4/VC3 issues
 
+        scheduler.run()
+
         # Finish up
 
         log(utils.section_header("summary", "Migration Summary"))
@@ -168,6 +304,16 @@ def main():
             severity="INFO",
         )
 
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.profile_output)
+
+        if profile:
+            log(utils.section_header("performance", "Performance"))
+            log(perf.profiler.report())
+            if args.profile_output:
+                log(f"cProfile statistics written to {args.profile_output}")
+
         end_time = time.time()
         log("─" * 80)
         log(f"Scanning completed successfully in {end_time - start_time:.2f} seconds.")
@@ -201,4 +347,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Required for the process pool in frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
     main()
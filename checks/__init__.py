@@ -1,11 +1,14 @@
-from .access_security import check_access_security
+from .access_security import check_access_security, register_access_security_rules
 from .automation_runtime import check_ar
 from .common import check_project_path_and_name
-from .deprecated_functions import check_functions
-from .file_compatibility import check_files_for_compatibility
-from .file_device_check import check_file_devices
-from .hardware_check import check_hardware
-from .library_check import check_libraries
+from .deprecated_functions import check_functions, register_function_rules
+from .file_compatibility import (
+    check_files_for_compatibility,
+    register_file_compatibility_rules,
+)
+from .file_device_check import check_file_devices, register_file_device_rules
+from .hardware_check import check_hardware, register_hardware_rules
+from .library_check import check_libraries, register_library_rules
 from .mapp_control import check_mapp_control
 from .mapp_services import check_mapp_version
 from .mapp_view import check_mapp_view
@@ -14,4 +17,7 @@ from .mapp_vision import check_vision_settings
 from .opc_ua import check_uad_files
 from .safety_check import check_safety
 from .scene_viewer import check_scene_viewer
-from .visual_components_check import check_visual_components
+from .visual_components_check import (
+    check_visual_components,
+    register_visual_components_rules,
+)
@@ -1,21 +1,19 @@
 # checks/access_security.py
-import re
 from pathlib import Path
 
 from utils import utils
+from utils.hardware_model import load_hardware
+from utils.project_index import ProjectIndex
+from utils.scan_engine import ScanEngine
 
 
-def process_ansl_authentication(file_path: Path) -> list:
+def process_ansl_authentication(file_path: Path, content: str | None) -> list:
     """Return [("AnslAuthentication", file_path)] if Value=\"1\" is present, else []."""
-    content = utils.read_file(file_path)
-    pat = re.compile(
-        r'ID\s*=\s*["\']AnslAuthentication["\']\s+[^>]*Value\s*=\s*["\']1["\']',
-        re.IGNORECASE,
-    )
-    return [("AnslAuthentication", file_path)] if pat.search(content) else []
+    values = load_hardware(file_path).parameter_values("AnslAuthentication")
+    return [("AnslAuthentication", file_path)] if "1" in values else []
 
 
-def _find_user_role_system_dirs_deep(physical_path: Path) -> dict:
+def _find_user_role_system_dirs_deep(physical_path: Path, index: ProjectIndex) -> dict:
     """
     Find all .../AccessAndSecurity/UserRoleSystem anywhere under Physical/.
     Returns: dict[config_name -> list[Path]]
@@ -23,9 +21,7 @@ def _find_user_role_system_dirs_deep(physical_path: Path) -> dict:
     result = {}
     if not physical_path or not Path(physical_path).exists():
         return result
-    for urs in physical_path.rglob("UserRoleSystem"):
-        if not urs.is_dir():
-            continue
+    for urs in index.dirs_named("UserRoleSystem", under=physical_path):
         if urs.parent.name != "AccessAndSecurity":
             continue
         # derive top-level configuration name (first path segment under Physical/)
@@ -38,7 +34,26 @@ def _find_user_role_system_dirs_deep(physical_path: Path) -> dict:
     return result
 
 
-def check_access_security(physical_path: Path, log, verbose: bool = False):
+def register_access_security_rules(engine: ScanEngine, physical_path: Path) -> None:
+    """
+    Registers the per-file scan rules evaluated by check_access_security.
+    """
+    engine.add(
+        "access_security.ansl",
+        Path(physical_path),
+        [".hw"],
+        process_ansl_authentication,
+        needs_content=False,
+    )
+
+
+def check_access_security(
+    physical_path: Path,
+    log,
+    verbose: bool = False,
+    index: ProjectIndex | None = None,
+    scan_results: dict | None = None,
+):
     """
     Access & Security checks scoped to Physical/...:
       1) Remind about password hashing change in AS6 (re-enter all user passwords).
@@ -62,7 +77,8 @@ def check_access_security(physical_path: Path, log, verbose: bool = False):
     )
 
     # (2) Validate UserRoleSystem (deep search)
-    urs_map = _find_user_role_system_dirs_deep(Path(physical_path))
+    index = index or ProjectIndex(Path(physical_path).parent)
+    urs_map = _find_user_role_system_dirs_deep(Path(physical_path), index)
     if not urs_map:
         log(
             "Access & Security UserRoleSystem not found under Physical/.../AccessAndSecurity/UserRoleSystem."
@@ -73,8 +89,16 @@ def check_access_security(physical_path: Path, log, verbose: bool = False):
     else:
         for cfg, dirs in sorted(urs_map.items()):
             for urs_dir in dirs:
-                users = list(urs_dir.glob("*.user"))
-                roles = list(urs_dir.glob("*.role"))
+                users = [
+                    f
+                    for f in index.files(".user", under=urs_dir)
+                    if f.parent == urs_dir
+                ]
+                roles = [
+                    f
+                    for f in index.files(".role", under=urs_dir)
+                    if f.parent == urs_dir
+                ]
                 if not users or not roles:
                     log(
                         f"[{cfg}] Users/Roles missing in UserRoleSystem at: {urs_dir}"
@@ -89,12 +113,12 @@ def check_access_security(physical_path: Path, log, verbose: bool = False):
                         severity="INFO",
                     )
 
-    # (3) ANSL authentication in .hw (parallel scan; no keyword args)
-    ansl_results = utils.scan_files_parallel(
-        physical_path,
-        [".hw"],
-        process_ansl_authentication,
-    )
+    # (3) ANSL authentication in .hw (shared single-pass scan)
+    if scan_results is None:
+        engine = ScanEngine(index)
+        register_access_security_rules(engine, physical_path)
+        scan_results = engine.run()
+    ansl_results = scan_results["access_security.ansl"]
 
     if ansl_results:
         log(
@@ -3,6 +3,7 @@ from pathlib import Path
 from typing import Optional
 
 from utils import utils
+from utils.project_index import ProjectIndex
 
 MIN_LETTER = "B"
 MIN_VERSION = 4.25
@@ -22,13 +23,16 @@ def _is_version_valid(letter: str, version: float) -> bool:
     return letter >= MIN_LETTER and version >= MIN_VERSION
 
 
-def check_ar(physical_path: Path, log, verbose: bool = False) -> None:
+def check_ar(
+    physical_path: Path,
+    log,
+    verbose: bool = False,
+    index: Optional[ProjectIndex] = None,
+) -> None:
     log(utils.section_header("ar", "Checking Automation Runtime..."))
 
-    for file in physical_path.rglob("Cpu.pkg"):
-        if not file.is_file():
-            continue
-
+    index = index or ProjectIndex(physical_path.parent)
+    for file in index.named("Cpu.pkg", under=physical_path):
         config = file.parts[-3]
         content = utils.read_file(file)
         ar_match = re.search(AR_VERSION_PATTERN, content)
@@ -2,59 +2,46 @@ import re
 from pathlib import Path
 
 from utils import utils
+from utils.discontinuation_db import get_discontinuation_db
+from utils.keyword_matcher import get_matcher
+from utils.project_index import ProjectIndex
+from utils.scan_engine import ScanEngine
 
 
-def check_deprecated_string_functions(path: Path, args: dict) -> list:
+def check_deprecated_string_functions(path: Path, content: str) -> list:
     """
     Scans the given file for deprecated string functions.
     """
-    deprecated_functions = args["deprecated_string_functions"]
+    deprecated_functions = get_matcher(
+        get_discontinuation_db().deprecated_string_functions
+    )
     results = []
-    if path.is_file():
-        content = utils.read_file(path)
-        if any(re.search(rf"\b{func}\b", content) for func in deprecated_functions):
-            results.append(path)
+    if deprecated_functions.search(content):
+        results.append(path)
 
     return results
 
 
-def check_deprecated_math_functions(path: Path, args: dict) -> list:
+def check_deprecated_math_functions(path: Path, content: str) -> list:
     """
     Scans the given file for deprecated math function calls.
     """
-    deprecated_functions = args["deprecated_math_functions"]
     # Match function names only when followed by '('
-    function_pattern = re.compile(r"\b(" + "|".join(deprecated_functions) + r")\s*\(")
+    function_calls = get_matcher(
+        get_discontinuation_db().deprecated_math_functions, suffix=r"\s*\("
+    )
 
     results = []
-    if path.is_file():
-        content = utils.read_file(path)
-        if function_pattern.search(content):  # Only matches function calls
-            results.append(path)
+    if function_calls.search(content):  # Only matches function calls
+        results.append(path)
 
     return results
 
 
-def check_deprecated_functions(logical_path, log, verbose=False) -> None:
-    args = {
-        "deprecated_string_functions": utils.load_discontinuation_info(
-            "deprecated_string_functions"
-        ),
-        "deprecated_math_functions": utils.load_discontinuation_info(
-            "deprecated_math_functions"
-        ),
-    }
-
-    # Store the list of files containing deprecated string or math functions
-    result = utils.scan_files_parallel(
-        logical_path,
-        [".st", ".ab"],
-        [check_deprecated_string_functions, check_deprecated_math_functions],
-        args,
-    )
-
-    deprecated_string_files = result["check_deprecated_string_functions"]
-    deprecated_math_files = result["check_deprecated_math_functions"]
+def check_deprecated_functions(log, verbose: bool, scan_results: dict) -> None:
+    # Lists of files containing deprecated string or math functions
+    deprecated_string_files = scan_results["functions.deprecated_string"]
+    deprecated_math_files = scan_results["functions.deprecated_math"]
 
     if deprecated_string_files:
         log(
@@ -87,26 +74,9 @@ def check_deprecated_functions(logical_path, log, verbose=False) -> None:
             log(output, severity="INFO")
 
 
-def check_obsolete_functions(
-    logical_path: Path,
-    log,
-    verbose=False,
-) -> None:
-    obsolete_function_blocks = utils.load_discontinuation_info("obsolete_fbks")
-    invalid_var_typ_files = utils.scan_files_parallel(
-        logical_path,
-        [".var", ".typ"],
-        process_var_file,
-        obsolete_function_blocks,
-    )
-
-    obsolete_functions = utils.load_discontinuation_info("obsolete_funcs")
-    invalid_st_c_files = utils.scan_files_parallel(
-        logical_path,
-        [".st", ".c", ".cpp"],
-        process_st_c_file,
-        obsolete_functions,
-    )
+def check_obsolete_functions(log, verbose: bool, scan_results: dict) -> None:
+    invalid_var_typ_files = scan_results["functions.obsolete_fbks"]
+    invalid_st_c_files = scan_results["functions.obsolete_funcs"]
 
     if invalid_var_typ_files:
         output = (
@@ -130,45 +100,85 @@ def check_obsolete_functions(
             )
 
 
-def process_var_file(file_path: Path, patterns: dict) -> list:
+def process_var_file(file_path: Path, content: str) -> list:
     """
     Processes a .var file to find matches for obsolete function blocks.
     """
-    results = set()
-    content = utils.read_file(file_path)
+    db = get_discontinuation_db()
+    results = {}
 
     # Regex for function block declarations, e.g., : MpAlarmXConfigMapping;
     matches = re.findall(r":\s*([A-Za-z0-9_]+)\s*;", content)
     for match in matches:
-        for pattern, reason in patterns.items():
-            if match.lower() == pattern.lower():
-                results.add((pattern, reason, file_path))
+        entry = db.obsolete_function_block(match)
+        if entry:
+            results[(*entry, file_path)] = None
     return list(results)
 
 
-def process_st_c_file(file_path: Path, patterns: dict) -> list:
+def process_st_c_file(file_path: Path, content: str) -> list:
     """
-    Processes a .st, .c, or .cpp file to find matches for the given patterns.
+    Processes a .st, .c, or .cpp file to find matches for obsolete functions.
     """
-    results = set()
-    content = utils.read_file(file_path)
+    db = get_discontinuation_db()
+    results = {}
 
-    pattern_map = {p.lower(): (p, reason) for p, reason in patterns.items()}
     matches = re.findall(r"\b([A-Za-z0-9_]+)\b", content)
     for match in matches:
-        key = match.lower()
-        if key in pattern_map:
-            results.add((pattern_map[key][0], pattern_map[key][1], file_path))
+        entry = db.obsolete_function(match)
+        if entry:
+            results[(*entry, file_path)] = None
     return list(results)
 
 
-def check_functions(logical_path: Path, log, verbose=False) -> None:
+def register_function_rules(engine: ScanEngine, logical_path: Path) -> None:
+    """
+    Registers the per-file scan rules evaluated by check_functions.
+    """
+    engine.add(
+        "functions.obsolete_fbks",
+        logical_path,
+        [".var", ".typ"],
+        process_var_file,
+    )
+    engine.add(
+        "functions.obsolete_funcs",
+        logical_path,
+        [".st", ".c", ".cpp"],
+        process_st_c_file,
+    )
+    engine.add(
+        "functions.deprecated_string",
+        logical_path,
+        [".st", ".ab"],
+        check_deprecated_string_functions,
+    )
+    engine.add(
+        "functions.deprecated_math",
+        logical_path,
+        [".st", ".ab"],
+        check_deprecated_math_functions,
+    )
+
+
+def check_functions(
+    logical_path: Path,
+    log,
+    verbose=False,
+    index: ProjectIndex | None = None,
+    scan_results: dict | None = None,
+) -> None:
     log(
         utils.section_header(
             "functions", "Checking for obsolete and deprecated FUBs and functions..."
         )
     )
 
-    check_obsolete_functions(logical_path, log, verbose)
+    if scan_results is None:
+        engine = ScanEngine(index or ProjectIndex(logical_path.parent))
+        register_function_rules(engine, logical_path)
+        scan_results = engine.run()
+
+    check_obsolete_functions(log, verbose, scan_results)
 
-    check_deprecated_functions(logical_path, log, verbose)
+    check_deprecated_functions(log, verbose, scan_results)
@@ -1,18 +1,35 @@
 import re
 from pathlib import Path
 
-from lxml import etree
-
 from utils import utils
+from utils.file_cache import content_cache
+from utils.project_index import ProjectIndex
+from utils.scan_engine import ScanEngine
+from utils.xml_cache import xml_cache, xpath
 
 version_pattern = re.compile(r'AutomationStudio (?:Working)?Version="?([\d.]+)')
 
+# The <?AutomationStudio ...?> instruction is at the top of .apj and .hw files
+HEADER_SIZE = 4096
 
-def check_all_file_versions(project_path: Path, log, verbose: bool) -> None:
-    physical_path = project_path / "Physical"
 
-    results = utils.scan_files_parallel(project_path, [".apj"], check_file_version)
-    results += utils.scan_files_parallel(physical_path, [".hw"], check_file_version)
+def read_file_version(file_path: Path) -> str | None:
+    """
+    Returns the Automation Studio version a file was saved with, None if unknown.
+    Only the header of the file is read, the whole file only if the version is
+    not found there.
+    """
+    head = content_cache.read_head(file_path, HEADER_SIZE)
+    version_match = version_pattern.search(head.decode("utf-8", errors="ignore"))
+    if version_match is None and len(head) == HEADER_SIZE:
+        version_match = version_pattern.search(utils.read_file(file_path))
+    return version_match.group(1).strip() if version_match else None
+
+
+def check_all_file_versions(log, verbose: bool, scan_results: dict) -> None:
+    results = (
+        scan_results["file_compat.apj_version"] + scan_results["file_compat.hw_version"]
+    )
     if results:
         output = "The following files are incompatible with the required version:"
         for file_path, version in results:
@@ -27,17 +44,15 @@ def check_all_file_versions(project_path: Path, log, verbose: bool) -> None:
             log("All project and hardware files are valid.", severity="VERBOSE")
 
 
-def check_file_version(file_path: Path) -> list:
+def check_file_version(file_path: Path, content: str | None) -> list:
     """
     Checks the version of a given file
     """
     accepted_prefixes = ("4.12", "6.")
 
     result = set()
-    content = utils.read_file(file_path)
-    version_match = version_pattern.search(content)
-    if version_match:
-        version = version_match.group(1).strip()
+    version = read_file_version(file_path)
+    if version is not None:
         if not version.startswith(accepted_prefixes):
             result.add((file_path, version))
     else:
@@ -45,10 +60,8 @@ def check_file_version(file_path: Path) -> list:
     return list(result)
 
 
-def check_for_referenced_files(project_path: Path, log, verbose=False) -> None:
-    reference_files = utils.scan_files_parallel(
-        project_path / "Physical", [".pkg"], has_file_reference
-    )
+def check_for_referenced_files(log, verbose: bool, scan_results: dict) -> None:
+    reference_files = scan_results["file_compat.references"]
 
     if reference_files:
         output = (
@@ -60,19 +73,19 @@ def check_for_referenced_files(project_path: Path, log, verbose=False) -> None:
         log(output, severity="WARNING")
 
 
-def has_file_reference(file_path: Path) -> list:
+def has_file_reference(file_path: Path, content: str | None) -> list:
     """
     Checks if a .pkg file contains referenced files.
     """
     results = []
-    if not file_path.is_file() or "mappView" in file_path.parts:
+    if "mappView" in file_path.parts:
         return results
 
     try:
-        tree = etree.parse(str(file_path))
+        tree = xml_cache.parse(file_path)
         root = tree.getroot()
         # Search with XPath for all elements with Type="File" and Reference="true"
-        matches = root.xpath('.//*[@Type="File" and @Reference="true"]')
+        matches = xpath('.//*[@Type="File" and @Reference="true"]')(root)
         if matches:
             results.append(file_path)
     except Exception as e:
@@ -81,7 +94,43 @@ def has_file_reference(file_path: Path) -> list:
     return results
 
 
-def check_files_for_compatibility(project_path: Path, log, verbose=False) -> None:
+def register_file_compatibility_rules(engine: ScanEngine, project_path: Path) -> None:
+    """
+    Registers the per-file scan rules evaluated by check_files_for_compatibility.
+    """
+    physical_path = project_path / "Physical"
+    # Only the header of the files is probed for the version
+    engine.add(
+        "file_compat.apj_version",
+        project_path,
+        [".apj"],
+        check_file_version,
+        needs_content=False,
+    )
+    engine.add(
+        "file_compat.hw_version",
+        physical_path,
+        [".hw"],
+        check_file_version,
+        needs_content=False,
+    )
+    # Parsed through the XML tree cache, so the text content is not needed
+    engine.add(
+        "file_compat.references",
+        physical_path,
+        [".pkg"],
+        has_file_reference,
+        needs_content=False,
+    )
+
+
+def check_files_for_compatibility(
+    project_path: Path,
+    log,
+    verbose=False,
+    index: ProjectIndex | None = None,
+    scan_results: dict | None = None,
+) -> None:
     """
     Checks the compatibility of .apj and .hw files within an apj_path.
     Validates that files have a minimum required version.
@@ -93,5 +142,10 @@ def check_files_for_compatibility(project_path: Path, log, verbose=False) -> Non
         )
     )
 
-    check_all_file_versions(project_path, log, verbose)
-    check_for_referenced_files(project_path, log, verbose)
+    if scan_results is None:
+        engine = ScanEngine(index or ProjectIndex(project_path))
+        register_file_compatibility_rules(engine, project_path)
+        scan_results = engine.run()
+
+    check_all_file_versions(log, verbose, scan_results)
+    check_for_referenced_files(log, verbose, scan_results)
@@ -1,50 +1,67 @@
-import re
 from pathlib import Path
 
 from utils import utils
+from utils.hardware_model import load_hardware
+from utils.project_index import ProjectIndex
+from utils.scan_engine import ScanEngine
 
 
-def process_file_devices(file_path: Path) -> list:
+def process_file_devices(file_path: Path, content: str | None) -> list:
     """
     Checks for used file devices that access system partitions.
     """
     exclude = ["C:\\", "D:\\", "E:\\", "F:\\"]
     results = set()  # Use a set to store unique matches
-    content = utils.read_file(file_path)
 
-    # Regex to extract the value from the file device elements
-    matches = re.findall(
-        r'<Group ID="FileDevice\d+" />\s*<Parameter ID="FileDeviceName\d+" Value="(.*?)" />\s*<Parameter ID="FileDevicePath\d+" Value="(.*?)" />',
-        content,
-    )
-    for name, path in matches:
+    for name, path in load_hardware(file_path).file_devices():
         for exclusion in exclude:
             if path.lower().startswith(exclusion.lower()):
                 results.add((name, path, file_path))
     return list(results)  # Convert back to a list for consistency
 
 
-def process_ftp_configurations(file_path: Path) -> list:
+def process_ftp_configurations(file_path: Path, content: str | None) -> list:
     """
     Checks for FTP configurations that access the SYSTEM partition.
     """
     results = set()
-    content = utils.read_file(file_path)
+    hardware = load_hardware(file_path)
 
-    # Regex to extract if the FTP server is activated
-    matches = re.search(r'<Parameter ID="ActivateFtpServer"\s+Value="(\d)" />', content)
-    if not matches or matches.group(0) == "1":
-        matches = re.findall(
-            r'<Parameter ID="FTPMSPartition\d+"\s+Value="(.*?)" />', content
-        )
-        if matches:
-            for match in matches:
-                if "SYSTEM" == match:
-                    results.add((match, file_path))
+    # Only if the FTP server is activated (or the parameter is not set)
+    if hardware.parameter("ActivateFtpServer") in (None, "1"):
+        for _, partition in hardware.find_parameters(r"FTPMSPartition\d+"):
+            if "SYSTEM" == partition:
+                results.add((partition, file_path))
     return list(results)  # Convert back to a list for consistency
 
 
-def check_file_devices(physical_path: Path, log, verbose=False) -> None:
+def register_file_device_rules(engine: ScanEngine, physical_path: Path) -> None:
+    """
+    Registers the per-file scan rules evaluated by check_file_devices.
+    """
+    engine.add(
+        "file_devices.devices",
+        physical_path,
+        [".hw"],
+        process_file_devices,
+        needs_content=False,
+    )
+    engine.add(
+        "file_devices.ftp",
+        physical_path,
+        [".hw"],
+        process_ftp_configurations,
+        needs_content=False,
+    )
+
+
+def check_file_devices(
+    physical_path: Path,
+    log,
+    verbose=False,
+    index: ProjectIndex | None = None,
+    scan_results: dict | None = None,
+) -> None:
     log(
         utils.section_header(
             "file-devices",
@@ -52,11 +69,13 @@ def check_file_devices(physical_path: Path, log, verbose=False) -> None:
         )
     )
 
-    results = utils.scan_files_parallel(
-        physical_path, [".hw"], [process_file_devices, process_ftp_configurations]
-    )
-    file_devices = results["process_file_devices"]
-    ftp_configs = results["process_ftp_configurations"]
+    if scan_results is None:
+        engine = ScanEngine(index or ProjectIndex(physical_path.parent))
+        register_file_device_rules(engine, physical_path)
+        scan_results = engine.run()
+
+    file_devices = scan_results["file_devices.devices"]
+    ftp_configs = scan_results["file_devices.ftp"]
 
     if file_devices:
         grouped_results = {}
@@ -1,39 +1,75 @@
-import re
 from pathlib import Path
 
 from utils import utils
+from utils.discontinuation_db import get_discontinuation_db
+from utils.hardware_model import load_hardware
+from utils.project_index import ProjectIndex
+from utils.scan_engine import ScanEngine
 
 
-def process_hw_file(file_path: Path, hardware_dict: dict) -> list:
+def process_hw_file(file_path: Path, content: str | None) -> list:
     """
     Processes a .hw file to find unsupported hardware matches.
     """
-    results = set()  # Use a set to store unique matches
-    content = utils.read_file(file_path)
+    db = get_discontinuation_db()
+    results = {}  # Use a dict to store unique matches in order of appearance
 
-    # Regex to extract the Type value from the <Module> elements
-    matches = re.findall(r'<Module [^>]*Type="([^"]+)"', content)
-    for hw_type in matches:
-        for reason, items in hardware_dict.items():
-            if hw_type in items:
-                results.add(
-                    (hw_type, reason, file_path)
-                )  # Add as a tuple to ensure uniqueness
-    return list(results)  # Convert back to a list for consistency
+    for hw_type in load_hardware(file_path).module_types():
+        for reason in db.unsupported_hw_reasons(hw_type):
+            results[(hw_type, reason, file_path)] = None
+    return list(results)
 
 
-def check_hardware(physical_path: Path, log, verbose=False) -> None:
-    log(utils.section_header("hardware", "Checking for invalid hardware..."))
+def process_special_handling_hw_file(file_path: Path, content: str | None) -> list:
+    """
+    Processes a .hw file to find hardware that needs special handling.
+    """
+    special_handling_hw = get_discontinuation_db().special_handling_hw
+    results = {}
+
+    for hw_type in load_hardware(file_path).module_types():
+        if hw_type in special_handling_hw:
+            results[(hw_type, "special_handling", file_path)] = None
+    return list(results)
+
 
-    unsupported_hardware = utils.load_discontinuation_info("unsupported_hw")
-    special_handling_hw = unsupported_hardware.pop("special_handling", {})
-    hardware_results = utils.scan_files_parallel(
+def register_hardware_rules(engine: ScanEngine, physical_path: Path) -> None:
+    """
+    Registers the per-file scan rules evaluated by check_hardware.
+    """
+    # The .hw rules of all checks read the shared hardware model, not the text
+    engine.add(
+        "hardware.unsupported",
         physical_path,
         [".hw"],
         process_hw_file,
-        unsupported_hardware,
+        needs_content=False,
+    )
+    engine.add(
+        "hardware.special_handling",
+        physical_path,
+        [".hw"],
+        process_special_handling_hw_file,
+        needs_content=False,
     )
 
+
+def check_hardware(
+    physical_path: Path,
+    log,
+    verbose=False,
+    index: ProjectIndex | None = None,
+    scan_results: dict | None = None,
+) -> None:
+    log(utils.section_header("hardware", "Checking for invalid hardware..."))
+
+    if scan_results is None:
+        engine = ScanEngine(index or ProjectIndex(physical_path.parent))
+        register_hardware_rules(engine, physical_path)
+        scan_results = engine.run()
+
+    hardware_results = scan_results["hardware.unsupported"]
+
     if hardware_results:
         grouped_results = {}
         for hardware_id, reason, file_path in hardware_results:
@@ -62,24 +98,18 @@ def check_hardware(physical_path: Path, log, verbose=False) -> None:
         if verbose:
             log("No unsupported hardware found in the project.", severity="INFO")
 
-    special_handling_results = utils.scan_files_parallel(
-        physical_path,
-        [".hw"],
-        process_hw_file,
-        {"special_handling": list(special_handling_hw.keys())},
-    )
+    special_handling_results = scan_results["hardware.special_handling"]
     if special_handling_results:
+        special_handling_hw = get_discontinuation_db().special_handling_hw
         for hw, _, _ in special_handling_results:
             log(special_handling_hw[hw], severity="WARNING")
 
 
-def count_hardware(folder: Path) -> dict:
+def count_hardware(folder: Path, index: ProjectIndex | None = None) -> dict:
     result = {}
-    for file_path in folder.rglob("*.hw"):
-        content = utils.read_file(file_path)
-        matches = re.findall(r'<Module [^>]*Type="([^"]+)"', content)
-        for match in matches:
-            module = match
+    index = index or ProjectIndex(folder)
+    for file_path in index.files(".hw", under=folder):
+        for module in load_hardware(file_path).module_types():
             result.setdefault(module, {"cnt": 0})
             result[module]["cnt"] += 1
     return result
@@ -2,36 +2,35 @@ import re
 from pathlib import Path
 
 from utils import utils
+from utils.discontinuation_db import get_discontinuation_db
+from utils.project_index import ProjectIndex
+from utils.scan_engine import ScanEngine
 
 
-def process_pkg_file(file_path: Path, args: dict) -> list:
+def process_pkg_file(file_path: Path, content: str) -> list:
     """
     Processes a .pkg file to find matches for obsolete libraries.
+    Whether a match really is a library (has a *.lby file in its sub folder)
+    is checked afterwards against the project index.
     """
-    patterns = args["obsolete_dict"]
+    db = get_discontinuation_db()
     results = []
-    content = utils.read_file(file_path)
 
     # Regex for library names between > and <
     matches = re.findall(r">([^<]+)<", content, re.IGNORECASE)
     for match in matches:
-        for pattern, reason in patterns.items():
-            if match.lower() == pattern.lower():
-                # if we find a match, check if we can find a matching *.lby file in the subdir
-                pkg_path = file_path.parent / pattern
-                is_lib = any(pkg_path.rglob("*.lby"))
-                if is_lib:
-                    results.append((pattern, reason, file_path))
+        entry = db.obsolete_library(match)
+        if entry:
+            results.append((*entry, file_path))
     return results
 
 
-def process_lby_file(file_path: Path, args: dict) -> list:
+def process_lby_file(file_path: Path, content: str) -> list:
     """
     Processes a .lby file to find obsolete dependencies.
     """
-    patterns = args["obsolete_dict"]
+    db = get_discontinuation_db()
     results = []
-    content = utils.read_file(file_path)
 
     # Extract library name (directory name as identifier)
     library_name = file_path.parent.parts[-1]
@@ -40,20 +39,18 @@ def process_lby_file(file_path: Path, args: dict) -> list:
         r'<Dependency ObjectName="([^"]+)"', content, re.IGNORECASE
     )
     for dependency in dependencies:
-        for pattern, reason in patterns.items():
-            # Compare case-insensitively
-            if dependency.lower() == pattern.lower():
-                results.append((library_name, dependency, reason, file_path))
+        # Compare case-insensitively
+        entry = db.obsolete_library(dependency)
+        if entry:
+            results.append((library_name, dependency, entry[1], file_path))
     return results
 
 
-def process_binary_lby_file(file_path: Path, args: dict) -> list:
+def process_binary_lby_file(file_path: Path, content: str) -> list:
     """
     Processes a .lby file to find custom binaries binary libraries
     """
-    patterns = args["whitelist_set"]
     results = []
-    content = utils.read_file(file_path)
 
     # Only consider binary libraries
     if not re.search(r'SubType\s*=\s*"Binary"', content, re.IGNORECASE):
@@ -63,90 +60,98 @@ def process_binary_lby_file(file_path: Path, args: dict) -> list:
     library_name = file_path.parent.parts[-1]
 
     # Case-insensitive presence check against whitelist
-    if library_name.lower() not in patterns:
+    if not get_discontinuation_db().is_whitelisted_binary(library_name):
         results.append((library_name, file_path))
 
     return results
 
 
-def process_c_cpp_hpp_includes_file(file_path: Path, patterns: dict) -> list:
+def process_c_cpp_hpp_includes_file(file_path: Path, content: str) -> list:
     """
     Processes a C, C++, or header (.hpp) file to find obsolete dependencies in #include statements.
     """
+    db = get_discontinuation_db()
     results = []
     include_pattern = re.compile(r'#include\s+[<"]([^">]+)[">]')
-    content = utils.read_file(file_path)
 
-    for line in content:
+    for line in content.splitlines():
         match = include_pattern.search(line)
         if match:
             included_library = match.group(1).lower()  # Normalize case
-            for pattern, reason in patterns.items():
-                if included_library == f"{pattern.lower()}.h":
-                    results.append((pattern, reason, file_path))
+            if included_library.endswith(".h"):
+                entry = db.obsolete_library(included_library[:-2])
+                if entry:
+                    results.append((*entry, file_path))
     return results
 
 
 # Function to process libraries requiring manual process
-def process_manual_libraries(file_path: Path, args: dict) -> list:
+def process_manual_libraries(file_path: Path, content: str) -> list:
     """
     Processes .pkg or .lby files to find libraries that require manual action during migration.
     """
-    patterns = args["manual_process_libraries"]
+    db = get_discontinuation_db()
     results = []
-    content = utils.read_file(file_path)
 
     matches = re.findall(r">([^<]+)<", content, re.IGNORECASE)
     for match in matches:
-        for library, action in patterns.items():
-            if match.lower() == library.lower():
-                results.append((library, action, file_path))
+        entry = db.manual_process_library(match)
+        if entry:
+            results.append((*entry, file_path))
     return results
 
 
-def check_libraries(logical_path, log, verbose=False):
-    log(
-        utils.section_header(
-            "libraries", "Checking for invalid libraries and dependencies..."
-        )
-    )
-
-    manual_process_libraries = utils.load_discontinuation_info("manual_process_libs")
-    obsolete_dict = utils.load_discontinuation_info("obsolete_libs")
-    whitelist_raw = utils.load_discontinuation_info("binary_lib_whitelist") or []
-    whitelist_set = {str(x).lower() for x in whitelist_raw}
-
-    args = {
-        "manual_process_libraries": manual_process_libraries,
-        "obsolete_dict": obsolete_dict,
-        "whitelist_set": whitelist_set,
-    }
-
-    result = utils.scan_files_parallel(
-        logical_path,
-        [".pkg"],
-        [process_manual_libraries, process_pkg_file],
-        args,
-    )
-    manual_libs_results = result["process_manual_libraries"]
-    invalid_pkg_files = result["process_pkg_file"]
-
-    result = utils.scan_files_parallel(
+def register_library_rules(engine: ScanEngine, logical_path: Path) -> None:
+    """
+    Registers the per-file scan rules evaluated by check_libraries.
+    """
+    engine.add("libraries.manual", logical_path, [".pkg"], process_manual_libraries)
+    engine.add("libraries.obsolete_pkg", logical_path, [".pkg"], process_pkg_file)
+    engine.add(
+        "libraries.obsolete_dependency",
         logical_path,
         [".lby"],
-        [process_lby_file, process_binary_lby_file],
-        args,
+        process_lby_file,
     )
-    lby_dependency_results = result["process_lby_file"]
-    non_whitelisted_binaries = result["process_binary_lby_file"]
-
-    c_include_dependency_results = utils.scan_files_parallel(
+    engine.add("libraries.binary", logical_path, [".lby"], process_binary_lby_file)
+    engine.add(
+        "libraries.c_includes",
         logical_path,
         [".c", ".cpp", ".hpp"],
         process_c_cpp_hpp_includes_file,
-        obsolete_dict,
     )
 
+
+def check_libraries(
+    logical_path,
+    log,
+    verbose=False,
+    index: ProjectIndex | None = None,
+    scan_results: dict | None = None,
+):
+    log(
+        utils.section_header(
+            "libraries", "Checking for invalid libraries and dependencies..."
+        )
+    )
+
+    index = index or ProjectIndex(Path(logical_path).parent)
+    if scan_results is None:
+        engine = ScanEngine(index)
+        register_library_rules(engine, logical_path)
+        scan_results = engine.run()
+
+    manual_libs_results = scan_results["libraries.manual"]
+    # Only keep matches that have a *.lby file in the matching sub folder
+    invalid_pkg_files = [
+        (library, reason, file_path)
+        for library, reason, file_path in scan_results["libraries.obsolete_pkg"]
+        if index.files(".lby", under=file_path.parent / library)
+    ]
+    lby_dependency_results = scan_results["libraries.obsolete_dependency"]
+    non_whitelisted_binaries = scan_results["libraries.binary"]
+    c_include_dependency_results = scan_results["libraries.c_includes"]
+
     if non_whitelisted_binaries:
         # De-duplicate by library name to avoid noisy output
         seen = set()
@@ -1,11 +1,14 @@
 from pathlib import Path
 
 from utils import utils
+from utils.mapp_view_content import widget_types
+from utils.project_index import ProjectIndex
 from checks import hardware_check
 
 
-def mapp_license_analyzer(project_path: Path):
+def mapp_license_analyzer(project_path: Path, index: ProjectIndex | None = None):
     result = {}
+    index = index or ProjectIndex(project_path)
     logical = project_path / "Logical"
     physical = project_path / "Physical"
     mapp_view_path = None
@@ -23,13 +26,15 @@ def mapp_license_analyzer(project_path: Path):
             "clientCnt": 0,
             "eventScriptCnt": 0,
         }
-        for file in mapp_view_path.rglob("*"):
-            if file.is_file() and ".content" in file.name:
-                lines = utils.read_file(file).splitlines()
-                for line in lines:
-                    for obj in result["mappView"]["breaseWidgets"]:
-                        if "widgets.brease." + obj["name"] in line:
-                            obj["cnt"] += 1
+        for file in index.files(under=mapp_view_path):
+            if ".content" in file.name:
+                try:
+                    widgets = widget_types(file)
+                except Exception:
+                    # Not valid XML, the file cannot be used by mappView either
+                    continue
+                for obj in result["mappView"]["breaseWidgets"]:
+                    obj["cnt"] += widgets["widgets.brease." + obj["name"]]
 
     services = utils.load_file_info("licenses", "mapp_services")
     result["mappServices"] = {"services": []}
@@ -39,10 +44,7 @@ def mapp_license_analyzer(project_path: Path):
     result["mappTrak"] = {"hardware": [], "collisionAvoidance": ""}
     result["mappConnect"] = None
     result["mappVision"] = None
-    for file in physical.rglob("*"):
-        if not file.is_file():
-            continue
-
+    for file in index.files(under=physical):
         if file.suffix == ".assembly":
             items = utils.file_value_by_id(file, ["Strategy"])
             if len(items) > 0:
@@ -103,7 +105,7 @@ def mapp_license_analyzer(project_path: Path):
         result["mappServices"]["services"] = services
 
     # count all the hardware in the project
-    hardware = hardware_check.count_hardware(physical)
+    hardware = hardware_check.count_hardware(physical, index)
 
     # look for mappTrak hardware
     for item in hardware:
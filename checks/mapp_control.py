@@ -1,12 +1,14 @@
 import re
 from pathlib import Path
 
-from lxml import etree
-
 from utils import utils
+from utils.apj_model import load_apj
+from utils.project_index import ProjectIndex
 
 
-def check_mapp_control(apj_path: Path, log, verbose=False):
+def check_mapp_control(
+    apj_path: Path, log, verbose=False, index: ProjectIndex | None = None
+):
     """
     Checks if the project uses legacy MT<xxx> libraries that are now part of mappControl.
     """
@@ -14,26 +16,24 @@ def check_mapp_control(apj_path: Path, log, verbose=False):
     log(utils.section_header("mapp-control", "Checking mappControl usage..."))
 
     project_root = apj_path.parent
+    index = index or ProjectIndex(project_root)
 
     # 1. Check .apj file in root for mappControl
     if apj_path:
-        try:
-            tree = etree.parse(str(apj_path))
-            root = tree.getroot()
-            mapp_control = root.find(".//{*}mappControl")
-            if mapp_control is not None:
-                if verbose:
-                    log("Project uses mappControl, nothing to do", severity="INFO")
-                return
-        except Exception as e:
-            log(f"Failed to parse .apj file: {e}", severity="ERROR")
+        apj = load_apj(apj_path)
+        if apj.error is not None:
+            log(f"Failed to parse .apj file: {apj.error}", severity="ERROR")
+        elif apj.package("mappControl") is not None:
+            if verbose:
+                log("Project uses mappControl, nothing to do", severity="INFO")
+            return
 
     # 2. Search for usages of libraries that are now contained in mappControl
     search_path = project_root / "Logical"
 
     found = set()
     libs = ["MTBasics", "MTLinAlg", "MTFilter", "MTLookup", "MTProfile"]
-    for file in search_path.rglob("*.pkg"):
+    for file in index.files(".pkg", under=search_path):
         content = utils.read_file(file)
         for lib in libs:
             if re.search(rf">{lib}<", content):
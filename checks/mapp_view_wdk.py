@@ -16,9 +16,9 @@ from enum import Enum
 from pathlib import Path
 from typing import Iterator, Optional
 
-from lxml import etree
-
 from utils import utils
+from utils.project_index import ProjectIndex
+from utils.xml_cache import xml_cache
 
 
 class WidgetLibraryType(Enum):
@@ -28,33 +28,29 @@ class WidgetLibraryType(Enum):
     USER_WIDGET_LIB_6 = "User Widget Library 6"
 
 
-def _find_widgets_roots(logical_path: Path) -> Iterator[Path]:
+def _find_widgets_roots(logical_path: Path, index: ProjectIndex) -> Iterator[Path]:
     """
     Yield all 'Widgets' directories under any 'mappView' folder in the Logical tree.
     """
     if not logical_path or not logical_path.exists():
         return
     # Search for 'mappView' folders anywhere below Logical, then append 'Widgets'
-    for mv in logical_path.rglob("mappView"):
+    for mv in index.dirs_named("mappView", under=logical_path):
         widgets = mv / "Widgets"
         if widgets.is_dir():
             yield widgets
 
 
-def _find_first_wdk_folder(widgets_root: Path) -> Optional[Path]:
+def _find_first_wdk_folder(widgets_root: Path, index: ProjectIndex) -> Optional[Path]:
     """
     Return the first folder (any depth under the given Widgets root, including the root)
     that contains BOTH a .js and a .html file. If none found, return None.
-    Avoid multiple directory listings by storing the folders
+    Avoid multiple directory listings by using the project index
     """
-    already_checked = set()
-    for js_file in widgets_root.rglob("*.js"):
-        folder = js_file.parent
-        if folder in already_checked:
-            continue
-        if list(folder.glob("*.html")):
-            return folder
-        already_checked.add(folder)
+    html_folders = {f.parent for f in index.files(".html", under=widgets_root)}
+    for js_file in index.files(".js", under=widgets_root):
+        if js_file.parent in html_folders:
+            return js_file.parent
     return None
 
 
@@ -82,7 +78,7 @@ def _detect_widget_library_type(widget_lib_path: Path) -> Optional[WidgetLibrary
     mapping_file = widget_lib_path / "WidgetLibrary.mapping"
     if mapping_file.exists():
         # Parse xml file WidgetLibrary.mapping and search for the first "Mapping" in the Mapping node test if a <oType> attribute exists
-        tree = etree.parse(mapping_file)
+        tree = xml_cache.parse(mapping_file)
         root = tree.getroot()
         mapping_node = root.find("Mapping")
         if mapping_node is not None and mapping_node.get("oType") is not None:
@@ -92,17 +88,18 @@ def _detect_widget_library_type(widget_lib_path: Path) -> Optional[WidgetLibrary
 
     description_file = widget_lib_path / "Description.widgetlibrary"
     if description_file.exists():
-        with description_file.open() as f:
-            content = f.read()
-            if 'version="5.' in content:
-                return WidgetLibraryType.USER_WIDGET_LIB_4
-            elif 'version="6.' in content:
-                return WidgetLibraryType.USER_WIDGET_LIB_6
+        content = utils.read_file(description_file)
+        if 'version="5.' in content:
+            return WidgetLibraryType.USER_WIDGET_LIB_4
+        elif 'version="6.' in content:
+            return WidgetLibraryType.USER_WIDGET_LIB_6
 
     return None
 
 
-def check_widget_lib_usage(logical_path: Path, log, verbose: bool = False) -> None:
+def check_widget_lib_usage(
+    logical_path: Path, log, verbose: bool = False, index: ProjectIndex | None = None
+) -> None:
     """
     Detect usage of the legacy mappView *WDK* (Widget Development Kit) or User widget libraries and warn that it
     must be migrated to *WDTC* (Widget Development Tool Chain) in AS6.
@@ -123,7 +120,8 @@ def check_widget_lib_usage(logical_path: Path, log, verbose: bool = False) -> No
         )
     )
 
-    widgets_roots = list(_find_widgets_roots(logical_path))
+    index = index or ProjectIndex(logical_path.parent)
+    widgets_roots = list(_find_widgets_roots(logical_path, index))
     if not widgets_roots:
         if verbose:
             log("No 'mappView/Widgets' folders found under Logical.", severity="INFO")
@@ -1,10 +1,13 @@
-import re
 from pathlib import Path
 
 from utils import utils
+from utils.apj_model import load_apj
+from utils.project_index import ProjectIndex
 
 
-def check_vision_settings(apj_path: Path, log, verbose=False) -> None:
+def check_vision_settings(
+    apj_path: Path, log, verbose=False, index: ProjectIndex | None = None
+) -> None:
     """
     Checks for the presence of mappVision settings files in the specified directory.
     """
@@ -14,36 +17,34 @@ def check_vision_settings(apj_path: Path, log, verbose=False) -> None:
         )
     )
 
-    # Check for mappVision line in the .apj file
-    for line in utils.read_file(apj_path).splitlines():
-        if "<mappVision " in line and "Version=" in line:
-            match = re.search(r'Version="(\d+)\.(\d+)', line)
-            if match:
-                major = int(match.group(1))
-                minor = int(match.group(2))
-                version = f"{major}.{minor}"
+    # Check for mappVision in the technology packages of the .apj file
+    mapp_vision = load_apj(apj_path).package("mappVision")
+    if mapp_vision is not None:
+        if mapp_vision.major_minor is not None:
+            major, minor = mapp_vision.major_minor
+            version = f"{major}.{minor}"
 
-                log(
-                    f"Found usage of mapp Vision (Version: {version})",
-                    severity="INFO",
-                )
-                log(
-                    f"Several security settings will be enforced after the migration:"
-                    "\n"
-                    "\n- After migrating to AS6 make sure that IP forwarding is activated under the Powerlink interface! (AR/Features_and_changes)"
-                    "\n"
-                    "\n- There is no more anonymous access to mappVision applications. Make sure to create users and assign them to the appropriate roles (ex. BR_Engineer) after migrating to AS6."
-                    "\n"
-                    "\n- Open the mappView server configuration file (Configuration View/mappView/Config.mappviewcfg)"
-                    '\n  Check "Change Advanced Parameter Visibility" button in the editor toolbar'
-                    "\n  Add the value 'VisionHmiDevice' under File Device Whitelist",
-                    when="AS6",
-                    severity="MANDATORY",
-                )
+            log(
+                f"Found usage of mapp Vision (Version: {version})",
+                severity="INFO",
+            )
+            log(
+                f"Several security settings will be enforced after the migration:"
+                "\n"
+                "\n- After migrating to AS6 make sure that IP forwarding is activated under the Powerlink interface! (AR/Features_and_changes)"
+                "\n"
+                "\n- There is no more anonymous access to mappVision applications. Make sure to create users and assign them to the appropriate roles (ex. BR_Engineer) after migrating to AS6."
+                "\n"
+                "\n- Open the mappView server configuration file (Configuration View/mappView/Config.mappviewcfg)"
+                '\n  Check "Change Advanced Parameter Visibility" button in the editor toolbar'
+                "\n  Add the value 'VisionHmiDevice' under File Device Whitelist",
+                when="AS6",
+                severity="MANDATORY",
+            )
 
     if verbose:
         # Walk through all directories
         physical_path = apj_path.parent / "Physical"
-        for vision_path in physical_path.rglob("mappVision"):
-            if vision_path.is_dir():
-                log(f"mappVision folders found at: {vision_path}", severity="INFO")
+        index = index or ProjectIndex(apj_path.parent)
+        for vision_path in index.dirs_named("mappVision", under=physical_path):
+            log(f"mappVision folders found at: {vision_path}", severity="INFO")
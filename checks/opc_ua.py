@@ -1,11 +1,14 @@
 from pathlib import Path
 
-from lxml import etree
-
 from utils import utils
+from utils.hardware_model import load_hardware
+from utils.project_index import ProjectIndex
+from utils.xml_cache import xml_cache
 
 
-def check_uad_files(root_dir: Path, log, verbose=False) -> None:
+def check_uad_files(
+    root_dir: Path, log, verbose=False, index: ProjectIndex | None = None
+) -> None:
     """
     Checks if .uad files are located in any directory ending with Connectivity/OpcUA
     and if they have at least file version 9.
@@ -14,17 +17,19 @@ def check_uad_files(root_dir: Path, log, verbose=False) -> None:
 
     log(utils.section_header("opcua", "Checking OPC UA configuration..."))
 
+    index = index or ProjectIndex(root_dir.parent)
+
     # Find misplaced and old opc ua files
     required_suffix = ("Connectivity", "OpcUA")
     misplaced_files = []
     old_version = []
 
-    for path in root_dir.rglob("*.uad"):
+    for path in index.files(".uad", under=root_dir):
         if path.parent.parts[-2:] != required_suffix:
             misplaced_files.append(str(path))
 
         try:
-            tree = etree.parse(path)
+            tree = xml_cache.parse(path)
             root_element = tree.getroot()
             file_version = int(root_element.attrib.get("FileVersion", 0))
             if file_version < 9:
@@ -66,51 +71,32 @@ def check_uad_files(root_dir: Path, log, verbose=False) -> None:
     # Search in subdirectories for .hw files
     output_model1 = ""
     output_typecast = ""
-    for subdir in root_dir.iterdir():
-        if not subdir.is_dir():
-            continue
-
-        for hw_file in subdir.rglob("*.hw"):
-            if not hw_file.is_file():
-                continue
-
-            try:
-                tree = etree.parse(hw_file)
-                root_element = tree.getroot()
-                # Search for Parameter with ID="ActivateOpcUa" and Value="1" anywhere in the XML tree
-                matches = root_element.xpath(
-                    ".//*[local-name()='Parameter'][@ID='ActivateOpcUa'][@Value='1']"
-                )
-
-                if matches:
-                    if len(output_model1) == 0:
-                        output_model1 += (
-                            "OPC UA model 1 is not supported in AS6 and will be automatically converted to model 2. "
-                            "This changes the namespace ID for variables."
-                            "\nThe following hardware files have OPC UA model 1 activated:\n"
-                        )
-                    output_model1 += f"\n- {hw_file}"
-
-                    # Check if ImplicitTypeCast parameter is explicitly set
-                    # In AS4, the default is "on" (parameter not present means activated)
-                    # In AS6, the default is "deactivated"
-                    # If the parameter is not present, inform the user about the behavior change
-                    implicit_typecast_param = root_element.xpath(
-                        ".//*[local-name()='Parameter'][@ID='OpcUaConversions_ImplicitTypeCast']"
+    for config in index.configurations():
+        for hw_file in index.config_files(config, ".hw"):
+            hardware = load_hardware(hw_file)
+            # Parameter with ID="ActivateOpcUa" and Value="1" in any module
+            if "1" in hardware.parameter_values("ActivateOpcUa"):
+                if len(output_model1) == 0:
+                    output_model1 += (
+                        "OPC UA model 1 is not supported in AS6 and will be automatically converted to model 2. "
+                        "This changes the namespace ID for variables."
+                        "\nThe following hardware files have OPC UA model 1 activated:\n"
                     )
-                    if not implicit_typecast_param:
-                        if len(output_typecast) == 0:
-                            output_typecast += (
-                                '"OPC-UA System -> Conversions -> Implicit Type Cast" uses AS4 default (on). '
-                                "In AS6, the default is deactivated, which may cause 'Bad_TypeMismatch' errors "
-                                "during OPC UA client method calls (e.g., Int64 to Int32 conversions)."
-                                "\nThe following hardware files use the AS4 default:\n"
-                            )
-                        output_typecast += f"\n- {hw_file}"
-
-            except Exception:
-                # Skip files that can't be parsed as XML
-                continue
+                output_model1 += f"\n- {hw_file}"
+
+                # Check if ImplicitTypeCast parameter is explicitly set
+                # In AS4, the default is "on" (parameter not present means activated)
+                # In AS6, the default is "deactivated"
+                # If the parameter is not present, inform the user about the behavior change
+                if hardware.parameter("OpcUaConversions_ImplicitTypeCast") is None:
+                    if len(output_typecast) == 0:
+                        output_typecast += (
+                            '"OPC-UA System -> Conversions -> Implicit Type Cast" uses AS4 default (on). '
+                            "In AS6, the default is deactivated, which may cause 'Bad_TypeMismatch' errors "
+                            "during OPC UA client method calls (e.g., Int64 to Int32 conversions)."
+                            "\nThe following hardware files use the AS4 default:\n"
+                        )
+                    output_typecast += f"\n- {hw_file}"
 
     if output_model1:
         log(output_model1, severity="INFO")
@@ -1,38 +1,39 @@
 import re
 from pathlib import Path
 
-from lxml import etree
-
 from utils import utils
+from utils.apj_model import load_apj
+from utils.project_index import ProjectIndex
 
 
-def check_safety_release(apj_path: Path, log, verbose=False) -> bool:
+def check_safety_release(
+    apj_path: Path, log, verbose=False, index: ProjectIndex | None = None
+) -> bool:
     """
     Checks if the project uses MappSafety or SafetyRelease.
     """
 
     project_root = apj_path.parent
+    index = index or ProjectIndex(project_root)
 
     # 1. Check .apj file in root for MappSafety
     if apj_path:
-        try:
-            tree = etree.parse(apj_path)
-            root = tree.getroot()
-            # Check <mappSafety Version="..."/>
-            if root.find(".//{*}mappSafety") is not None:
-                log(
-                    "Migrating from mapp Safety 5.x to mapp Safety 6.x - "
-                    "All conversion steps are carried out automatically by the system; no action by the user is necessary.",
-                    severity="INFO",
-                )
-                return True  # Valid project
-        except Exception as e:
-            log(f"Failed to parse .apj file: {e}", severity="ERROR")
+        apj = load_apj(apj_path)
+        if apj.error is not None:
+            log(f"Failed to parse .apj file: {apj.error}", severity="ERROR")
+        # Check <mappSafety Version="..."/>
+        elif apj.package("mappSafety") is not None:
+            log(
+                "Migrating from mapp Safety 5.x to mapp Safety 6.x - "
+                "All conversion steps are carried out automatically by the system; no action by the user is necessary.",
+                severity="INFO",
+            )
+            return True  # Valid project
 
     # 2. Search for *.pkg files in the Physical view containing 'SafetyRelease' with version != 0.0
     search_path = project_root / "Physical"
 
-    for file in search_path.rglob("*.pkg"):
+    for file in index.files(".pkg", under=search_path):
         content = utils.read_file(file)
         if 'SafetyRelease="' in content:
             match = re.search(r'SafetyRelease="(\d+)\.(\d+)"', content)
@@ -48,7 +49,7 @@ def check_safety_release(apj_path: Path, log, verbose=False) -> bool:
                 return True
 
     # 3. Check for *.swt files in Physical folders
-    for swt_path in project_root.rglob("*.swt"):
+    for swt_path in index.files(".swt", under=project_root):
         log(
             f"Safety .swt file found but no SafetyRelease or MappSafety version found: {swt_path}",
             severity="WARNING",
@@ -57,7 +58,9 @@ def check_safety_release(apj_path: Path, log, verbose=False) -> bool:
     return False
 
 
-def check_safety(apj_path: Path, log, verbose=False) -> None:
+def check_safety(
+    apj_path: Path, log, verbose=False, index: ProjectIndex | None = None
+) -> None:
     """
     Args:
         apj_path: path of the project file
@@ -68,7 +71,7 @@ def check_safety(apj_path: Path, log, verbose=False) -> None:
 
     log(utils.section_header("safety", "Checking Safety system..."))
 
-    found = check_safety_release(apj_path, log, verbose)
+    found = check_safety_release(apj_path, log, verbose, index)
 
     if not found:
         log("No safety system detected", severity="INFO")
@@ -3,9 +3,13 @@ import re
 from pathlib import Path
 
 from utils import utils
+from utils.hardware_model import load_hardware
+from utils.project_index import ProjectIndex
 
 
-def check_scene_viewer(apj_path: Path, log, verbose: bool = False) -> None:
+def check_scene_viewer(
+    apj_path: Path, log, verbose: bool = False, index: ProjectIndex | None = None
+) -> None:
     """
     Detect whether B&R Scene Viewer is used by the project and, if so,
     inform about the minimum required version and setup steps.
@@ -19,9 +23,10 @@ def check_scene_viewer(apj_path: Path, log, verbose: bool = False) -> None:
     log(utils.section_header("scene-viewer", "Checking Scene Viewer usage..."))
 
     project_root = apj_path.parent
+    index = index or ProjectIndex(project_root)
 
     # ---- 2a) mapp Robotics via .objecthierarchy ----
-    for oh_file in project_root.rglob("*.objecthierarchy"):
+    for oh_file in index.files(".objecthierarchy", under=project_root):
         text = utils.read_file(oh_file)
 
         has_scene_viewer = (
@@ -62,18 +67,9 @@ def check_scene_viewer(apj_path: Path, log, verbose: bool = False) -> None:
 
     # ---- 2b) mapp Trak via .hw ----
     physical_path = project_root / "Physical"
-    for hw_file in physical_path.rglob("*.hw"):
-        text = utils.read_file(hw_file)
-
-        if re.search(
-            r'Name\s*=\s*"FileDeviceName\d+"\s+Value\s*=\s*"SvgData"',
-            text,
-            flags=re.IGNORECASE,
-        ) or re.search(
-            r'FileDeviceName\d+[^<>\r\n]*Value\s*=\s*"SvgData"',
-            text,
-            flags=re.IGNORECASE,
-        ):
+    for hw_file in index.files(".hw", under=physical_path):
+        file_devices = load_hardware(hw_file).find_parameters(r"FileDeviceName\d+")
+        if any(name.lower() == "svgdata" for _, name in file_devices):
             _emit_scene_viewer_message(
                 log=log,
                 origin=f"mapp Trak (.hw): {hw_file}",
@@ -84,7 +80,7 @@ def check_scene_viewer(apj_path: Path, log, verbose: bool = False) -> None:
     # ---- 1) Fallback: any .scn files in Logical view ----
     logical = project_root / "Logical"
     if logical.exists():
-        scn = next(logical.rglob("*.scn"), None)
+        scn = next(iter(index.files(".scn", under=logical)), None)
         if scn:
             _emit_scene_viewer_message(
                 log=log,
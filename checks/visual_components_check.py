@@ -3,13 +3,34 @@ from pathlib import Path
 from lxml import etree
 
 from utils import utils
+from utils.project_index import ProjectIndex
+from utils.scan_engine import ScanEngine
+from utils.xml_cache import xml_cache, xpath
 
 XML_PARSER = etree.XMLParser(
     recover=True, ns_clean=True, remove_blank_text=True, huge_tree=True
 )
 
 
-def check_visual_components(apj_path: Path, log, verbose: bool = False):
+def register_visual_components_rules(engine: ScanEngine, logical_path: Path) -> None:
+    """
+    Registers the per-file scan rules evaluated by check_visual_components.
+    """
+    engine.add(
+        "visual_components.vc4_stack",
+        logical_path,
+        [".st", ".c", ".ab"],
+        find_stack_functions,
+    )
+
+
+def check_visual_components(
+    apj_path: Path,
+    log,
+    verbose: bool = False,
+    index: ProjectIndex | None = None,
+    scan_results: dict | None = None,
+):
     """
     Check for the use of VA_Textout and VA_wcTextout functions.
     """
@@ -19,19 +40,23 @@ def check_visual_components(apj_path: Path, log, verbose: bool = False):
     )
 
     logical_path = apj_path.parent / "Logical"
+    index = index or ProjectIndex(apj_path.parent)
 
-    check_vc3(logical_path, log, verbose)
-    check_vc4(logical_path, log, verbose)
+    if scan_results is None:
+        engine = ScanEngine(index)
+        register_visual_components_rules(engine, logical_path)
+        scan_results = engine.run()
 
+    check_vc3(logical_path, log, verbose, index)
+    check_vc4(logical_path, log, verbose, scan_results)
 
-def check_vc4(logical_path: Path, log, verbose: bool) -> None:
+
+def check_vc4(logical_path: Path, log, verbose: bool, scan_results: dict) -> None:
     """
     Check for used VC4 functions that require increased stack size.
     """
 
-    results = utils.scan_files_parallel(
-        logical_path, [".st", ".c", ".ab"], find_stack_functions
-    )
+    results = scan_results["visual_components.vc4_stack"]
 
     found = {}
     if results:
@@ -58,19 +83,22 @@ def check_vc4(logical_path: Path, log, verbose: bool) -> None:
         log("No VA_Textout or VA_wcTextout functions found.")
 
 
-def check_vc3(logical_path: Path, log, verbose: bool = False) -> None:
+def check_vc3(
+    logical_path: Path, log, verbose: bool = False, index: ProjectIndex | None = None
+) -> None:
     """
     Check for VC3 usage in the project.
     """
 
     # Walk through all Package.pkg files in the Logical directory
-    for pkg_file in logical_path.rglob("Package.pkg"):
+    index = index or ProjectIndex(logical_path.parent)
+    for pkg_file in index.named("Package.pkg", under=logical_path):
         try:
-            tree = etree.parse(str(pkg_file), parser=XML_PARSER)
+            tree = xml_cache.parse(pkg_file, XML_PARSER)
             root_element = tree.getroot()
-            matches = root_element.xpath(
+            matches = xpath(
                 ".//*[local-name()='Object'][@Type='DataObject'][@Language='Vc3']"
-            )
+            )(root_element)
 
             if matches:
                 log(
@@ -87,9 +115,7 @@ def check_vc3(logical_path: Path, log, verbose: bool = False) -> None:
             continue
 
 
-def find_stack_functions(file_path: Path) -> list:
-    content = utils.read_file(file_path)
-
+def find_stack_functions(file_path: Path, content: str) -> list:
     found = set()
     methods = ["VA_Textout", "VA_wcTextout"]
     for method in methods:
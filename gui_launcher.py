@@ -1,4 +1,5 @@
 import importlib.util
+import multiprocessing
 import os
 import re
 import sys
@@ -97,6 +98,7 @@ class ModernMigrationGUI:
         self.selected_folder = ctk.StringVar()
         self.selected_script = ctk.StringVar(value="Evaluate AS4 project")
         self.verbose_mode = ctk.BooleanVar(value=False)
+        self.profile_mode = ctk.BooleanVar(value=False)
         self.script_ran = ctk.BooleanVar(value=False)
         self.spinner_running = False
         self.spinner_index = 0
@@ -122,6 +124,10 @@ class ModernMigrationGUI:
                 "path": self.resource_path("helpers/mappmotion_update.py"),
                 "requires_project": True,
             },
+            "Run all code migrations": {
+                "path": self.resource_path("helpers/migrate.py"),
+                "requires_project": True,
+            },
             "License checker": {
                 "path": self.resource_path("helpers/license_checker.py"),
                 "requires_project": True,
@@ -380,6 +386,12 @@ class ModernMigrationGUI:
         ctk.CTkCheckBox(
             frame, text="Verbose Mode", variable=self.verbose_mode, font=FIELD_FONT
         ).pack(side="left", padx=10)
+        ctk.CTkCheckBox(
+            frame,
+            text="Performance Report",
+            variable=self.profile_mode,
+            font=FIELD_FONT,
+        ).pack(side="left", padx=10)
         self.run_button = ctk.CTkButton(
             frame,
             text="Run",
@@ -510,9 +522,11 @@ class ModernMigrationGUI:
             # Build sys.argv for the selected script (no restore version)
             sys.argv = ["analyzer", folder]
 
-            # Only the AS4→AS6 analyzer supports/needs --no-file from the GUI
+            # Only the AS4→AS6 analyzer supports/needs --no-file and --profile from the GUI
             if self.selected_script.get() == "Evaluate AS4 project":
                 sys.argv.append("--no-file")
+                if self.profile_mode.get():
+                    sys.argv.append("--profile")
 
             if verbose:
                 sys.argv.append("--verbose")
@@ -886,7 +900,10 @@ class ModernMigrationGUI:
             section_id, {"order": 50, "category": "Other", "icon": "folder"}
         )
 
-        return f"""<details class="section" id="section-{section_id}" open data-total="{total_findings}">
+        # Diagnostic sections like the performance table start collapsed
+        open_attr = "" if meta.get("collapsed") else " open"
+
+        return f"""<details class="section" id="section-{section_id}"{open_attr} data-total="{total_findings}">
             <summary class="section-header">
                 <span class="section-chevron">{self.SVG_ICONS["chevron"]}</span>
                 <span class="section-title">{escape(title)}</span>
@@ -2056,5 +2073,7 @@ a:hover {
 
 
 if __name__ == "__main__":
+    # Required for the process pool in frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
     app = ModernMigrationGUI()
     app.run()
@@ -1,8 +1,14 @@
 import argparse
+import concurrent.futures
+import contextlib
+import hashlib
+import multiprocessing
 import os
 import re
 import sys
+import time
 from pathlib import Path
+from typing import Iterable, Iterator
 
 # Ensure repository root is on sys.path so 'from utils import utils' works when
 # this script is executed directly (e.g., from the helpers directory).
@@ -10,8 +16,10 @@ ROOT = Path(__file__).resolve().parent.parent
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from utils import utils
+from utils import change_set, project_index, utils
+from utils.file_cache import content_cache
 
+from helpers import ab_2_st_lexer as lexer
 from helpers.ab_2_st_converter_ui import (
     apply_config_from_checkbox_selections,
     ask_proceed_with_options,
@@ -184,12 +192,45 @@ def read_latin1(file_path: Path) -> str:
     Falls back to charset detection if Latin-1 decoding fails.
     """
     try:
-        return file_path.read_text(encoding="iso-8859-1")
+        return content_cache.read_text(file_path, encoding="iso-8859-1")
     except Exception:
         # Fallback to charset detection
         return utils.read_file(file_path)
 
 
+def write_latin1(file_path: Path, text: str, newline: str | None = None) -> None:
+    """
+    Write sanitized text using ISO-8859-1 (Latin-1) encoding and drop the
+    file from the content cache, so later reads see the new content.
+    """
+    recording = change_set.active()
+    if recording is not None:
+        text = sanitize_latin1(text).replace("\n", newline or os.linesep)
+        recording.write_bytes(file_path, text.encode("iso-8859-1"), "iso-8859-1")
+        return
+    file_path.write_text(sanitize_latin1(text), encoding="iso-8859-1", newline=newline)
+    content_cache.invalidate(file_path)
+
+
+def _exists(file_path: Path) -> bool:
+    recording = change_set.active()
+    return file_path.exists() if recording is None else recording.exists(file_path)
+
+
+def _disk_path(file_path: Path) -> Path | None:
+    # File holding the current content of file_path, None if only in memory
+    recording = change_set.active()
+    return file_path if recording is None else recording.disk_path(file_path)
+
+
+def _rename(source: Path, target: Path) -> None:
+    recording = change_set.active()
+    if recording is None:
+        source.rename(target)
+    else:
+        recording.rename(source, target)
+
+
 def sanitize_latin1(text: str) -> str:
     """
     Sanitize text for ISO-8859-1 (Latin-1) encoding by replacing characters
@@ -203,9 +244,9 @@ def rename_file(file_path: Path, require_iec: bool = False) -> Path | None:
     # Adjust references in IEC.prg/IEC.lby if present.
     # In standalone directory mode (no *.apj), IEC files might not exist and should not block renaming.
     iec_file = file_path.parent / "IEC.prg"
-    if not iec_file.exists():
+    if not _exists(iec_file):
         iec_file = file_path.parent / "IEC.lby"
-        if not iec_file.exists():
+        if not _exists(iec_file):
             if require_iec:
                 return None
             utils.log(
@@ -215,32 +256,32 @@ def rename_file(file_path: Path, require_iec: bool = False) -> Path | None:
             iec_file = None
 
     if iec_file is not None:
-        text = iec_file.read_text(encoding="iso-8859-1")
+        text = read_latin1(iec_file)
 
         # Replace filename suffixes like 'name.ab' with 'name.st' (word boundary, case-insensitive)
         new_text, count = re.subn(
             r"(?i)(\b[\w/\\.-]+)\.ab\b", lambda m: m.group(1) + ".st", text
         )
         if count:
-            iec_file.write_text(sanitize_latin1(new_text), encoding="iso-8859-1")
+            write_latin1(iec_file, new_text)
             utils.log(f"{count} IEC references updated in: {iec_file}", severity="INFO")
 
     new_file_path = file_path.with_suffix(".st")
     if new_file_path != file_path:
-        if new_file_path.exists():
+        if _exists(new_file_path):
             # If a previous conversion already produced a .st, keep it as a backup
             # instead of failing with FileExistsError.
             backup = new_file_path.with_name(new_file_path.name + ".bak")
             n = 1
-            while backup.exists():
+            while _exists(backup):
                 backup = new_file_path.with_name(new_file_path.name + f".bak{n}")
                 n += 1
-            new_file_path.rename(backup)
+            _rename(new_file_path, backup)
             utils.log(
                 f"Existing output renamed to backup: {backup}",
                 severity="WARNING",
             )
-        file_path.rename(new_file_path)
+        _rename(file_path, new_file_path)
         utils.log(
             f"Renamed file: {file_path} to {new_file_path}",
             severity="INFO",
@@ -248,17 +289,17 @@ def rename_file(file_path: Path, require_iec: bool = False) -> Path | None:
     return new_file_path
 
 
-def fix_comment(file_path: Path):
+def fix_comment(text: str, file_path: Path) -> tuple[str, int]:
     """
     Fix comments by converting:
       - block comments that start with '(*' and end with '*)' into line comments starting with '//'
         * A line that starts with '(*' will have '(*' replaced by '//' on that line.
         * Subsequent lines that start with ' *' will have their leading ' *' replaced by '//'.
         * The closing line (contains '*)') will have '*)' removed and '//' added at the start.
-      - and replace all ';' with '//' anywhere (legacy behavior).
+      - and replace all ';' outside of string literals with '//' (legacy behavior).
+    Returns the new text and the number of changed comments.
     """
-    original_hash = utils.calculate_file_hash(file_path)
-    original_content = read_latin1(file_path)
+    original_content = text
 
     lines = original_content.splitlines(keepends=True)
     new_lines: list[str] = []
@@ -281,6 +322,28 @@ def fix_comment(file_path: Path):
             return s[:-1], "\n"
         return s, ""
 
+    def replace_semicolons(s: str, pattern: re.Pattern) -> tuple[str, int]:
+        """Replace ';' matched by pattern with '//', except inside string literals."""
+        if ";" not in s:
+            return s, 0
+        strings = lexer.string_spans(s, "ab")
+        if not strings:
+            return pattern.subn("//", s)
+        count = 0
+
+        def replace(m: re.Match) -> str:
+            nonlocal count
+            if any(start <= m.start() < end for start, end in strings):
+                return m.group(0)
+            count += 1
+            return "//"
+
+        return pattern.sub(replace, s), count
+
+    # ';' followed by text or only whitespace up to the line end, and followed by text
+    semicolon_any = re.compile(r";(?=\s*(?:\S|$))")
+    semicolon_text = re.compile(r";(?=\s*\S)")
+
     for i, line in enumerate(lines):
         new_line = line
 
@@ -292,9 +355,9 @@ def fix_comment(file_path: Path):
             if re.match(r"^\s*//", prev_line) and re.match(r"^\s*//", next_line):
                 continue
 
-        # If the line already contains '//' anywhere, do not change it.
+        # If the line already contains a '//' comment, do not change it.
         # Still update block state if this is a closing block line.
-        if "//" in line:
+        if lexer.split_comment(line, "ab")[1]:
             if in_block and "*)" in line:
                 in_block = False
             new_lines.append(line)
@@ -324,7 +387,7 @@ def fix_comment(file_path: Path):
                     in_block = True
             else:
                 # Replace ';' when followed by text OR only whitespace to end-of-line
-                new_line, n = re.subn(r";(?=\s*(?:\S|$))", r"//", new_line)
+                new_line, n = replace_semicolons(new_line, semicolon_any)
                 semicolon_replacements += n
 
         else:
@@ -383,7 +446,7 @@ def fix_comment(file_path: Path):
                 block_replacements += 1
 
         # Preserve legacy behavior: convert ';' to '//' only when it's followed by comment text
-        new_line, n = re.subn(r";(?=\s*\S)", r"//", new_line)
+        new_line, n = replace_semicolons(new_line, semicolon_text)
         semicolon_replacements += n
 
         new_lines.append(new_line)
@@ -391,35 +454,25 @@ def fix_comment(file_path: Path):
     modified_content = "".join(new_lines)
 
     if modified_content != original_content:
-        # Keep content normalized to '\n', but write as CRLF for Windows/AS compatibility.
-        # This also avoids producing '\r\r\n' because our content contains no '\r'.
-        file_path.write_text(
-            sanitize_latin1(modified_content), encoding="iso-8859-1", newline="\r\n"
-        )
-
-        new_hash = utils.calculate_file_hash(file_path)
-        if original_hash == new_hash:
-            return
-
         total = semicolon_replacements + block_replacements
         utils.log(f"{total} comments changed in: {file_path}", severity="INFO")
-        return
+        return modified_content, total
 
-    return
+    return text, 0
 
 
-def fix_manual(file_path: Path) -> int:
+def fix_manual(text: str, file_path: Path) -> tuple[str, int]:
     """
     Insert manual-review comments for keywords defined in `KEYWORD_MANUAL_FIX`.
     For each line that contains a keyword (case-insensitive, word-boundary), a comment
     line is inserted *before* the line with the message from the mapping. The comment
     is indented to match the code line.
-    Returns the number of inserted comments.
+    Returns the new text and the number of inserted comments.
     """
     if not KEYWORD_MANUAL_FIX:
-        return 0
+        return text, 0
 
-    original = read_latin1(file_path)
+    original = text
     lines = original.splitlines(keepends=True)
     new_lines: list[str] = []
     total = 0
@@ -469,30 +522,46 @@ def fix_manual(file_path: Path) -> int:
         new_lines.append(line)
 
     if total:
-        file_path.write_text(sanitize_latin1("".join(new_lines)), encoding="iso-8859-1")
+        text = "".join(new_lines)
         utils.log(
             f"{total} manual fix notices added in: {file_path}", severity="WARNING"
         )
 
-    return total
+    return text, total
+
+
+class PassCounter:
+    """Number of changes of a line pass, complete once all its lines were consumed."""
 
+    def __init__(self):
+        self.count = 0
 
-def fix_keywords(file_path: Path, replacements: dict[str, str] | None = None) -> int:
+
+def run_line_pass(line_pass, text: str, file_path: Path, *args) -> tuple[str, int]:
     """
-    Replace keywords in the file according to `replacements` mapping.
+    Run a line pass over a whole text.
+    Returns the new text and the number of changes made.
+    """
+    counter = PassCounter()
+    lines = line_pass(text.splitlines(keepends=True), file_path, counter, *args)
+    return "".join(lines), counter.count
 
-    Replacements are skipped when the matched text is immediately preceded by '#'
-    (e.g. '#ENDIF' is left untouched).
-    Returns the total number of replacements made.
+
+def fix_keywords_lines(
+    lines: Iterable[str],
+    file_path: Path,
+    counter: PassCounter,
+    replacements: dict[str, str] | None = None,
+) -> Iterator[str]:
+    """
+    Line pass of fix_keywords: yields the converted lines.
     """
     if replacements is None:
         replacements = KEYWORD_REPLACEMENTS
 
     if not replacements:
-        return 0
-
-    original_content = read_latin1(file_path)
-    lines = original_content.splitlines(keepends=True)
+        yield from lines
+        return
 
     # Precompile patterns once for speed and consistent behavior.
     # We apply word-boundaries only when they make sense (i.e. when the token
@@ -518,183 +587,151 @@ def fix_keywords(file_path: Path, replacements: dict[str, str] | None = None) ->
             total_local += count
         return out, total_local
 
-    def _process_preserving_comments(
-        line_text: str, in_block: bool
-    ) -> tuple[str, int, bool]:
-        """Apply replacements only to code parts, preserving // and (*...*) comments."""
-
-        i = 0
-        out_parts: list[str] = []
-        count_total = 0
-
-        while i < len(line_text):
-            if in_block:
-                end = line_text.find("*)", i)
-                if end == -1:
-                    out_parts.append(line_text[i:])
-                    return "".join(out_parts), count_total, True
-
-                out_parts.append(line_text[i : end + 2])
-                i = end + 2
-                in_block = False
-                continue
-
-            idx_line = line_text.find("//", i)
-            idx_block = line_text.find("(*", i)
-
-            # No more comments.
-            if idx_line == -1 and idx_block == -1:
-                replaced, c = _apply_replacements(line_text[i:])
-                out_parts.append(replaced)
-                count_total += c
-                break
-
-            # Line comment starts next.
-            if idx_line != -1 and (idx_block == -1 or idx_line < idx_block):
-                replaced, c = _apply_replacements(line_text[i:idx_line])
-                out_parts.append(replaced)
-                count_total += c
-                out_parts.append(line_text[idx_line:])
-                break
-
-            # Block comment starts next.
-            replaced, c = _apply_replacements(line_text[i:idx_block])
-            out_parts.append(replaced)
-            count_total += c
-
-            end = line_text.find("*)", idx_block + 2)
-            if end == -1:
-                out_parts.append(line_text[idx_block:])
-                in_block = True
-                break
-
-            out_parts.append(line_text[idx_block : end + 2])
-            i = end + 2
-
-        return "".join(out_parts), count_total, in_block
-
     total_replacements = 0
-    in_block_comment = False
-    new_lines: list[str] = []
-
-    for line in lines:
-        if line.endswith("\r\n"):
-            newline = "\r\n"
-            base = line[:-2]
-        elif line.endswith("\n"):
-            newline = "\n"
-            base = line[:-1]
-        else:
-            newline = ""
-            base = line
-
-        processed, c, in_block_comment = _process_preserving_comments(
-            base, in_block_comment
-        )
-        total_replacements += c
-        new_lines.append(processed + newline)
 
+    # AB strings are part of the code, e.g. '"' -> "'" has to apply to them
+    for runs in lexer.code_runs_lines(lines, "ab"):
+        new_parts: list[str] = []
+        for is_code, run in runs:
+            if is_code:
+                run, c = _apply_replacements(run)
+                total_replacements += c
+            new_parts.append(run)
+        yield "".join(new_parts)
+
+    counter.count = total_replacements
     if total_replacements:
-        file_path.write_text(
-            sanitize_latin1("".join(new_lines)),
-            encoding="iso-8859-1",
-        )
         utils.log(
             f"{total_replacements} keyword replacements in: {file_path}",
             severity="INFO",
         )
 
-    return total_replacements
 
+def fix_keywords(
+    text: str, file_path: Path, replacements: dict[str, str] | None = None
+) -> tuple[str, int]:
+    """
+    Replace keywords in the file according to `replacements` mapping.
 
-def fix_upper_case(file_path: Path, keywords: list[str] | None = None) -> int:
+    Replacements are skipped when the matched text is immediately preceded by '#'
+    (e.g. '#ENDIF' is left untouched).
+    Returns the new text and the total number of replacements made.
     """
-    Convert occurrences of keywords in `keywords` to upper-case (word-boundary, case-insensitive).
-    Does not alter text inside line-comments starting with '//' (preserves comments as-is).
-    Skips matches that are immediately preceded by '#'.
-    Returns the number of actual changes made (only counts when text was actually modified).
+    return run_line_pass(fix_keywords_lines, text, file_path, replacements)
+
+
+def fix_upper_case_lines(
+    lines: Iterable[str],
+    file_path: Path,
+    counter: PassCounter,
+    keywords: list[str] | None = None,
+) -> Iterator[str]:
+    """
+    Line pass of fix_upper_case: yields the converted lines.
     """
     if keywords is None:
         keywords = MAKE_UPPER_CASE
 
     if not keywords:
-        return 0
+        yield from lines
+        return
 
-    original = read_latin1(file_path)
-    lines = original.splitlines(keepends=True)
-    new_lines: list[str] = []
-    total = 0
+    # Upper-case spelling per lowercase name. A keyword ending with '(' only matches
+    # function calls, one starting/ending with a space only a name with whitespace there.
+    plain: dict[str, tuple[str, bool, bool]] = {}
+    calls: dict[str, str] = {}
+    for kw in keywords:
+        name = kw.strip()
+        if name.endswith("("):
+            calls[name[:-1].lower()] = name[:-1].upper()
+        elif name:
+            plain[name.lower()] = (name.upper(), kw.startswith(" "), kw.endswith(" "))
 
-    for line in lines:
-        # Split line into code and comment parts (keep comment unchanged)
-        idx = line.find("//")
-        if idx != -1:
-            code = line[:idx]
-            comment = line[idx:]
-        else:
-            code = line
-            comment = ""
+    def is_space(token: lexer.Token | None) -> bool:
+        return token is not None and token.kind in (lexer.SPACE, lexer.NEWLINE)
 
-        modified_code = code
-
-        for kw in keywords:
-            if not kw:
-                continue
-            # If the keyword begins or ends with whitespace, require whitespace there
-            # (e.g., ' OR ' should only match when preceded and followed by spaces).
-            if kw.startswith(" ") or kw.endswith(" "):
-                left_look = r"(?<=\s)" if kw.startswith(" ") else ""
-                right_look = r"(?=\s)" if kw.endswith(" ") else ""
-                inner = re.escape(kw.strip())
-                pattern = left_look + r"(?<!#)" + inner + right_look
-                repl = kw.strip().upper()
-
-                # Custom replacement that only counts actual changes
-                def replace_func(match):
-                    nonlocal total
-                    original_text = match.group(0)
-                    if original_text != repl:
-                        total += 1
-                    return repl
-
-                modified_code = re.sub(
-                    pattern, replace_func, modified_code, flags=re.IGNORECASE
-                )
-            else:
-                # Use lookarounds that prevent letters and digits before/after the keyword.
-                # This allows parentheses, operators, spaces etc. but prevents matching
-                # inside longer identifiers (e.g., 'COMMAND' should not match 'AND').
-                # Only apply trailing lookahead when kw ends with a word char.
-                if re.search(r"\w$", kw):
-                    pattern = (
-                        r"(?<![#a-zA-Z0-9_])" + re.escape(kw) + r"(?![a-zA-Z0-9_])"
-                    )
-                else:
-                    pattern = r"(?<![#a-zA-Z0-9_])" + re.escape(kw)
-
-                # Custom replacement that only counts actual changes
-                def replace_func(match):
-                    nonlocal total
-                    original_text = match.group(0)
-                    upper_text = kw.upper()
-                    if original_text != upper_text:
-                        total += 1
-                    return upper_text
-
-                modified_code = re.sub(
-                    pattern, replace_func, modified_code, flags=re.IGNORECASE
-                )
+    total = 0
 
-        new_lines.append(modified_code + comment)
+    for line, tokens in lexer.tokenize_lines(lines, "st"):
+        new_parts: list[str] = []
+        for i, token in enumerate(tokens):
+            word = token.text
+            prev_token = tokens[i - 1] if i else None
+            if token.kind == lexer.IDENTIFIER and not (
+                prev_token is not None and prev_token.text.endswith("#")
+            ):
+                next_token = tokens[i + 1] if i + 1 < len(tokens) else None
+                key = word.lower()
+                if key in calls and next_token is not None and next_token.text == "(":
+                    word = calls[key]
+                elif key in plain:
+                    upper, space_before, space_after = plain[key]
+                    if (not space_before or is_space(prev_token)) and (
+                        not space_after or is_space(next_token)
+                    ):
+                        word = upper
+                if word != token.text:
+                    total += 1
+            new_parts.append(word)
+        yield "".join(new_parts)
 
+    counter.count = total
     if total:
-        file_path.write_text(sanitize_latin1("".join(new_lines)), encoding="iso-8859-1")
         utils.log(f"{total} upper-case replacements in: {file_path}", severity="INFO")
 
-    return total
+
+def fix_upper_case(
+    text: str, file_path: Path, keywords: list[str] | None = None
+) -> tuple[str, int]:
+    """
+    Convert occurrences of keywords in `keywords` to upper-case (whole identifiers, case-insensitive).
+    Does not alter comments and string literals (preserves them as-is).
+    Skips matches that are immediately preceded by '#'.
+    Returns the new text and the number of actual changes made (only counts when text was actually modified).
+    """
+    return run_line_pass(fix_upper_case_lines, text, file_path, keywords)
+
+
+def fix_numbers_lines(
+    lines: Iterable[str], file_path: Path, counter: PassCounter
+) -> Iterator[str]:
+    """
+    Line pass of fix_numbers: yields the converted lines.
+    """
+    hex_count = 0
+    bin_count = 0
+
+    # Match '$' followed by hex digits with optional '_' separators, followed by a word boundary
+    hex_pattern = re.compile(r"\$([0-9A-Fa-f]+(?:_[0-9A-Fa-f]+)*)\b")
+    # Match '%' followed by binary digits with optional '_' separators, followed by a word boundary
+    bin_pattern = re.compile(r"%([01]+(?:_[01]+)*)\b")
+
+    for line in lines:
+        line, n = hex_pattern.subn(lambda m: "16#" + m.group(1), line)
+        hex_count += n
+        line, n = bin_pattern.subn(lambda m: "2#" + m.group(1), line)
+        bin_count += n
+        yield line
+
+    counter.count = hex_count + bin_count
+    if hex_count and bin_count:
+        utils.log(
+            f"{hex_count} hex ($ -> 16#) and {bin_count} binary (% -> 2#) conversions in: {file_path}",
+            severity="INFO",
+        )
+    elif hex_count:
+        utils.log(
+            f"{hex_count} hex number conversions ($ -> 16#) in: {file_path}",
+            severity="INFO",
+        )
+    elif bin_count:
+        utils.log(
+            f"{bin_count} binary number conversions (% -> 2#) in: {file_path}",
+            severity="INFO",
+        )
 
 
-def fix_numbers(file_path: Path) -> int:
+def fix_numbers(text: str, file_path: Path) -> tuple[str, int]:
     """
     Replace hex numeric literals that use the `$` prefix (e.g. `$FF`) with the
     `16#FF` notation, and binary literals that use the `%` prefix (e.g. `%1010`)
@@ -704,58 +741,20 @@ def fix_numbers(file_path: Path) -> int:
     `$DEAD_BEEF`). Underscores are preserved in the output.
 
     Uses word-boundary matching so trailing characters are not accidentally
-    captured. Returns number of replacements.
+    captured. Returns the new text and the number of replacements.
     """
-    original = read_latin1(file_path)
-    total_count = 0
-
-    # Match '$' followed by hex digits with optional '_' separators, followed by a word boundary
-    hex_pattern = r"\$([0-9A-Fa-f]+(?:_[0-9A-Fa-f]+)*)\b"
-    modified, hex_count = re.subn(
-        hex_pattern,
-        lambda m: "16#" + m.group(1),
-        original,
-    )
-    total_count += hex_count
+    # The literals never span a line break, so the whole text is converted as one line
+    counter = PassCounter()
+    text = "".join(fix_numbers_lines([text], file_path, counter))
+    return text, counter.count
 
-    # Match '%' followed by binary digits with optional '_' separators, followed by a word boundary
-    bin_pattern = r"%([01]+(?:_[01]+)*)\b"
-    modified, bin_count = re.subn(
-        bin_pattern,
-        lambda m: "2#" + m.group(1),
-        modified,
-    )
-    total_count += bin_count
 
-    if total_count:
-        file_path.write_text(sanitize_latin1(modified), encoding="iso-8859-1")
-        if hex_count and bin_count:
-            utils.log(
-                f"{hex_count} hex ($ -> 16#) and {bin_count} binary (% -> 2#) conversions in: {file_path}",
-                severity="INFO",
-            )
-        elif hex_count:
-            utils.log(
-                f"{hex_count} hex number conversions ($ -> 16#) in: {file_path}",
-                severity="INFO",
-            )
-        elif bin_count:
-            utils.log(
-                f"{bin_count} binary number conversions (% -> 2#) in: {file_path}",
-                severity="INFO",
-            )
-    return total_count
-
-
-def fix_math_functions(file_path: Path) -> int:
+def fix_math_functions_lines(
+    lines: Iterable[str], file_path: Path, counter: PassCounter
+) -> Iterator[str]:
     """
-    Replace standalone INC(expr) with 'expr := expr + 1' and DEC(expr) with 'expr := expr - 1'.
-    Only performs replacement when the INC/DEC is the only code on that line (ignoring trailing comments and spaces).
-    Returns the number of replacements made.
+    Line pass of fix_math_functions: yields the converted lines.
     """
-    original = read_latin1(file_path)
-    lines = original.splitlines(keepends=True)
-    new_lines: list[str] = []
     total = 0
 
     inc_re = re.compile(r"^\s*INC\s*\(\s*([^\)]+?)\s*\)\s*;?\s*$", flags=re.IGNORECASE)
@@ -773,13 +772,7 @@ def fix_math_functions(file_path: Path) -> int:
             newline = ""
             content = line
 
-        idx = content.find("//")
-        if idx != -1:
-            code = content[:idx]
-            comment = content[idx:]
-        else:
-            code = content
-            comment = ""
+        code, comment = lexer.split_comment(content)
 
         m_inc = inc_re.match(code)
         m_dec = dec_re.match(code)
@@ -791,9 +784,7 @@ def fix_math_functions(file_path: Path) -> int:
             new_before = leading_ws + f"{expr} := {expr} + 1"
             if has_semicolon:
                 new_before += ";"
-            new_lines.append(
-                new_before + ("" if comment == "" else " " + comment) + newline
-            )
+            yield new_before + ("" if comment == "" else " " + comment) + newline
             total += 1
             continue
         if m_dec:
@@ -804,22 +795,27 @@ def fix_math_functions(file_path: Path) -> int:
             new_before = leading_ws + f"{expr} := {expr} - 1"
             if has_semicolon:
                 new_before += ";"
-            new_lines.append(
-                new_before + ("" if comment == "" else " " + comment) + newline
-            )
+            yield new_before + ("" if comment == "" else " " + comment) + newline
             total += 1
             continue
 
-        new_lines.append(line)
+        yield line
 
+    counter.count = total
     if total:
-        file_path.write_text(sanitize_latin1("".join(new_lines)), encoding="iso-8859-1")
         utils.log(f"{total} INC/DEC conversions in: {file_path}", severity="INFO")
 
-    return total
+
+def fix_math_functions(text: str, file_path: Path) -> tuple[str, int]:
+    """
+    Replace standalone INC(expr) with 'expr := expr + 1' and DEC(expr) with 'expr := expr - 1'.
+    Only performs replacement when the INC/DEC is the only code on that line (ignoring trailing comments and spaces).
+    Returns the new text and the number of replacements made.
+    """
+    return run_line_pass(fix_math_functions_lines, text, file_path)
 
 
-def fix_select(file_path: Path) -> int:
+def fix_select(text: str, file_path: Path) -> tuple[str, int]:
     """
     Transform SELECT/STATE/WHEN/NEXT patterns into CASE/labels/IF/assignment blocks.
 
@@ -832,10 +828,9 @@ def fix_select(file_path: Path) -> int:
     - NEXT value4          -> value1 := value4;  (value1 is the last SELECT value)
       and add a following line with END_IF
 
-    Returns total number of replacements. If at least one replacement happens,
-    the file is rewritten in 'iso-8859-1'.
+    Returns the new text and the total number of replacements.
     """
-    original = read_latin1(file_path)
+    original = text
     lines = original.splitlines(keepends=True)
 
     new_lines: list[str] = []
@@ -977,8 +972,8 @@ def fix_select(file_path: Path) -> int:
                 last_text = f"{last_text} THEN"
             cond_lines[-1] = (last_text, last_tail)
 
-            for text, tail in cond_lines:
-                new_lines.append(f"{text}{tail}\n")
+            for cond_text, tail in cond_lines:
+                new_lines.append(f"{cond_text}{tail}\n")
 
             total += 1
             i += 1
@@ -1024,16 +1019,16 @@ def fix_select(file_path: Path) -> int:
         i += 1
 
     if total:
-        file_path.write_text(sanitize_latin1("".join(new_lines)), encoding="iso-8859-1")
+        text = "".join(new_lines)
         utils.log(
             f"{total} SELECT/STATE/WHEN/NEXT transformations in: {file_path}",
             severity="INFO",
         )
 
-    return total
+    return text, total
 
 
-def fix_case(file_path: Path) -> int:
+def fix_case(text: str, file_path: Path) -> tuple[str, int]:
     """Fix CASE...ENDCASE blocks by converting AB action keywords.
 
     Between CASE and ENDCASE (case-insensitive):
@@ -1045,7 +1040,7 @@ def fix_case(file_path: Path) -> int:
     No replacements are performed outside CASE...ENDCASE.
     """
 
-    original = read_latin1(file_path)
+    original = text
     lines = original.splitlines(keepends=True)
 
     re_case_start = re.compile(r"\bCASE\b", flags=re.IGNORECASE)
@@ -1082,14 +1077,7 @@ def fix_case(file_path: Path) -> int:
         # Split code and comment (respect both '//' and '(*').
         # Include whitespace immediately before the comment marker in the comment part
         # so we don't accidentally delete spacing when we normalize code.
-        idx_line = base.find("//")
-        idx_block = base.find("(*")
-
-        comment_idx = -1
-        if idx_block != -1 and (idx_line == -1 or idx_block < idx_line):
-            comment_idx = idx_block
-        elif idx_line != -1:
-            comment_idx = idx_line
+        comment_idx = lexer.comment_start(base)
 
         if comment_idx != -1:
             ws_start = comment_idx
@@ -1142,15 +1130,15 @@ def fix_case(file_path: Path) -> int:
         new_lines.append(new_code + comment + newline)
 
     if total:
-        file_path.write_text(sanitize_latin1("".join(new_lines)), encoding="iso-8859-1")
+        text = "".join(new_lines)
         utils.log(f"{total} CASE/ENDCASE conversions in: {file_path}", severity="INFO")
 
-    return total
+    return text, total
 
 
 def fix_equals(
-    file_path: Path, ignore_pairs: list[tuple[str, str]] | None = None
-) -> int:
+    text: str, file_path: Path, ignore_pairs: list[tuple[str, str]] | None = None
+) -> tuple[str, int]:
     """
     Replace the FIRST single '=' with ':=' in each statement. A statement can span
     multiple lines and ends with ';'. Only the first '=' per statement is converted,
@@ -1162,12 +1150,12 @@ def fix_equals(
            (b = 2) THEN
 
     Also ignores lines where the code ends with a backslash '\'.
-    Returns number of replacements.
+    Returns the new text and the number of replacements.
     """
     if ignore_pairs is None:
         ignore_pairs = IGNORE_EQUALS_PAIRS
 
-    original_content = read_latin1(file_path)
+    original_content = text
 
     # Build patterns for start and end keywords
     start_patterns: list[tuple[str, re.Pattern]] = []
@@ -1191,13 +1179,23 @@ def fix_equals(
 
     # Pattern to find statement terminators: ';' or 'DO' (word boundary)
     statement_end_pattern = re.compile(r";|\bDO\b", flags=re.IGNORECASE)
+    # The first single '=' of a statement (not part of ':=', '==', '<=', '>=')
+    assignment_pattern = re.compile(r"(?<![:=<>])=(?!=)")
 
-    def find_statement_end(text: str, start_pos: int) -> tuple[int, int] | None:
+    def find_statement_end(
+        text: str, start_pos: int, strings: list[tuple[int, int]], offset: int = 0
+    ) -> tuple[int, int] | None:
         """Find the next statement terminator (';' or 'DO') in text starting at start_pos.
+        Terminators inside string literals are skipped; strings are the spans of the
+        literals in the line's code, in which text starts at offset.
         Returns (start_index, end_index) of the match, or None if not found."""
-        match = statement_end_pattern.search(text, start_pos)
-        if match:
-            return (match.start(), match.end())
+        if not strings:
+            match = statement_end_pattern.search(text, start_pos)
+            return match.span() if match else None
+        for match in statement_end_pattern.finditer(text, start_pos):
+            position = match.start() + offset
+            if not any(start <= position < end for start, end in strings):
+                return (match.start(), match.end())
         return None
 
     for line in lines:
@@ -1213,13 +1211,7 @@ def fix_equals(
         line_content = line.rstrip("\r\n")
 
         # Split line into code and comment parts
-        idx = line_content.find("//")
-        if idx != -1:
-            code = line_content[:idx]
-            comment = line_content[idx:]
-        else:
-            code = line_content
-            comment = ""
+        code, comment = lexer.split_comment(line_content)
 
         # Check if code ends with backslash (line continuation)
         if code.rstrip().endswith("\\"):
@@ -1229,6 +1221,7 @@ def fix_equals(
         # Process code character by character, tracking ignore regions and statements
         new_code = ""
         pos = 0
+        strings = lexer.string_spans(code)
 
         while pos < len(code):
             # If we're in an ignore region, look for the end keyword
@@ -1258,7 +1251,7 @@ def fix_equals(
                         earliest_kw = start_kw
 
                 # Also look for statement end (';' or 'DO')
-                stmt_end = find_statement_end(code, pos)
+                stmt_end = find_statement_end(code, pos, strings)
                 stmt_end_pos = stmt_end[0] if stmt_end else -1
 
                 if earliest_start and (
@@ -1269,15 +1262,15 @@ def fix_equals(
                     before = code[pos : earliest_start.start()]
 
                     # Check for statement terminators in the 'before' section
-                    stmt_end_in_before = find_statement_end(before, 0)
+                    stmt_end_in_before = find_statement_end(before, 0, strings, pos)
                     if stmt_end_in_before:
                         # Process up to and including terminator
                         before_term = before[: stmt_end_in_before[1]]
                         after_term = before[stmt_end_in_before[1] :]
 
                         if not replaced_in_statement:
-                            replaced, n = re.subn(
-                                r"(?<![:=<>])=(?!=)", ":=", before_term, count=1
+                            replaced, n = assignment_pattern.subn(
+                                ":=", before_term, count=1
                             )
                             if n > 0:
                                 replaced_in_statement = True
@@ -1291,8 +1284,8 @@ def fix_equals(
 
                         # Process rest after terminator
                         if not replaced_in_statement:
-                            replaced, n = re.subn(
-                                r"(?<![:=<>])=(?!=)", ":=", after_term, count=1
+                            replaced, n = assignment_pattern.subn(
+                                ":=", after_term, count=1
                             )
                             if n > 0:
                                 replaced_in_statement = True
@@ -1302,9 +1295,7 @@ def fix_equals(
                             new_code += after_term
                     else:
                         if not replaced_in_statement:
-                            replaced, n = re.subn(
-                                r"(?<![:=<>])=(?!=)", ":=", before, count=1
-                            )
+                            replaced, n = assignment_pattern.subn(":=", before, count=1)
                             if n > 0:
                                 replaced_in_statement = True
                                 total += n
@@ -1337,8 +1328,8 @@ def fix_equals(
                     before_term = code[pos : stmt_end[1]]
 
                     if not replaced_in_statement:
-                        replaced, n = re.subn(
-                            r"(?<![:=<>])=(?!=)", ":=", before_term, count=1
+                        replaced, n = assignment_pattern.subn(
+                            ":=", before_term, count=1
                         )
                         if n > 0:
                             replaced_in_statement = True
@@ -1354,7 +1345,7 @@ def fix_equals(
                     # No start keyword and no statement end - process rest of line
                     rest = code[pos:]
                     if not replaced_in_statement:
-                        replaced, n = re.subn(r"(?<![:=<>])=(?!=)", ":=", rest, count=1)
+                        replaced, n = assignment_pattern.subn(":=", rest, count=1)
                         if n > 0:
                             replaced_in_statement = True
                             total += n
@@ -1368,25 +1359,20 @@ def fix_equals(
         new_lines.append(new_line)
 
     if total:
-        file_path.write_text(sanitize_latin1("".join(new_lines)), encoding="iso-8859-1")
+        text = "".join(new_lines)
         utils.log(f"{total} equals replaced by ':=' in: {file_path}", severity="INFO")
 
-    return total
+    return text, total
 
 
-def fix_semicolon(file_path: Path, ignore_keywords: list[str] | None = None) -> int:
+def fix_semicolon_lines(
+    lines: Iterable[str],
+    file_path: Path,
+    counter: PassCounter,
+    ignore_keywords: list[str] | None = None,
+) -> Iterator[str]:
     """
-    Add ';' at the end of each non-empty code line. If a line contains an inline
-    '//' comment, insert ';' right after the code and before the comment (preserve
-    any spaces between code and comment). Ignore lines that start with '//' and
-    contain any of `ignore_keywords` (word-boundary matches).
-
-    Additionally:
-    - Detect and remove a trailing '\' at the end of the *code part* (before any '//' comment),
-      even on lines that match ignore_keywords (so control-structure lines are cleaned).
-    - If a trailing '\' was detected on a line, do NOT add a semicolon to that line.
-
-    Returns number of semicolons added.
+    Line pass of fix_semicolon: yields the converted lines.
     """
     if ignore_keywords is None:
         ignore_keywords = IGNORE_SEMICOLON_KEYWORDS
@@ -1396,9 +1382,6 @@ def fix_semicolon(file_path: Path, ignore_keywords: list[str] | None = None) ->
         pattern = r"\b(" + "|".join(re.escape(k) for k in ignore_keywords) + r")\b"
         ignore_pattern = re.compile(pattern, flags=re.IGNORECASE)
 
-    original = read_latin1(file_path)
-    lines = original.splitlines(keepends=True)
-    new_lines: list[str] = []
     total = 0
 
     # Track multi-line control-structure headers so we don't append semicolons to
@@ -1454,23 +1437,21 @@ def fix_semicolon(file_path: Path, ignore_keywords: list[str] | None = None) ->
             s = s[:-1].rstrip()
         return s, had_backslash
 
-    for line in lines:
+    def convert_line(line: str) -> str:
+        nonlocal total
+
         stripped = line.lstrip()
         # Skip completely empty lines (contain only whitespace/newline)
         if stripped == "":
-            new_lines.append(line)
-            continue
+            return line
 
         # Pure comment lines (start with //) stay unchanged
         if stripped.startswith("//"):
-            new_lines.append(line)
-            continue
+            return line
 
         # Split into code and comment parts
-        idx = line.find("//")
-        if idx != -1:
-            before = line[:idx]
-            comment = line[idx:]
+        before, comment = lexer.split_comment(line)
+        if comment:
             code_only_raw = before.rstrip()
             trailing_spaces = before[len(code_only_raw) :]
 
@@ -1482,8 +1463,7 @@ def fix_semicolon(file_path: Path, ignore_keywords: list[str] | None = None) ->
 
             # If the line matches ignore keywords -> do not add ';', but backslash is removed
             if ignore_pattern and ignore_pattern.search(line):
-                new_lines.append(code_only + trailing_spaces + comment)
-                continue
+                return code_only + trailing_spaces + comment
 
             # Semicolon logic:
             # If a trailing '\' was detected, do NOT add ';'
@@ -1500,7 +1480,7 @@ def fix_semicolon(file_path: Path, ignore_keywords: list[str] | None = None) ->
                 new_before = code_only + ";" + trailing_spaces
                 total += 1
 
-            new_lines.append(new_before + comment)
+            return new_before + comment
 
         else:
             # No inline comment — preserve newline
@@ -1522,8 +1502,7 @@ def fix_semicolon(file_path: Path, ignore_keywords: list[str] | None = None) ->
 
             # If the line matches ignore keywords -> do not add ';', but backslash is removed
             if ignore_pattern and ignore_pattern.search(line):
-                new_lines.append(content + newline)
-                continue
+                return content + newline
 
             # Semicolon logic:
             # If a trailing '\' was detected, do NOT add ';'
@@ -1535,36 +1514,71 @@ def fix_semicolon(file_path: Path, ignore_keywords: list[str] | None = None) ->
                 or had_backslash
                 or header_terminator is not None
             ):
-                new_lines.append(content + newline)
+                return content + newline
             else:
-                new_lines.append(content.rstrip() + ";" + newline)
                 total += 1
+                return content.rstrip() + ";" + newline
 
-    # Build final content and remove any trailing whitespace at EOF
-    content = "".join(new_lines)
-    trimmed = content.rstrip()
-    content_to_write = trimmed
-
-    if content_to_write != original:
-        file_path.write_text(sanitize_latin1(content_to_write), encoding="iso-8859-1")
+    # Remove any trailing whitespace at EOF: hold back the last non-blank line
+    # and the blank lines after it until it is known whether more code follows
+    changed = False
+    last: str | None = None
+    blanks: list[str] = []
+    for line in lines:
+        new_line = convert_line(line)
+        if new_line != line:
+            changed = True
+        if not new_line or new_line.isspace():
+            blanks.append(new_line)
+            continue
+        if last is not None:
+            yield last
+        if blanks:
+            yield from blanks
+            blanks = []
+        last = new_line
+    tail = (last or "") + "".join(blanks)
+    trimmed = tail.rstrip()
+    if trimmed:
+        yield trimmed
+
+    counter.count = total
+    if changed or tail != trimmed:
         utils.log(f"{total} semicolons added in: {file_path}", severity="INFO")
-        if content != content_to_write:
-            utils.log(
-                f"Trailing whitespace removed from end of file: {file_path}",
-                severity="INFO",
-            )
+    if tail != trimmed:
+        utils.log(
+            f"Trailing whitespace removed from end of file: {file_path}",
+            severity="INFO",
+        )
+
+
+def fix_semicolon(
+    text: str, file_path: Path, ignore_keywords: list[str] | None = None
+) -> tuple[str, int]:
+    """
+    Add ';' at the end of each non-empty code line. If a line contains an inline
+    '//' comment, insert ';' right after the code and before the comment (preserve
+    any spaces between code and comment). Ignore lines that start with '//' and
+    contain any of `ignore_keywords` (word-boundary matches).
+
+    Additionally:
+    - Detect and remove a trailing '\' at the end of the *code part* (before any '//' comment),
+      even on lines that match ignore_keywords (so control-structure lines are cleaned).
+    - If a trailing '\' was detected on a line, do NOT add a semicolon to that line.
 
-    return total
+    Returns the new text and the number of semicolons added.
+    """
+    return run_line_pass(fix_semicolon_lines, text, file_path, ignore_keywords)
 
 
-def fix_functionblocks(file_path: Path) -> int:
+def fix_functionblocks(text: str, file_path: Path) -> tuple[str, int]:
     """
     Searches (case-insensitive) for ' FUB ' in the code part of a line.
     Removes everything from ' FUB ' onwards and appends '();' at the end of the remaining code.
     Existing end-of-line comments (// ...) remain unchanged.
-    Returns the number of modified lines.
+    Returns the new text and the number of modified lines.
     """
-    original_content = read_latin1(file_path)
+    original_content = text
     lines = original_content.splitlines(keepends=True)
     new_lines: list[str] = []
     total = 0
@@ -1581,14 +1595,8 @@ def fix_functionblocks(file_path: Path) -> int:
             newline = ""
             base = line
 
-        # Separate code and comment parts
-        idx_comment = base.find("//")
-        if idx_comment != -1:
-            code = base[:idx_comment]
-            comment = base[idx_comment:]  # contains no newline; we add it back below
-        else:
-            code = base
-            comment = ""
+        # Separate code and comment parts (the comment contains no newline; we add it back below)
+        code, comment = lexer.split_comment(base)
 
         # Search for exactly " FUB " (with spaces around it), case-insensitive, only in the code part
         m = re.search(r" FUB ", code, flags=re.IGNORECASE)
@@ -1610,16 +1618,85 @@ def fix_functionblocks(file_path: Path) -> int:
             new_lines.append(line)
 
     if total:
-        file_path.write_text(sanitize_latin1("".join(new_lines)), encoding="iso-8859-1")
+        text = "".join(new_lines)
         utils.log(
             f"{total} lines updated by fix_functionblocks in: {file_path}",
             severity="INFO",
         )
 
-    return total
+    return text, total
 
 
-def fix_string_assignment_conditional_adr(file_path: Path) -> int:
+class DeclarationIndex:
+    """
+    Type hints for the variables declared in the .var and .fun files of one
+    directory. For every word (case-insensitive) it records whether it occurs
+    at all and whether a line mentioning it also contains STRING or UDINT.
+    """
+
+    def __init__(self, folder: Path):
+        self.words: dict[str, tuple[bool, bool, bool]] = {}
+        for ext in ("*.var", "*.fun"):
+            for fp in folder.glob(ext):
+                try:
+                    content = utils.read_file(fp)
+                except Exception:
+                    # If utils.read_file fails on a particular file, skip it safely
+                    continue
+                self._add(content)
+
+    def _add(self, content: str) -> None:
+        # Only type indicators on the SAME line as the variable count
+        for line in content.splitlines():
+            words = {w.lower() for w in re.findall(r"\w+", line)}
+            if not words:
+                continue
+            line_string = "string" in words
+            line_udint = "udint" in words
+            for word in words:
+                _, is_string, is_udint = self.words.get(word, (False, False, False))
+                self.words[word] = (
+                    True,
+                    is_string or line_string,
+                    is_udint or line_udint,
+                )
+
+    def lookup(self, var_name: str) -> tuple[bool, bool, bool]:
+        """
+        Returns a tuple: (found_any, is_string, is_udint). If both STRING and UDINT
+        were seen, STRING takes precedence to "do not modify" in the caller.
+        """
+        return self.words.get(var_name.lower(), (False, False, False))
+
+
+# Declaration indexes per directory, reused for all files of a directory
+_DECLARATION_INDEXES: dict[Path, tuple[tuple, DeclarationIndex]] = {}
+
+
+def get_declaration_index(folder: Path) -> DeclarationIndex:
+    """
+    Return the DeclarationIndex of a directory, rebuilt only when one of its
+    .var/.fun files was added, removed or changed.
+    """
+    stamp = []
+    for ext in ("*.var", "*.fun"):
+        for fp in folder.glob(ext):
+            try:
+                st = fp.stat()
+            except OSError:
+                continue
+            stamp.append((fp.name, st.st_size, st.st_mtime_ns))
+    stamp = tuple(sorted(stamp))
+
+    cached = _DECLARATION_INDEXES.get(folder)
+    if cached is None or cached[0] != stamp:
+        cached = _DECLARATION_INDEXES[folder] = (stamp, DeclarationIndex(folder))
+    return cached[1]
+
+
+def fix_string_assignment_conditional_adr(
+    text: str, file_path: Path
+) -> tuple[str, int]:
     """
     Detects direct assignments of a plain single-quoted string:
         var := '...';
@@ -1635,9 +1712,9 @@ def fix_string_assignment_conditional_adr(file_path: Path) -> int:
            Make sure the variable is of type STRING or add ADR(...) if necessary."
 
     Preserves indentation, spacing, semicolons, and trailing '//' comments.
-    Returns the number of modified lines (including inserted warnings).
+    Returns the new text and the number of modified lines (including inserted warnings).
     """
-    original = read_latin1(file_path)
+    original = text
     lines = original.splitlines(keepends=True)
     new_lines: list[str] = []
     total = 0
@@ -1663,39 +1740,8 @@ def fix_string_assignment_conditional_adr(file_path: Path) -> int:
     # Extract base variable token from LHS (first identifier before any '.', '[', '(' ...)
     base_var_re = re.compile(r"^\s*([A-Za-z_][A-Za-z0-9_]*)")
 
-    # Helpers to determine type by scanning .var/.fun in the same directory
-    def determine_var_type(var_name: str, folder: Path):
-        """
-        Scan .var and .fun files in 'folder' for lines containing the variable token (word-boundary).
-        Returns a tuple: (found_any, is_string, is_udint)
-        """
-        found_any = False
-        is_string = False
-        is_udint = False
-
-        # Build a word-boundary search for the variable name (case-insensitive)
-        var_pat = re.compile(rf"\b{re.escape(var_name)}\b", flags=re.IGNORECASE)
-
-        for ext in ("*.var", "*.fun"):
-            for fp in folder.glob(ext):
-                try:
-                    content = utils.read_file(fp)
-                except Exception:
-                    # If utils.read_file fails on a particular file, skip it safely
-                    continue
-
-                # Check line by line (so we only look at the same line where the variable is mentioned)
-                for line in content.splitlines():
-                    if var_pat.search(line):
-                        found_any = True
-                        # Case-insensitive checks for type indicators on the SAME line
-                        if re.search(r"\bSTRING\b", line, flags=re.IGNORECASE):
-                            is_string = True
-                        if re.search(r"\bUDINT\b", line, flags=re.IGNORECASE):
-                            is_udint = True
-                        # If both are seen somewhere, STRING takes precedence to "do not modify"
-                        # but we don't early-return to collect all evidence.
-        return found_any, is_string, is_udint
+    # Declared types of the variables in the sibling .var/.fun files
+    declarations = get_declaration_index(file_path.parent)
 
     for line in lines:
         # Preserve newline exactly
@@ -1710,13 +1756,7 @@ def fix_string_assignment_conditional_adr(file_path: Path) -> int:
             base = line
 
         # Split code from trailing comment
-        idx_comment = base.find("//")
-        if idx_comment != -1:
-            code = base[:idx_comment]
-            comment = base[idx_comment:]
-        else:
-            code = base
-            comment = ""
+        code, comment = lexer.split_comment(base)
 
         m = assign_re.match(code)
         if not m:
@@ -1742,8 +1782,8 @@ def fix_string_assignment_conditional_adr(file_path: Path) -> int:
 
         var_token = m_base.group(1)
 
-        # Scan sibling .var/.fun files in the same directory
-        found_any, is_string, is_udint = determine_var_type(var_token, file_path.parent)
+        # Look up the declaration in sibling .var/.fun files in the same directory
+        found_any, is_string, is_udint = declarations.lookup(var_token)
 
         if is_string:
             # Variable is STRING -> leave code unchanged
@@ -1765,18 +1805,18 @@ def fix_string_assignment_conditional_adr(file_path: Path) -> int:
         total += 1
 
     if total:
-        file_path.write_text(sanitize_latin1("".join(new_lines)), encoding="iso-8859-1")
+        text = "".join(new_lines)
         utils.log(
             f"{total} conditional ADR conversions/warnings in: {file_path}",
             severity="INFO",
         )
 
-    return total
+    return text, total
 
 
 def fix_string_to_adr_in_whitelisted_funcs(
-    file_path: Path, func_whitelist: list[str] | None = None
-) -> int:
+    text: str, file_path: Path, func_whitelist: list[str] | None = None
+) -> tuple[str, int]:
     """
     Converts ALL string literals ('...') in the argument lists of whitelisted functions
     to ADR('...'), unless ADR('...') is already present.
@@ -1790,15 +1830,15 @@ def fix_string_to_adr_in_whitelisted_funcs(
       directly at an argument boundary (beginning of argument list or after a comma).
       This minimizes unintended replacements in complex expressions.
 
-    Returns: Number of modified lines.
+    Returns: The new text and the number of modified lines.
     """
     if func_whitelist is None:
         func_whitelist = STRING_TO_ADR_FUNC_WHITELIST
 
     if not func_whitelist:
-        return 0
+        return text, 0
 
-    original = read_latin1(file_path)
+    original = text
     lines = original.splitlines(keepends=True)
     new_lines: list[str] = []
     total = 0
@@ -1835,13 +1875,7 @@ def fix_string_to_adr_in_whitelisted_funcs(
             base = line
 
         # Separate code vs. comment (comment remains unchanged)
-        idx = base.find("//")
-        if idx != -1:
-            code = base[:idx]
-            comment = base[idx:]
-        else:
-            code = base
-            comment = ""
+        code, comment = lexer.split_comment(base)
 
         changed_line = False
         new_code = code
@@ -1905,16 +1939,16 @@ def fix_string_to_adr_in_whitelisted_funcs(
             new_lines.append(line)
 
     if total:
-        file_path.write_text(sanitize_latin1("".join(new_lines)), encoding="iso-8859-1")
+        text = "".join(new_lines)
         utils.log(
             f"{total} ADR conversions for whitelisted function arguments in: {file_path}",
             severity="INFO",
         )
 
-    return total
+    return text, total
 
 
-def fix_exitif(file_path: Path) -> int:
+def fix_exitif(text: str, file_path: Path) -> tuple[str, int]:
     """
     Rewrites lines of the form:
         EXITIF <condition> [;] [// comment]
@@ -1924,9 +1958,9 @@ def fix_exitif(file_path: Path) -> int:
     - Case-insensitive match for 'EXITIF'
     - Preserves original indentation and end-of-line comment
     - Preserves newline characters
-    - Returns number of lines modified
+    - Returns the new text and the number of lines modified
     """
-    original = read_latin1(file_path)
+    original = text
     lines = original.splitlines(keepends=True)
     new_lines: list[str] = []
     total = 0
@@ -1956,13 +1990,7 @@ def fix_exitif(file_path: Path) -> int:
             base = line
 
         # Split code vs trailing comment (comment remains unchanged)
-        cidx = base.find("//")
-        if cidx != -1:
-            code = base[:cidx]
-            comment = base[cidx:]  # includes the '//' prefix
-        else:
-            code = base
-            comment = ""
+        code, comment = lexer.split_comment(base)  # comment includes the '//' prefix
 
         m = pattern.match(code)
         if not m:
@@ -1981,15 +2009,15 @@ def fix_exitif(file_path: Path) -> int:
         total += 1
 
     if total:
-        file_path.write_text(sanitize_latin1("".join(new_lines)), encoding="iso-8859-1")
+        text = "".join(new_lines)
         utils.log(
             f"{total} EXITIF rewrites to 'IF ... THEN' in: {file_path}", severity="INFO"
         )
 
-    return total
+    return text, total
 
 
-def fix_loop(file_path: Path) -> int:
+def fix_loop(text: str, file_path: Path) -> tuple[str, int]:
     """
     Searches for 'LOOP' and replaces it with 'FOR', as well as 'ENDLOOP' with 'END_FOR'.
     Special case: If no further code follows 'LOOP' (only whitespace, ';' or '\'),
@@ -1998,10 +2026,10 @@ def fix_loop(file_path: Path) -> int:
       // ### CONVERSION ERROR ### This code snippet can not be converted automatically.
       // Use REPEAT...END_REPEAT or WHILE...END_WHILE instead.
 
-    Comments are not modified. Returns the number of changes made
-        (replacements + inserted comment lines).
+    Comments are not modified. Returns the new text and the number of changes
+    made (replacements + inserted comment lines).
     """
-    original = read_latin1(file_path)
+    original = text
     lines = original.splitlines(keepends=True)
     new_lines: list[str] = []
     conversions = 0
@@ -2030,13 +2058,7 @@ def fix_loop(file_path: Path) -> int:
             base = line
 
         # Separate code vs. comment
-        idx = base.find("//")
-        if idx != -1:
-            code = base[:idx]
-            comment = base[idx:]  # Comment remains unchanged
-        else:
-            code = base
-            comment = ""
+        code, comment = lexer.split_comment(base)  # Comment remains unchanged
 
         # Check special case: 'LOOP' at the start of the line (in code part)
         m_start = re_loop_at_start.match(code)
@@ -2070,18 +2092,67 @@ def fix_loop(file_path: Path) -> int:
 
     total_changes = conversions + warnings
     if total_changes:
-        file_path.write_text(sanitize_latin1("".join(new_lines)), encoding="iso-8859-1")
+        text = "".join(new_lines)
         utils.log(
             f"{conversions} LOOP/ENDLOOP conversions, {warnings} warnings inserted in: {file_path}",
             severity="INFO",
         )
 
-    return total_changes
+    return text, total_changes
+
+
+# Conversion passes in the order they are applied: (config key, pass, line ending).
+# A pass takes and returns the text and reports its number of changes. The text is
+# kept normalized to '\n'; the line ending of the last pass that changed the text
+# is used when writing (the comment pass writes CRLF for Windows/AS compatibility).
+CONVERSION_PASSES = [
+    ("manual", fix_manual, None),
+    ("comment", fix_comment, "\r\n"),
+    ("keywords", fix_keywords, None),
+    ("uppercase", fix_upper_case, None),
+    ("numbers", fix_numbers, None),
+    ("select", fix_select, None),
+    ("case", fix_case, None),
+    ("loop", fix_loop, None),
+    ("math", fix_math_functions, None),
+    ("exitif", fix_exitif, None),
+    ("semicolon", fix_semicolon, None),
+    ("functionblocks", fix_functionblocks, None),
+    ("string_adr", fix_string_assignment_conditional_adr, None),
+    ("string_adr_whitelist", fix_string_to_adr_in_whitelisted_funcs, None),
+    ("equals", fix_equals, None),
+]
+
+# Passes that work line by line, as generators over the lines of a file. Large
+# files are streamed through these instead of being converted in memory.
+LINE_PASSES = {
+    "keywords": fix_keywords_lines,
+    "uppercase": fix_upper_case_lines,
+    "numbers": fix_numbers_lines,
+    "math": fix_math_functions_lines,
+    "semicolon": fix_semicolon_lines,
+}
+
+# Files of at least this size are converted in streaming mode if only line passes
+# are enabled (see --stream)
+STREAM_MIN_SIZE = 16 * 1024 * 1024
 
 
-def process_file(file_path: Path, require_iec: bool = False) -> int:
+def _collecting_passes() -> list[str]:
+    """Enabled passes without a line form, which hold the whole text when streaming."""
+    return [
+        key
+        for key, _, _ in CONVERSION_PASSES
+        if CONVERSION_CONFIG[key] and key not in LINE_PASSES
+    ]
+
+
+def process_file(
+    file_path: Path, require_iec: bool = False, pass_counts: dict | None = None
+) -> int:
     """Process a single .ab or .st file through all conversion functions.
-    Returns the total number of changes made."""
+    Returns the total number of changes made; the changes per pass are added
+    to pass_counts if given."""
     total_changes = 0
 
     # Log separator line before each file
@@ -2100,41 +2171,285 @@ def process_file(file_path: Path, require_iec: bool = False) -> int:
     else:
         new_path = file_path
 
-    # Apply all conversion functions and sum up changes (respecting configuration)
-    if CONVERSION_CONFIG["manual"]:
-        total_changes += fix_manual(new_path)
-    if CONVERSION_CONFIG["comment"]:
-        total_changes += fix_comment(new_path) or 0
-    if CONVERSION_CONFIG["keywords"]:
-        total_changes += fix_keywords(new_path)
-    if CONVERSION_CONFIG["uppercase"]:
-        total_changes += fix_upper_case(new_path)
-    if CONVERSION_CONFIG["numbers"]:
-        total_changes += fix_numbers(new_path)
-    if CONVERSION_CONFIG["select"]:
-        total_changes += fix_select(new_path)
-    if CONVERSION_CONFIG["case"]:
-        total_changes += fix_case(new_path)
-    if CONVERSION_CONFIG["loop"]:
-        total_changes += fix_loop(new_path)
-    if CONVERSION_CONFIG["math"]:
-        total_changes += fix_math_functions(new_path)
-    if CONVERSION_CONFIG["exitif"]:
-        total_changes += fix_exitif(new_path)
-    if CONVERSION_CONFIG["semicolon"]:
-        total_changes += fix_semicolon(new_path)
-    if CONVERSION_CONFIG["functionblocks"]:
-        total_changes += fix_functionblocks(new_path)
-    if CONVERSION_CONFIG["string_adr"]:
-        total_changes += fix_string_assignment_conditional_adr(new_path)
-    if CONVERSION_CONFIG["string_adr_whitelist"]:
-        total_changes += fix_string_to_adr_in_whitelisted_funcs(new_path)
-    if CONVERSION_CONFIG["equals"]:
-        total_changes += fix_equals(new_path)
+    # A dry run keeps the changes in memory anyway
+    recording = change_set.active()
+    source = _disk_path(new_path)
+    if (
+        (recording is None or not recording.dry_run)
+        and source is not None
+        and source.stat().st_size >= STREAM_MIN_SIZE
+    ):
+        collecting = _collecting_passes()
+        if not collecting:
+            return process_file_streaming(new_path, pass_counts)
+        # Only --stream (STREAM_MIN_SIZE 0) streams when a pass needs the whole text
+        if STREAM_MIN_SIZE == 0:
+            utils.log(
+                "Streaming does not bound memory, these conversions need the whole "
+                f"text: {', '.join(collecting)}",
+                severity="WARNING",
+            )
+            return process_file_streaming(new_path, pass_counts)
+
+    # Read once, run all enabled passes in memory and write once at the end
+    text = read_latin1(new_path)
+    changed = False
+    newline = None
+    for key, fix, pass_newline in CONVERSION_PASSES:
+        if not CONVERSION_CONFIG[key]:
+            continue
+        new_text, count = fix(text, new_path)
+        total_changes += count
+        if pass_counts is not None:
+            pass_counts[key] = pass_counts.get(key, 0) + count
+        if count or new_text != text:
+            # Continue with the text as it would be read back from the file
+            text = sanitize_latin1(new_text)
+            if "\r" in text:
+                text = text.replace("\r\n", "\n").replace("\r", "\n")
+            changed = True
+            newline = pass_newline
+
+    if changed:
+        write_latin1(new_path, text, newline=newline)
 
     return total_changes
 
 
+def _read_lines(file_path: Path) -> Iterator[str]:
+    """Yield the lines of a Latin-1 file, with universal newlines like read_latin1."""
+    source_path = _disk_path(file_path)
+    if source_path is None:
+        yield from read_latin1(file_path).splitlines(keepends=True)
+        return
+    with open(source_path, encoding="iso-8859-1") as source:
+        for line in source:
+            yield from line.splitlines(keepends=True)
+
+
+def _split_lines(text: str) -> Iterator[str]:
+    """Yield the lines of text one by one, without building a list of all of them."""
+    start = 0
+    while start < len(text):
+        end = text.find("\n", start) + 1 or len(text)
+        yield text[start:end]
+        start = end
+
+
+def _digest_lines(lines: Iterable[str], digest) -> Iterator[str]:
+    for line in lines:
+        digest.update(line.encode("utf-8", "surrogatepass"))
+        yield line
+
+
+class _StreamStage:
+    """One pass of the streaming conversion and what it changed."""
+
+    def __init__(self, key: str, fix, newline: str | None):
+        self.key = key
+        self.fix = fix
+        self.newline = newline
+        self.count = 0
+        self.changed = False
+
+    def run(self, lines: Iterable[str], file_path: Path) -> Iterator[str]:
+        """
+        Yield the converted lines. Passes without a line form get the text
+        of all lines at once.
+        """
+        line_pass = LINE_PASSES.get(self.key)
+        if line_pass is None:
+            text = "".join(lines)
+            new_text, self.count = self.fix(text, file_path)
+            self.changed = bool(self.count) or new_text != text
+            del text
+            output = _split_lines(new_text)
+            del new_text
+        else:
+            counter = PassCounter()
+            source_digest = hashlib.md5()
+            result_digest = hashlib.md5()
+            output = _digest_lines(
+                line_pass(_digest_lines(lines, source_digest), file_path, counter),
+                result_digest,
+            )
+
+        for chunk in output:
+            # Continue with the text as it would be read back from the file
+            chunk = sanitize_latin1(chunk)
+            if "\r" in chunk:
+                chunk = chunk.replace("\r\n", "\n").replace("\r", "\n")
+            yield from chunk.splitlines(keepends=True)
+
+        if line_pass is not None:
+            self.count = counter.count
+            self.changed = bool(self.count) or (
+                source_digest.digest() != result_digest.digest()
+            )
+
+
+def process_file_streaming(file_path: Path, pass_counts: dict | None = None) -> int:
+    """
+    Convert a file through a chain of generators, one per enabled pass, so the
+    line passes (LINE_PASSES) never hold the whole file in memory; any other
+    enabled pass still collects the text at its stage. The result goes to a
+    temporary file next to the file, which replaces it once all passes are
+    done and something changed (or is handed to the change set being recorded).
+    Returns the total number of changes made.
+    """
+    utils.log(f"Converting line by line: {file_path}", severity="INFO")
+
+    stages: list[_StreamStage] = []
+    lines = _read_lines(file_path)
+    for key, fix, pass_newline in CONVERSION_PASSES:
+        if not CONVERSION_CONFIG[key]:
+            continue
+        stage = _StreamStage(key, fix, pass_newline)
+        lines = stage.run(lines, file_path)
+        stages.append(stage)
+
+    tmp_path = change_set.staging_path(file_path)
+    eol_path = None
+    try:
+        with open(tmp_path, "w", encoding="iso-8859-1", newline="\n") as target:
+            target.writelines(lines)
+
+        changed = [stage for stage in stages if stage.changed]
+        if changed:
+            # Line ending of the last pass that changed the text, as in process_file
+            newline = changed[-1].newline or os.linesep
+            if newline != "\n":
+                eol_path = change_set.staging_path(file_path)
+                with open(tmp_path, encoding="iso-8859-1", newline="\n") as source:
+                    with open(
+                        eol_path, "w", encoding="iso-8859-1", newline=newline
+                    ) as target:
+                        target.writelines(source)
+                os.replace(eol_path, tmp_path)
+                eol_path = None
+            recording = change_set.active()
+            if recording is None:
+                os.replace(tmp_path, file_path)
+                content_cache.invalidate(file_path)
+            else:
+                recording.write_staged(file_path, tmp_path, "iso-8859-1")
+                tmp_path = None
+    finally:
+        if tmp_path is not None:
+            tmp_path.unlink(missing_ok=True)
+        if eol_path is not None:
+            eol_path.unlink(missing_ok=True)
+
+    if pass_counts is not None:
+        for stage in stages:
+            pass_counts[stage.key] = pass_counts.get(stage.key, 0) + stage.count
+    return sum(stage.count for stage in stages)
+
+
+class _RecordedStream:
+    """File-like object that records everything written to it for later replay."""
+
+    def __init__(self, name: str, records: list):
+        self.name = name
+        self.records = records
+
+    def write(self, text: str) -> int:
+        self.records.append((self.name, text))
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+
+def convert_directory(
+    files: list[Path],
+    require_iec: bool,
+    config: dict,
+    stream_min_size: int,
+    dry_run: bool | None = None,
+) -> tuple[list[tuple[int, dict, list]], change_set.ChangeSet | None]:
+    """
+    Worker task of the batch mode: converts the .ab files of one directory one
+    after another (they share the IEC.prg/IEC.lby that is updated on renaming).
+    Unless dry_run is None, the changes are recorded instead of written.
+    Returns (total changes, changes per pass, recorded console output) per file
+    and the recorded changes.
+    """
+    global STREAM_MIN_SIZE
+
+    # Workers do not inherit the configuration set by the main process
+    CONVERSION_CONFIG.update(config)
+    STREAM_MIN_SIZE = stream_min_size
+    changes = None if dry_run is None else change_set.ChangeSet(dry_run)
+    results = []
+    for file_path in files:
+        records = []
+        pass_counts = {}
+        with contextlib.redirect_stdout(
+            _RecordedStream("stdout", records)
+        ), contextlib.redirect_stderr(
+            _RecordedStream("stderr", records)
+        ), change_set.recording(
+            changes
+        ):
+            total = process_file(
+                file_path, require_iec=require_iec, pass_counts=pass_counts
+            )
+        results.append((total, pass_counts, records))
+    return results, changes
+
+
+def process_files_parallel(
+    files: list[Path], require_iec: bool, jobs: int, pass_counts: dict
+) -> int:
+    """
+    Convert files in a process pool, one task per directory. The recorded
+    output of every file is replayed in the order of files, so the console
+    output is the same as when converting them one after another.
+    Returns the total number of changes made.
+    """
+    # Import the worker by its package name, so it can be pickled even when this
+    # script runs as __main__ or is loaded by the GUI under another module name
+    from helpers import ab_2_st_converter as worker
+
+    # Changes being recorded are collected by the workers and merged here
+    recording = change_set.active()
+
+    by_directory: dict[Path, list[Path]] = {}
+    for file_path in files:
+        by_directory.setdefault(file_path.parent, []).append(file_path)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            directory: executor.submit(
+                worker.convert_directory,
+                directory_files,
+                require_iec,
+                dict(CONVERSION_CONFIG),
+                STREAM_MIN_SIZE,
+                None if recording is None else recording.dry_run,
+            )
+            for directory, directory_files in by_directory.items()
+        }
+        results = {}
+        for directory, directory_files in by_directory.items():
+            directory_results, changes = futures[directory].result()
+            for file_path, result in zip(directory_files, directory_results):
+                results[file_path] = result
+            if recording is not None:
+                recording.merge(changes)
+
+    total_changes = 0
+    for file_path in files:
+        total, file_pass_counts, records = results[file_path]
+        for stream_name, text in records:
+            getattr(sys, stream_name).write(text)
+        total_changes += total
+        for key, count in file_pass_counts.items():
+            pass_counts[key] = pass_counts.get(key, 0) + count
+    return total_changes
+
+
 def parse_arguments():
     """Parse command-line arguments."""
     parser = argparse.ArgumentParser(
@@ -2156,6 +2471,24 @@ Examples:
         help="Path to the project directory or a single .ab file (default: current directory)",
     )
 
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Convert the files of a project in N parallel processes (default: 1)",
+    )
+
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Convert every file line by line with bounded memory "
+        f"(default: only files of {STREAM_MIN_SIZE // (1024 * 1024)} MiB and more)",
+    )
+
+    project_index.add_arguments(parser)
+    change_set.add_arguments(parser)
+
     # Add arguments to disable each conversion function
     parser.add_argument(
         "--no-manual", action="store_true", help="Disable manual fix notices insertion"
@@ -2220,7 +2553,10 @@ Examples:
 
 def apply_config_from_args(args):
     """Apply configuration from parsed arguments to CONVERSION_CONFIG."""
-    global CONVERSION_CONFIG
+    global CONVERSION_CONFIG, STREAM_MIN_SIZE
+
+    if args.stream:
+        STREAM_MIN_SIZE = 0
 
     CONVERSION_CONFIG["manual"] = not args.no_manual
     CONVERSION_CONFIG["comment"] = not args.no_comment
@@ -2249,6 +2585,10 @@ def main():
     apply_config_from_args(args)
 
     input_path = Path(args.path)
+    root = input_path if input_path.is_dir() else input_path.parent
+    changes = change_set.start(args, root)
+    if changes is None:
+        return
 
     # Check if input is a file or directory
     if input_path.is_file():
@@ -2264,7 +2604,8 @@ def main():
             "Before proceeding, make sure you have a backup or are using version control (e.g., Git).",
             severity="WARNING",
         )
-        total = process_file(input_path, require_iec=False)
+        with change_set.recording(changes):
+            total = process_file(input_path, require_iec=False)
         utils.log(f"File processing complete. Total changes: {total}", severity="INFO")
 
     elif input_path.is_dir():
@@ -2291,15 +2632,19 @@ def main():
             severity="WARNING",
         )
 
-        proceed, selections = ask_proceed_with_options(
-            "This script will convert all Automation Basic tasks into Structure Text tasks. Do you want to proceed with converting anyway?"
-        )
+        # A dry run changes nothing, so it runs without asking
+        if not args.dry_run:
+            proceed, selections = ask_proceed_with_options(
+                "This script will convert all Automation Basic tasks into Structure Text tasks. Do you want to proceed with converting anyway?"
+            )
 
-        if not proceed:
-            utils.log("Operation cancelled. No changes were made.", severity="WARNING")
-            return
+            if not proceed:
+                utils.log(
+                    "Operation cancelled. No changes were made.", severity="WARNING"
+                )
+                return
 
-        apply_config_from_checkbox_selections(CONVERSION_CONFIG, selections)
+            apply_config_from_checkbox_selections(CONVERSION_CONFIG, selections)
 
         # Use Logical subdirectory if it exists, otherwise use the provided directory
         logical_path = project_path / "Logical"
@@ -2310,21 +2655,47 @@ def main():
                 severity="INFO",
             )
 
-        # Loop through the files in the "Logical" directory and process .ab files
-        total_changes = 0
-        files_processed = 0
-        for file_path in logical_path.rglob("*"):
-            if file_path.suffix in {".ab"}:
-                total_changes += process_file(file_path, require_iec=require_iec)
-                files_processed += 1
+        # Collect the .ab files in the "Logical" directory and process them
+        excludes = project_index.ExcludeRules.for_project(project_path, args.exclude)
+        files = [
+            p
+            for p in project_index.iter_files(
+                project_path, excludes, under=logical_path
+            )
+            if p.suffix in {".ab"}
+        ]
+        pass_counts = {key: 0 for key, _, _ in CONVERSION_PASSES}
+        start_time = time.time()
+        with change_set.recording(changes):
+            if args.jobs > 1 and len(files) > 1:
+                total_changes = process_files_parallel(
+                    files, require_iec, args.jobs, pass_counts
+                )
+            else:
+                total_changes = 0
+                for file_path in files:
+                    total_changes += process_file(
+                        file_path, require_iec=require_iec, pass_counts=pass_counts
+                    )
 
         utils.log(
-            f"Processing complete. Files processed: {files_processed}, Total changes: {total_changes}",
+            f"Processing complete. Files processed: {len(files)}, Total changes: {total_changes}",
             severity="INFO",
         )
+        changes_per_pass = ", ".join(
+            f"{key}: {count}" for key, count in pass_counts.items() if count
+        )
+        if changes_per_pass:
+            utils.log(f"Changes per conversion: {changes_per_pass}", severity="INFO")
+        utils.log(f"Duration: {time.time() - start_time:.2f} seconds", severity="INFO")
     else:
         utils.log(f"Error: Path does not exist: {input_path}", severity="ERROR")
+        return
+
+    change_set.finish(changes, args, root)
 
 
 if __name__ == "__main__":
+    # Required for the process pool in frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
     main()
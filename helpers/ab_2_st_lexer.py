@@ -0,0 +1,246 @@
+"""Tokenizer for the AB → ST converter.
+
+Splits Automation Basic (.ab) and Structured Text (.st) sources into tokens in a
+single left-to-right scan, so the conversion passes know which parts of a line
+are comments, string literals, numbers or identifiers without each pass
+detecting them with its own regular expressions.
+
+Concatenating the text of all tokens always gives back the scanned text.
+
+Passes that only need to know where the comments and strings of a line are use
+split_comment, comment_start, string_spans and code_runs_lines instead: these
+look for comments and strings with a single compiled regex and build no tokens.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Iterable, NamedTuple
+
+# Token kinds
+NEWLINE = "newline"
+SPACE = "space"
+LINE_COMMENT = "line_comment"
+BLOCK_COMMENT = "block_comment"
+STRING = "string"
+NUMBER = "number"
+IDENTIFIER = "identifier"
+SYMBOL = "symbol"
+
+COMMENT_KINDS = (LINE_COMMENT, BLOCK_COMMENT)
+
+
+class Token(NamedTuple):
+    kind: str
+    text: str
+    start: int
+
+
+def _master_pattern(string: str, number: str) -> re.Pattern:
+    # Order matters: comments before symbols ('/', '('), numbers before identifiers
+    return re.compile(
+        "|".join(
+            [
+                r"(?P<newline>\r\n|\n|\r)",
+                r"(?P<space>[ \t\f\v]+)",
+                r"(?P<line_comment>//[^\r\n]*)",
+                r"(?P<block_comment>\(\*[\s\S]*?(?:\*\)|\Z))",
+                f"(?P<string>{string})",
+                f"(?P<number>{number})",
+                r"(?P<identifier>[A-Za-z_][A-Za-z0-9_]*)",
+                r"(?P<symbol>[\s\S])",
+            ]
+        )
+    )
+
+
+def _comment_pattern(string: str) -> re.Pattern:
+    # No other token contains a quote, '//' or '(*', so searching for these finds
+    # the same comments and strings as the full tokenizer
+    return re.compile(
+        "|".join(
+            [
+                r"(?P<line_comment>//[^\r\n]*)",
+                r"(?P<block_comment>\(\*[\s\S]*?(?:\*\)|\Z))",
+                f"(?P<string>{string})",
+            ]
+        )
+    )
+
+
+def _code_pattern(string: str, quote: str, block_comments: bool) -> re.Pattern:
+    # The code of a line up to its first comment: string literals, and any other
+    # character except a '/' or '(' that starts one. With block_comments, (* *)
+    # comments are part of the code and only '//' ends it.
+    parts = [f"[^{quote}/(]+", string, r"/(?!/)", r"\((?!\*)"]
+    if block_comments:
+        parts.append(r"\(\*[\s\S]*?(?:\*\)|\Z)")
+    return re.compile("(?:" + "|".join(parts) + ")*")
+
+
+# Identifiers are ASCII only, like the keyword lookarounds the passes used before.
+# Strings end at the line end if the closing quote is missing.
+_STRINGS = {
+    # AB: "text"
+    "ab": r'"[^"\r\n]*"?',
+    # ST: 'text' with $-escapes (and doubled quotes)
+    "st": r"'(?:[^'$\r\n]+|\$.|'')*'?",
+}
+_NUMBERS = {
+    # AB: hex $FF and binary %1010 literals
+    "ab": r"[0-9][A-Za-z0-9_#.]*|\$[0-9A-Fa-f_]+|%[01_]+",
+    # ST: typed literals like 16#FF
+    "st": r"[0-9][A-Za-z0-9_#.]*",
+}
+_QUOTES = {"ab": '"', "st": "'"}
+
+_DIALECTS: dict[str, re.Pattern] = {
+    dialect: _master_pattern(_STRINGS[dialect], _NUMBERS[dialect])
+    for dialect in _STRINGS
+}
+_COMMENTS: dict[str, re.Pattern] = {
+    dialect: _comment_pattern(_STRINGS[dialect]) for dialect in _STRINGS
+}
+_CODE_BEFORE_LINE_COMMENT: dict[str, re.Pattern] = {
+    dialect: _code_pattern(_STRINGS[dialect], _QUOTES[dialect], True)
+    for dialect in _STRINGS
+}
+_CODE_BEFORE_COMMENT: dict[str, re.Pattern] = {
+    dialect: _code_pattern(_STRINGS[dialect], _QUOTES[dialect], False)
+    for dialect in _STRINGS
+}
+
+
+def tokenize(text: str, dialect: str = "st") -> list[Token]:
+    """
+    Split text into tokens. Block comments may span several lines and are
+    returned as one token; every other token lies within a single line.
+    """
+    pattern = _DIALECTS[dialect]
+    return [Token(m.lastgroup, m.group(), m.start()) for m in pattern.finditer(text)]
+
+
+def split_comment(line: str, dialect: str = "st") -> tuple[str, str]:
+    """
+    Split a single line into its code part and its trailing '//' comment
+    (empty if there is none). A '//' inside a string literal or a (* *)
+    comment does not start a comment.
+    """
+    start = line.find("//")
+    if start == -1:
+        return line, ""
+    # Without strings and block comments nothing could hide the '//'
+    if _QUOTES[dialect] not in line and "(*" not in line:
+        return line[:start], line[start:]
+    start = _CODE_BEFORE_LINE_COMMENT[dialect].match(line).end()
+    return line[:start], line[start:]
+
+
+def comment_start(line: str, dialect: str = "st") -> int:
+    """
+    Position of the first '//' or '(*' comment of a line that is not inside a
+    string literal, -1 if there is none.
+    """
+    line_start = line.find("//")
+    block_start = line.find("(*")
+    if line_start == -1 or -1 < block_start < line_start:
+        start = block_start
+    else:
+        start = line_start
+    if start == -1:
+        return -1
+    # Without strings nothing could hide the first marker
+    if _QUOTES[dialect] not in line:
+        return start
+    start = _CODE_BEFORE_COMMENT[dialect].match(line).end()
+    return start if start < len(line) else -1
+
+
+def string_spans(text: str, dialect: str = "st") -> list[tuple[int, int]]:
+    """(start, end) of every string literal in text, outside of comments."""
+    if _QUOTES[dialect] not in text:
+        return []
+    return [
+        match.span()
+        for match in _COMMENTS[dialect].finditer(text)
+        if match.lastgroup == STRING
+    ]
+
+
+def code_runs_lines(
+    lines: Iterable[str], dialect: str = "st"
+) -> Iterable[list[tuple[bool, str]]]:
+    """
+    Split every line into (is_code, text) runs, yielding one list of runs per
+    line. Comments and the line break are runs of their own, so a code run
+    never spans a comment or a line break; string literals belong to the code.
+    A block comment spanning several lines is a comment run on each of them.
+    """
+    pattern = _COMMENTS[dialect]
+    in_block = False
+    for line in lines:
+        runs: list[tuple[bool, str]] = []
+        end = len(line)
+        if line.endswith("\n"):
+            end -= 2 if line.endswith("\r\n") else 1
+        elif line.endswith("\r"):
+            end -= 1
+        pos = 0
+        if in_block:
+            close = line.find("*)", 0, end)
+            if close == -1:
+                pos = end
+            else:
+                pos = close + 2
+                in_block = False
+            if pos:
+                runs.append((False, line[:pos]))
+        if not in_block and (
+            line.find("//", pos, end) != -1 or line.find("(*", pos, end) != -1
+        ):
+            for match in pattern.finditer(line, pos, end):
+                if match.lastgroup == STRING:
+                    continue
+                if match.start() > pos:
+                    runs.append((True, line[pos : match.start()]))
+                runs.append((False, match.group()))
+                pos = match.end()
+                if match.lastgroup == BLOCK_COMMENT:
+                    # '(*)' opens a comment without closing it
+                    text = match.group()
+                    in_block = len(text) < 4 or not text.endswith("*)")
+        if pos < end:
+            runs.append((True, line[pos:end]))
+        if end < len(line):
+            runs.append((False, line[end:]))
+        yield runs
+
+
+def tokenize_lines(
+    lines: Iterable[str], dialect: str = "st"
+) -> Iterable[tuple[str, list[Token]]]:
+    """
+    Tokenize line by line, yielding (line, tokens). A block comment spanning
+    several lines is returned as one block_comment token per line, so the
+    tokens of a line never reach into the next one. Token positions are
+    relative to their line.
+    """
+    in_block = False
+    for line in lines:
+        tokens: list[Token] = []
+        offset = 0
+        if in_block:
+            end = line.find("*)")
+            if end == -1:
+                yield line, [Token(BLOCK_COMMENT, line, 0)]
+                continue
+            offset = end + 2
+            tokens.append(Token(BLOCK_COMMENT, line[:offset], 0))
+            in_block = False
+        for token in tokenize(line[offset:], dialect):
+            tokens.append(token._replace(start=token.start + offset))
+        last = tokens[-1] if tokens else None
+        if last is not None and last.kind == BLOCK_COMMENT and last.start >= offset:
+            # '(*)' opens a comment without closing it
+            in_block = len(last.text) < 4 or not last.text.endswith("*)")
+        yield line, tokens
@@ -1,50 +1,107 @@
+import argparse
 import os
-import re
-import sys
 from pathlib import Path
 
-from utils import utils
+from utils import change_set, project_index, rewrite, utils
 
 
-def replace_functions_and_constants(
-    file_path: Path, function_mapping: dict, constant_mapping: dict
-) -> tuple[int, int, bool]:
+def build_rewriter(function_mapping: dict, constant_mapping: dict) -> rewrite.Rewriter:
     """
-    Replace function calls and constants in a file based on the provided mappings.
+    Compile the function and constant mappings into one rewrite pass.
     """
-    original_content, original_encoding, original_bytes = utils.read_file_with_encoding(
-        file_path
-    )
-    modified_content = original_content
-    function_replacements = 0
-    constant_replacements = 0
-
-    for old_func, new_func in function_mapping.items():
-        pattern = rf"\b{re.escape(old_func)}\s*\("
-        replacement = f"{new_func}("
-        modified_content, num_replacements = re.subn(
-            pattern, replacement, modified_content
-        )
-        function_replacements += num_replacements
-
-    for old_const, new_const in constant_mapping.items():
-        pattern = rf"\b{re.escape(old_const)}\b"
-        replacement = new_const
-        modified_content, num_replacements = re.subn(
-            pattern, replacement, modified_content
-        )
-        constant_replacements += num_replacements
-
-    if utils.write_file_if_changed(
-        file_path, modified_content, original_encoding, original_bytes
-    ):
-        utils.log(
-            f"{function_replacements + constant_replacements:4d} changes written to: {file_path}",
-            severity="INFO",
-        )
-        return function_replacements, constant_replacements, True
-
-    return function_replacements, constant_replacements, False
+    rewriter = rewrite.Rewriter()
+    # Replace function calls, "name (" becomes "new_name("
+    rewriter.replace("functions", function_mapping, suffix=r"\s*\(", tail="(")
+    # Replace constants
+    rewriter.replace("constants", constant_mapping)
+    return rewriter
+
+
+class AsMathMigration(rewrite.Migration):
+    """
+    Replaces AsMath functions and constants in .st and .ab files with their
+    AsBrMath equivalents.
+    """
+
+    name = "asmath"
+    libraries = ["AsMath"]
+
+    def __init__(self, verbose: bool = False):
+        super().__init__(verbose)
+        function_mapping = {
+            "atan2": "brmatan2",
+            "ceil": "brmceil",
+            "cosh": "brmcosh",
+            "floor": "brmfloor",
+            "fmod": "brmfmod",
+            "frexp": "brmfrexp",
+            "ldexp": "brmldexp",
+            "modf": "brmmodf",
+            "pow": "brmpow",
+            "sinh": "brmsinh",
+            "tanh": "brmtanh",
+        }
+
+        constant_mapping = {
+            "am2_SQRTPI": "brm2_SQRTPI",
+            "amSQRT1_2": "brmSQRT1_2",
+            "amSQRTPI": "brmSQRTPI",
+            "amLOG2_E": "brmLOG2_E",
+            "amLOG10E": "brmLOG10E",
+            "amIVLN10": "brmINVLN10",
+            "amINVLN2": "brmINVLN2",
+            "amTWOPI": "brmTWOPI",
+            "amSQRT3": "brmSQRT3",
+            "amSQRT2": "brmSQRT2",
+            "amLOG2E": "brmLOG2E",
+            "amLN2LO": "brmLN2LO",
+            "amLN2HI": "brmLN2HI",
+            "am3PI_4": "brm3PI_4",
+            "amPI_4": "brmPI_4",
+            "amPI_2": "brmPI_2",
+            "amLN10": "brmLN10",
+            "am2_PI": "brm2_PI",
+            "am1_PI": "brm1_PI",
+            "amLN2": "brmLN2",
+            "amPI": "brmPI",
+            "amE": "brmE",
+        }
+
+        self.rewriter = build_rewriter(function_mapping, constant_mapping)
+        self.total_function_replacements = 0
+        self.total_constant_replacements = 0
+        self.total_files_changed = 0
+
+    def rewriter_for(self, file_path: Path) -> rewrite.Rewriter | None:
+        return self.rewriter if file_path.suffix in (".st", ".ab") else None
+
+    def report(self, result: rewrite.FileRewrite) -> None:
+        if result.changed:
+            function_replacements = result.total("functions")
+            constant_replacements = result.total("constants")
+            utils.log(
+                f"{function_replacements + constant_replacements:4d} changes written to: {result.path}",
+                severity="INFO",
+            )
+            self.total_function_replacements += function_replacements
+            self.total_constant_replacements += constant_replacements
+            self.total_files_changed += 1
+
+    def summary(self) -> None:
+        utils.log("─" * 80 + "\nSummary:")
+        utils.log(f"Total functions replaced: {self.total_function_replacements}")
+        utils.log(f"Total constants replaced: {self.total_constant_replacements}")
+        utils.log(f"Total files changed: {self.total_files_changed}")
+
+        if (
+            self.total_function_replacements == 0
+            and self.total_constant_replacements == 0
+        ):
+            utils.log(
+                "No functions or constants needed to be replaced.", severity="INFO"
+            )
+        else:
+            utils.log("Replacement completed successfully.", severity="INFO")
 
 
 def check_for_asmath_library(project_path: Path) -> bool:
@@ -63,12 +120,32 @@ def check_for_asmath_library(project_path: Path) -> bool:
     return False
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Replaces AsMath functions and constants with their AsBrMath equivalents"
+    )
+    parser.add_argument(
+        "project_path",
+        nargs="?",
+        type=str,
+        default=os.getcwd(),
+        help="Automation Studio 4.x path containing *.apj file",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", required=False)
+    rewrite.add_arguments(parser)
+    project_index.add_arguments(parser)
+    change_set.add_arguments(parser)
+
+    return parser.parse_args()
+
+
 def main():
     """
     Main function to replace AsMath functions and constants with their AsBrMath equivalents.
     """
 
-    project_path = sys.argv[1] if len(sys.argv) > 1 else os.getcwd()
+    args = parse_args()
+    project_path = args.project_path
 
     apj_file = utils.get_and_check_project_file(project_path)
     project_path = Path(project_path)
@@ -88,89 +165,44 @@ def main():
         severity="WARNING",
     )
 
+    changes = change_set.start(args, Path(project_path))
+    if changes is None:
+        return
+
+    # A dry run changes nothing, so it runs without asking
+    proceed = "y"
     if not library_found:
         utils.log("AsMath library not found.", severity="INFO")
-        proceed = utils.ask_user(
-            "Do you want to proceed with replacing functions and constants anyway? (y/n) [y]: ",
-            extra_note="Note: This script only updates code. You must manually remove 'AsMath' and add 'AsBrMath' in the library manager. "
-            "Compatible with both AS4 and AS6 after that.",
-        )
+        if not args.dry_run:
+            proceed = utils.ask_user(
+                "Do you want to proceed with replacing functions and constants anyway? (y/n) [y]: ",
+                extra_note="Note: This script only updates code. You must manually remove 'AsMath' and add 'AsBrMath' in the library manager. "
+                "Compatible with both AS4 and AS6 after that.",
+            )
     else:
         utils.log("AsMath library found in Package.pkg!", severity="INFO")
-        proceed = utils.ask_user(
-            "Do you want to continue? (y/n) [y]: ",
-            extra_note="Note: After replacing the code, remember to swap the library from 'AsMath' to 'AsBrMath' manually.",
-        )
+        if not args.dry_run:
+            proceed = utils.ask_user(
+                "Do you want to continue? (y/n) [y]: ",
+                extra_note="Note: After replacing the code, remember to swap the library from 'AsMath' to 'AsBrMath' manually.",
+            )
 
     if proceed != "y":
         utils.log("Operation cancelled. No changes were made.", severity="WARNING")
         return
 
-    function_mapping = {
-        "atan2": "brmatan2",
-        "ceil": "brmceil",
-        "cosh": "brmcosh",
-        "floor": "brmfloor",
-        "fmod": "brmfmod",
-        "frexp": "brmfrexp",
-        "ldexp": "brmldexp",
-        "modf": "brmmodf",
-        "pow": "brmpow",
-        "sinh": "brmsinh",
-        "tanh": "brmtanh",
-    }
-
-    constant_mapping = {
-        "am2_SQRTPI": "brm2_SQRTPI",
-        "amSQRT1_2": "brmSQRT1_2",
-        "amSQRTPI": "brmSQRTPI",
-        "amLOG2_E": "brmLOG2_E",
-        "amLOG10E": "brmLOG10E",
-        "amIVLN10": "brmINVLN10",
-        "amINVLN2": "brmINVLN2",
-        "amTWOPI": "brmTWOPI",
-        "amSQRT3": "brmSQRT3",
-        "amSQRT2": "brmSQRT2",
-        "amLOG2E": "brmLOG2E",
-        "amLN2LO": "brmLN2LO",
-        "amLN2HI": "brmLN2HI",
-        "am3PI_4": "brm3PI_4",
-        "amPI_4": "brmPI_4",
-        "amPI_2": "brmPI_2",
-        "amLN10": "brmLN10",
-        "am2_PI": "brm2_PI",
-        "am1_PI": "brm1_PI",
-        "amLN2": "brmLN2",
-        "amPI": "brmPI",
-        "amE": "brmE",
-    }
-
-    total_function_replacements = 0
-    total_constant_replacements = 0
-    total_files_changed = 0
-
+    migration = AsMathMigration(args.verbose)
     logical_path = Path(project_path) / "Logical"
-    for path in logical_path.rglob("*"):
-        if path.suffix in (".st", ".ab"):
-            function_replacements, constant_replacements, changed = (
-                replace_functions_and_constants(
-                    path, function_mapping, constant_mapping
-                )
-            )
-            if changed:
-                total_function_replacements += function_replacements
-                total_constant_replacements += constant_replacements
-                total_files_changed += 1
-
-    utils.log("─" * 80 + "\nSummary:")
-    utils.log(f"Total functions replaced: {total_function_replacements}")
-    utils.log(f"Total constants replaced: {total_constant_replacements}")
-    utils.log(f"Total files changed: {total_files_changed}")
-
-    if total_function_replacements == 0 and total_constant_replacements == 0:
-        utils.log("No functions or constants needed to be replaced.", severity="INFO")
-    else:
-        utils.log("Replacement completed successfully.", severity="INFO")
+    excludes = project_index.ExcludeRules.for_project(project_path, args.exclude)
+
+    with change_set.recording(changes):
+        # Loop through the files in the "Logical" directory and process .st and .ab files
+        files = project_index.iter_files(project_path, excludes, under=logical_path)
+        rewrite.run_migrations([migration], files, args.jobs)
+
+    migration.summary()
+
+    change_set.finish(changes, args, Path(project_path))
 
 
 if __name__ == "__main__":
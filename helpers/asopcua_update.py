@@ -1,90 +1,134 @@
 # The OPC UA client library in Automation Runtime 6 has been updated to OPC 30001 PLC client function blocks based on IEC 61131-3 1.2.
 # To migrate a project from an older AR version to AR 6, modifications to the program are necessary.
+import argparse
 import os
-import re
-import sys
 from pathlib import Path
 
-from utils import utils
+from utils import change_set, project_index, rewrite, utils
 
 
-def replace_enums(file_path: Path, enum_mapping: dict) -> tuple[int, bool]:
+def build_rewriters(
+    enum_mapping: dict, fb_mapping: dict, type_mapping: dict
+) -> tuple[rewrite.Rewriter, rewrite.Rewriter]:
     """
-    Replace enumerators in a file based on the provided mappings.
+    Compile the mappings into one rewrite pass for the code files (enumerators)
+    and one for the declaration files (function blocks and types).
     """
-    if any(part in {"AsOpcUac", "AsOpcUas"} for part in file_path.parts):
-        return 0, False
-
-    original_content, original_encoding, original_bytes = utils.read_file_with_encoding(
-        file_path
+    code = rewrite.Rewriter().replace("enums", enum_mapping, prefix="", suffix="")
+    declarations = (
+        rewrite.Rewriter()
+        .replace("function_blocks", fb_mapping)
+        .replace("types", type_mapping)
     )
-    modified_content = original_content
-    enum_replacements = 0
-
-    # Replace enums
-    for old_const, new_const in enum_mapping.items():
-        pattern = re.escape(old_const)
-        replacement = new_const
-        modified_content, num_replacements = re.subn(
-            pattern, replacement, modified_content
-        )
-        enum_replacements += num_replacements
-
-    if utils.write_file_if_changed(
-        file_path, modified_content, original_encoding, original_bytes
-    ):
-        utils.log(
-            f"{enum_replacements :4d} changes written to: {file_path}", severity="INFO"
-        )
-        return enum_replacements, True
+    return code, declarations
 
-    return enum_replacements, False
 
-
-def replace_fbs_and_types(
-    file_path: Path, fb_mapping: dict, type_mapping: dict
-) -> tuple[int, int, bool]:
+class OpcUaMigration(rewrite.Migration):
     """
-    Replace function block calls and types in a file based on the provided mappings.
+    Updates AsOpcUac and AsOpcUas enumerators in code files and function blocks
+    and types in declaration files for AR 6.
     """
-    if any(part in {"AsOpcUac", "AsOpcUas"} for part in file_path.parts):
-        return 0, 0, False
 
-    original_content, original_encoding, original_bytes = utils.read_file_with_encoding(
-        file_path
-    )
-    modified_content = original_content
-    fb_replacements = 0
-    type_replacements = 0
-
-    # Replace function blocks
-    for old_fb, new_fb in fb_mapping.items():
-        pattern = rf"\b{re.escape(old_fb)}\b"
-        replacement = new_fb
-        modified_content, num_replacements = re.subn(
-            pattern, replacement, modified_content
-        )
-        fb_replacements += num_replacements
-
-    # Replace types
-    for old_typ, new_typ in type_mapping.items():
-        pattern = rf"\b{re.escape(old_typ)}\b"
-        replacement = new_typ
-        modified_content, num_replacements = re.subn(
-            pattern, replacement, modified_content
-        )
-        type_replacements += num_replacements
-
-    if utils.write_file_if_changed(
-        file_path, modified_content, original_encoding, original_bytes
-    ):
-        utils.log(
-            f"{fb_replacements + type_replacements:4d} changes written to: {file_path}",
-            severity="INFO",
+    name = "asopcua"
+    libraries = ["AsOpcUac", "AsOpcUas"]
+
+    def __init__(self, verbose: bool = False):
+        super().__init__(verbose)
+        fb_mapping = {
+            "UA_EventItemOperate": "UA_EventItemOperateList",
+            "UA_EventItemRemove": "UA_EventItemRemoveList",
+            "UA_GetNamespaceIndex": "UA_NamespaceGetIndex",
+            "UA_MonitoredItemAdd": "UA_MonitoredItemAddList",
+            "UA_MonitoredItemRemove": "UA_MonitoredItemRemoveList",
+            "UA_MonitoredItemOperate": "UA_MonitoredItemOperateList",
+            "UaClt_ReadBulk": "BrUa_ReadBulk",
+            "UaClt_WriteBulk": "BrUa_WriteBulk",
+        }
+
+        type_mapping = {
+            "UAArrayLength": "BrUaArrayLength",
+            "UAByteString": "BrUaByteString",
+            "UADataValue": "BrUaDataValue",
+            "UAEUInformation": "BrUaEUInformation",
+            "UAMethodArgument": "BrUaMethodArgument",
+            "UAMonitoringParameters": "UAMonitoringParameter",
+            "UAMonitoringSettings": "UAMonitoringParameter",
+            "UANoOfElements": "BrUaNoOfElements",
+            "UARange": "BrUaRange",
+            "UATimeZoneData": "BrUaTimeZoneDataType",
+            "UAVariantType": "BrUaVariantType",
+        }
+
+        enum_mapping = {
+            "UAAttributeId": "UAAttributeID",
+            "UANodeAdditionalInfo.AttributeId": "UANodeAdditionalInfo.AttributeID",
+            "UAIdentifierType_String": "UAIT_String",
+            "UAIdentifierType_Numeric": "UAIT_Numeric",
+            "UAIdentifierType_GUID": "UAIT_GUID",
+            "UAIdentifierType_Opaque": "UAIT_Opaque",
+            "UASecurityMsgMode_": "UASMM_",
+            "UASecurityPolicy_": "UASP_",
+            "UAVariantType_": "BrUaVariantType_",
+            "UADeadbandType_None": "UADT_None",
+            "UADeadbandType_Absolute": "UADT_Absolute",
+            "UADeadbandType_Percentt": "UADT_Percentt",
+        }
+
+        self.code_rewriter, self.declaration_rewriter = build_rewriters(
+            enum_mapping, fb_mapping, type_mapping
         )
-        return fb_replacements, type_replacements, True
+        self.total_function_replacements = 0
+        self.total_enums_replacements = 0
+        self.total_type_replacements = 0
+        self.total_files_changed = 0
+
+    def rewriter_for(self, file_path: Path) -> rewrite.Rewriter | None:
+        if any(part in {"AsOpcUac", "AsOpcUas"} for part in file_path.parts):
+            return None
+        if file_path.suffix in {".st", ".c", ".cpp", ".ab"}:
+            return self.code_rewriter
+        if file_path.suffix in {".typ", ".var", ".fun"}:
+            return self.declaration_rewriter
+        return None
 
-    return fb_replacements, type_replacements, False
+    def report(self, result: rewrite.FileRewrite) -> None:
+        if not result.changed:
+            return
+        if "enums" in result.counts:
+            enum_replacements = result.total("enums")
+            utils.log(
+                f"{enum_replacements :4d} changes written to: {result.path}",
+                severity="INFO",
+            )
+            self.total_enums_replacements += enum_replacements
+        else:
+            function_replacements = result.total("function_blocks")
+            type_replacements = result.total("types")
+            utils.log(
+                f"{function_replacements + type_replacements:4d} changes written to: {result.path}",
+                severity="INFO",
+            )
+            self.total_type_replacements += type_replacements
+            self.total_function_replacements += function_replacements
+        self.total_files_changed += 1
+
+    def summary(self) -> None:
+        utils.log("─" * 80 + "\nSummary:")
+        utils.log(f"Total function blocks replaced: {self.total_function_replacements}")
+        utils.log(f"Total enumerators replaced: {self.total_enums_replacements}")
+        utils.log(f"Total types replaced: {self.total_type_replacements}")
+        utils.log(f"Total files changed: {self.total_files_changed}")
+
+        if (
+            self.total_function_replacements == 0
+            and self.total_enums_replacements == 0
+            and self.total_type_replacements == 0
+        ):
+            utils.log(
+                "No functions or constants needed to be replaced.", severity="INFO"
+            )
+        else:
+            utils.log("Replacement completed successfully.", severity="INFO")
 
 
 def check_for_library(project_path: Path, library_names):
@@ -101,16 +145,35 @@ def check_for_library(project_path: Path, library_names):
     return [lib for lib in library_names if lib in content]
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Updates AsOpcUac and AsOpcUas function blocks, types and enumerators for AR 6"
+    )
+    parser.add_argument(
+        "project_path",
+        nargs="?",
+        type=str,
+        default=os.getcwd(),
+        help="Automation Studio 4.x path containing *.apj file",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", required=False)
+    rewrite.add_arguments(parser)
+    project_index.add_arguments(parser)
+    change_set.add_arguments(parser)
+
+    return parser.parse_args()
+
+
 def main():
-    project_path = sys.argv[1] if len(sys.argv) > 1 else os.getcwd()
+    args = parse_args()
+    project_path = args.project_path
     apj_file = utils.get_and_check_project_file(project_path)
 
     utils.log(f"Project path validated: {project_path}")
     utils.log(f"Using project file: {apj_file}\n")
 
     project_path = Path(project_path)
-    library_names = ["AsOpcUac", "AsOpcUas"]
-    found_libraries = check_for_library(project_path, library_names)
+    found_libraries = check_for_library(project_path, OpcUaMigration.libraries)
 
     utils.log(
         "This script will search for usages of AsOpcUac and AsOpcUas function blocks, types and enumerators and update the naming.",
@@ -121,101 +184,45 @@ def main():
         severity="WARNING",
     )
 
+    changes = change_set.start(args, Path(project_path))
+    if changes is None:
+        return
+
+    # A dry run changes nothing, so it runs without asking
+    proceed = "y"
     if not found_libraries:
         utils.log("Neither AsOpcUac nor AsOpcUas libraries found.", severity="INFO")
-        proceed = utils.ask_user(
-            "Do you want to proceed with replacing functions and constants anyway? (y/n) [y]: ",
-            extra_note="After conversion, the project will no longer compile in Automation Studio 4.",
-        )
+        if not args.dry_run:
+            proceed = utils.ask_user(
+                "Do you want to proceed with replacing functions and constants anyway? (y/n) [y]: ",
+                extra_note="After conversion, the project will no longer compile in Automation Studio 4.",
+            )
         if proceed != "y":
             utils.log("Operation cancelled. No changes were made.", severity="WARNING")
             return
     else:
         utils.log(f"Libraries found: {', '.join(found_libraries)}.", severity="INFO")
-        proceed = utils.ask_user(
-            "Do you want to continue? (y/n) [y]: ",
-            extra_note="After conversion, the project will no longer compile in Automation Studio 4.",
-        )
+        if not args.dry_run:
+            proceed = utils.ask_user(
+                "Do you want to continue? (y/n) [y]: ",
+                extra_note="After conversion, the project will no longer compile in Automation Studio 4.",
+            )
         if proceed != "y":
             utils.log("Operation cancelled. No changes were made.", severity="WARNING")
             return
 
-    fb_mapping = {
-        "UA_EventItemOperate": "UA_EventItemOperateList",
-        "UA_EventItemRemove": "UA_EventItemRemoveList",
-        "UA_GetNamespaceIndex": "UA_NamespaceGetIndex",
-        "UA_MonitoredItemAdd": "UA_MonitoredItemAddList",
-        "UA_MonitoredItemRemove": "UA_MonitoredItemRemoveList",
-        "UA_MonitoredItemOperate": "UA_MonitoredItemOperateList",
-        "UaClt_ReadBulk": "BrUa_ReadBulk",
-        "UaClt_WriteBulk": "BrUa_WriteBulk",
-    }
-
-    type_mapping = {
-        "UAArrayLength": "BrUaArrayLength",
-        "UAByteString": "BrUaByteString",
-        "UADataValue": "BrUaDataValue",
-        "UAEUInformation": "BrUaEUInformation",
-        "UAMethodArgument": "BrUaMethodArgument",
-        "UAMonitoringParameters": "UAMonitoringParameter",
-        "UAMonitoringSettings": "UAMonitoringParameter",
-        "UANoOfElements": "BrUaNoOfElements",
-        "UARange": "BrUaRange",
-        "UATimeZoneData": "BrUaTimeZoneDataType",
-        "UAVariantType": "BrUaVariantType",
-    }
-
-    enum_mapping = {
-        "UAAttributeId": "UAAttributeID",
-        "UANodeAdditionalInfo.AttributeId": "UANodeAdditionalInfo.AttributeID",
-        "UAIdentifierType_String": "UAIT_String",
-        "UAIdentifierType_Numeric": "UAIT_Numeric",
-        "UAIdentifierType_GUID": "UAIT_GUID",
-        "UAIdentifierType_Opaque": "UAIT_Opaque",
-        "UASecurityMsgMode_": "UASMM_",
-        "UASecurityPolicy_": "UASP_",
-        "UAVariantType_": "BrUaVariantType_",
-        "UADeadbandType_None": "UADT_None",
-        "UADeadbandType_Absolute": "UADT_Absolute",
-        "UADeadbandType_Percentt": "UADT_Percentt",
-    }
-
+    migration = OpcUaMigration(args.verbose)
     logical_path = Path(project_path) / "Logical"
-    total_function_replacements = 0
-    total_enums_replacements = 0
-    total_type_replacements = 0
-    total_files_changed = 0
+    excludes = project_index.ExcludeRules.for_project(project_path, args.exclude)
 
-    # Loop through the files in the "Logical" directory and process .st, .c, .cpp and .ab files
-    for file_path in logical_path.rglob("*"):
-        if file_path.suffix in {".st", ".c", ".cpp", ".ab"}:
-            enum_replacements, changed = replace_enums(file_path, enum_mapping)
-            if changed:
-                total_enums_replacements += enum_replacements
-                total_files_changed += 1
-        elif file_path.suffix in {".typ", ".var", ".fun"}:
-            function_replacements, type_replacements, changed = replace_fbs_and_types(
-                file_path, fb_mapping, type_mapping
-            )
-            if changed:
-                total_type_replacements += type_replacements
-                total_function_replacements += function_replacements
-                total_files_changed += 1
-
-    utils.log("─" * 80 + "\nSummary:")
-    utils.log(f"Total function blocks replaced: {total_function_replacements}")
-    utils.log(f"Total enumerators replaced: {total_enums_replacements}")
-    utils.log(f"Total types replaced: {total_type_replacements}")
-    utils.log(f"Total files changed: {total_files_changed}")
-
-    if (
-        total_function_replacements == 0
-        and total_enums_replacements == 0
-        and total_type_replacements == 0
-    ):
-        utils.log("No functions or constants needed to be replaced.", severity="INFO")
-    else:
-        utils.log("Replacement completed successfully.", severity="INFO")
+    with change_set.recording(changes):
+        # Loop through the files in the "Logical" directory and process .st, .c, .cpp and .ab files
+        files = project_index.iter_files(project_path, excludes, under=logical_path)
+        rewrite.run_migrations([migration], files, args.jobs)
+
+    migration.summary()
+
+    change_set.finish(changes, args, Path(project_path))
 
 
 if __name__ == "__main__":
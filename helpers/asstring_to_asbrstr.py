@@ -1,54 +1,80 @@
+import argparse
 import os
-import re
-import sys
 from pathlib import Path
 
-from utils import utils
+from utils import change_set, project_index, rewrite, utils
+from utils.discontinuation_db import get_discontinuation_db
 
 
-def replace_functions_and_constants(
-    file_path: Path, function_mapping: dict, constant_mapping: dict
-) -> tuple[int, int, bool]:
+def build_rewriter(function_mapping: dict, constant_mapping: dict) -> rewrite.Rewriter:
     """
-    Replace function calls and constants in a file based on the provided mappings.
+    Compile the function and constant mappings into one rewrite pass.
     """
-    original_content, original_encoding, original_bytes = utils.read_file_with_encoding(
-        file_path
-    )
+    rewriter = rewrite.Rewriter()
+    # Replace function calls, "name (" becomes "new_name("
+    rewriter.replace("functions", function_mapping, suffix=r"\s*\(", tail="(")
+    # Replace constants
+    rewriter.replace("constants", constant_mapping)
+    return rewriter
 
-    modified_content = original_content
-    function_replacements = 0
-    constant_replacements = 0
 
-    # Replace function calls
-    for old_func, new_func in function_mapping.items():
+class AsStringMigration(rewrite.Migration):
+    """
+    Replaces AsString and AsWStr functions and constants in .st and .ab files
+    with their AsBrStr equivalents.
+    """
 
-        pattern = rf"\b{re.escape(old_func)}\s*\("
-        replacement = f"{new_func}("
-        modified_content, num_replacements = re.subn(
-            pattern, replacement, modified_content
-        )
-        function_replacements += num_replacements
+    name = "asstring"
+    libraries = ["AsString", "AsWStr"]
 
-    # Replace constants
-    for old_const, new_const in constant_mapping.items():
-        pattern = rf"\b{re.escape(old_const)}\b"
-        replacement = new_const
-        modified_content, num_replacements = re.subn(
-            pattern, replacement, modified_content
-        )
-        constant_replacements += num_replacements
-
-    if utils.write_file_if_changed(
-        file_path, modified_content, original_encoding, original_bytes
-    ):
-        utils.log(
-            f"{function_replacements + constant_replacements:4d} changes written to: {file_path}",
-            severity="INFO",
-        )
-        return function_replacements, constant_replacements, True
-
-    return function_replacements, constant_replacements, False
+    def __init__(self, verbose: bool = False):
+        super().__init__(verbose)
+        function_mapping = {}
+        for item in get_discontinuation_db().deprecated_string_functions:
+            function_mapping[item] = (
+                f"br{item}" if item.startswith("wcs") else f"brs{item}"
+            )
+
+        constant_mapping = {
+            "U8toUC": "brwU8toUC",
+            "UCtoU8": "brwUCtoU8",
+        }
+
+        self.rewriter = build_rewriter(function_mapping, constant_mapping)
+        self.total_function_replacements = 0
+        self.total_constant_replacements = 0
+        self.total_files_changed = 0
+
+    def rewriter_for(self, file_path: Path) -> rewrite.Rewriter | None:
+        return self.rewriter if file_path.suffix in {".st", ".ab"} else None
+
+    def report(self, result: rewrite.FileRewrite) -> None:
+        if result.changed:
+            function_replacements = result.total("functions")
+            constant_replacements = result.total("constants")
+            utils.log(
+                f"{function_replacements + constant_replacements:4d} changes written to: {result.path}",
+                severity="INFO",
+            )
+            self.total_function_replacements += function_replacements
+            self.total_constant_replacements += constant_replacements
+            self.total_files_changed += 1
+
+    def summary(self) -> None:
+        utils.log("─" * 80 + "\nSummary:")
+        utils.log(f"Total functions replaced: {self.total_function_replacements}")
+        utils.log(f"Total constants replaced: {self.total_constant_replacements}")
+        utils.log(f"Total files changed: {self.total_files_changed}")
+
+        if (
+            self.total_function_replacements == 0
+            and self.total_constant_replacements == 0
+        ):
+            utils.log(
+                "No functions or constants needed to be replaced.", severity="INFO"
+            )
+        else:
+            utils.log("Replacement completed successfully.", severity="INFO")
 
 
 def check_for_library(project_path: Path, library_names: list) -> list:
@@ -64,15 +90,34 @@ def check_for_library(project_path: Path, library_names: list) -> list:
     return [lib for lib in library_names if lib in content]
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Replaces AsString and AsWStr functions and constants with their AsBrStr equivalents"
+    )
+    parser.add_argument(
+        "project_path",
+        nargs="?",
+        type=str,
+        default=os.getcwd(),
+        help="Automation Studio 4.x path containing *.apj file",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", required=False)
+    rewrite.add_arguments(parser)
+    project_index.add_arguments(parser)
+    change_set.add_arguments(parser)
+
+    return parser.parse_args()
+
+
 def main():
-    project_path = Path(sys.argv[1] if len(sys.argv) > 1 else os.getcwd())
+    args = parse_args()
+    project_path = Path(args.project_path)
     apj_file = utils.get_and_check_project_file(project_path)
 
     utils.log(f"Project path validated: {project_path}")
     utils.log(f"Using project file: {apj_file}\n")
 
-    library_names = ["AsString", "AsWStr"]
-    found_libraries = check_for_library(project_path, library_names)
+    found_libraries = check_for_library(project_path, AsStringMigration.libraries)
 
     utils.log(
         "This script will search for usages of AsString and AsWStr functions and constants and replace them with the AsBr equivalents.",
@@ -83,60 +128,43 @@ def main():
         severity="WARNING",
     )
 
+    changes = change_set.start(args, Path(project_path))
+    if changes is None:
+        return
+
+    # A dry run changes nothing, so it runs without asking
+    proceed = "y"
     if not found_libraries:
         utils.log("Neither AsString nor AsWStr libraries found.", severity="INFO")
-        proceed = utils.ask_user(
-            "Do you want to proceed with replacing functions and constants anyway? (y/n) [y]: ",
-            extra_note="Note: This script updates code to use AsBrStr. You must manually remove AsString/AsWStr and add AsBrStr/AsBrWStr in the library manager. Compatible with AS4 and AS6 after that.",
-        )
+        if not args.dry_run:
+            proceed = utils.ask_user(
+                "Do you want to proceed with replacing functions and constants anyway? (y/n) [y]: ",
+                extra_note="Note: This script updates code to use AsBrStr. You must manually remove AsString/AsWStr and add AsBrStr/AsBrWStr in the library manager. Compatible with AS4 and AS6 after that.",
+            )
     else:
         utils.log(f"Libraries found: {', '.join(found_libraries)}.", severity="INFO")
-        proceed = utils.ask_user(
-            "Do you want to continue? (y/n) [y]: ",
-            extra_note="Note: After conversion, manually remove AsString/AsWStr and add AsBrStr/AsBrWStr in the library manager.",
-        )
+        if not args.dry_run:
+            proceed = utils.ask_user(
+                "Do you want to continue? (y/n) [y]: ",
+                extra_note="Note: After conversion, manually remove AsString/AsWStr and add AsBrStr/AsBrWStr in the library manager.",
+            )
 
     if proceed != "y":
         utils.log("Operation cancelled. No changes were made.", severity="WARNING")
         return
 
-    info = utils.load_discontinuation_info("deprecated_string_functions")
-    function_mapping = {}
-    for item in info:
-        function_mapping[item] = f"br{item}" if item.startswith("wcs") else f"brs{item}"
-
-    constant_mapping = {
-        "U8toUC": "brwU8toUC",
-        "UCtoU8": "brwUCtoU8",
-    }
-
-    logical_path = project_path / "Logical"
-    total_function_replacements = 0
-    total_constant_replacements = 0
-    total_files_changed = 0
-
-    # Loop through the files in the "Logical" directory and process .st and .ab files
-    for file_path in logical_path.rglob("*"):
-        if file_path.suffix in {".st", ".ab"}:
-            function_replacements, constant_replacements, changed = (
-                replace_functions_and_constants(
-                    file_path, function_mapping, constant_mapping
-                )
-            )
-            if changed:
-                total_function_replacements += function_replacements
-                total_constant_replacements += constant_replacements
-                total_files_changed += 1
-
-    utils.log("─" * 80 + "\nSummary:")
-    utils.log(f"Total functions replaced: {total_function_replacements}")
-    utils.log(f"Total constants replaced: {total_constant_replacements}")
-    utils.log(f"Total files changed: {total_files_changed}")
-
-    if total_function_replacements == 0 and total_constant_replacements == 0:
-        utils.log("No functions or constants needed to be replaced.", severity="INFO")
-    else:
-        utils.log("Replacement completed successfully.", severity="INFO")
+    migration = AsStringMigration(args.verbose)
+    logical_path = Path(project_path) / "Logical"
+    excludes = project_index.ExcludeRules.for_project(project_path, args.exclude)
+
+    with change_set.recording(changes):
+        # Loop through the files in the "Logical" directory and process .st and .ab files
+        files = project_index.iter_files(project_path, excludes, under=logical_path)
+        rewrite.run_migrations([migration], files, args.jobs)
+
+    migration.summary()
+
+    change_set.finish(changes, args, Path(project_path))
 
 
 if __name__ == "__main__":
@@ -2,23 +2,17 @@
 # To migrate a project from an older mappMotion to mappMotion 6.x, modifications to the program are necessary.
 import argparse
 import os
-import re
 from pathlib import Path
 
-from utils import utils
+from utils import change_set, project_index, rewrite, utils
 
 
-def warn_inputs(file_path: Path, item_mappings):
+def warn_inputs(found: dict, item_mappings):
     """
-    Warn about enumerators and FB-inputs in a file based on the provided mappings.
+    Warn about enumerators and FB-inputs found in a file based on the provided mappings.
     """
-
-    original_content = utils.read_file(file_path)
-
     for old_item, new_item in item_mappings.items():
-        pattern = re.escape(old_item)
-        matches = re.findall(pattern, original_content)
-        if matches:
+        if old_item in found:
             utils.log(
                 f"Found usages of '{old_item}', needs replacing with '{new_item}' "
                 "- skipping auto-replacement due to possible functionality change",
@@ -27,112 +21,13 @@ def warn_inputs(file_path: Path, item_mappings):
             )
 
 
-def replace_enums(file_path: Path, enum_mapping, verbose=False):
-    """
-    Replace enumerators in a file based on the provided mappings.
-    """
-
-    original_content, original_encoding, original_bytes = utils.read_file_with_encoding(
-        file_path
-    )
-    modified_content = original_content
-    enum_replacements = 0
-
-    # Replace enums
-    for old_const, new_const in enum_mapping.items():
-        pattern = re.escape(old_const)
-        replacement = new_const
-        modified_content, num_replacements = re.subn(
-            pattern, replacement, modified_content
-        )
-        if num_replacements > 0 and verbose:
-            utils.log(
-                f"Replaced {num_replacements} occurrence(s) of '{old_const}' with '{new_const}'",
-                severity="INFO",
-            )
-        enum_replacements += num_replacements
-
-    if utils.write_file_if_changed(
-        file_path, modified_content, original_encoding, original_bytes
-    ):
-        utils.log(
-            f"{enum_replacements :4d} changes written to: {file_path}", severity="INFO"
-        )
-        return enum_replacements, True
-
-    return enum_replacements, False
-
-
-def replace_inputs(file_path: Path, input_mapping, verbose=False):
-    """
-    Replace various FUB-inputs in code based on the provided mappings
-    """
-    original_content, original_encoding, original_bytes = utils.read_file_with_encoding(
-        file_path
-    )
-    modified_content = original_content
-    input_replacements = 0
-
-    # Replace function inputs
-    for old_input, new_input in input_mapping.items():
-        # We add the leading "." on both, old and new, to be sure to only replace elements of FBs
-        old_input = f".{old_input}"
-        replacement = f".{new_input}"
-        pattern = rf"\b{re.escape(old_input)}\b"
-        modified_content, num_replacements = re.subn(
-            pattern, replacement, modified_content
-        )
-        if num_replacements > 0 and verbose:
-            utils.log(
-                f"Replaced {num_replacements} occurrence(s) of '{old_input}' with '{replacement}'",
-                severity="INFO",
-            )
-        input_replacements += num_replacements
-
-    if utils.write_file_if_changed(
-        file_path, modified_content, original_encoding, original_bytes
-    ):
-        utils.log(
-            f"{input_replacements:4d} change(s) written to: {file_path}",
-            severity="INFO",
-        )
-        return input_replacements, True
-
-    return input_replacements, False
-
-
-def replace_fbs_and_types(
-    file_path: Path, fb_mapping, type_mapping, fb_removal_mapping, verbose=False
-):
+def warn_removed_fbs(found: dict, fb_removal_mapping):
     """
-    Replace function block calls and types in a file based on the provided mappings.
+    Warn about function blocks found in a file whose functionality moved to another FB.
     """
-
-    original_content, original_encoding, original_bytes = utils.read_file_with_encoding(
-        file_path
-    )
-    modified_content = original_content
-    fb_replacements = 0
-    type_replacements = 0
-
-    # Replace function blocks
-    for old_fb, new_fb in fb_mapping.items():
-        pattern = rf"\b{re.escape(old_fb)}\b"
-        replacement = new_fb
-        modified_content, num_replacements = re.subn(
-            pattern, replacement, modified_content
-        )
-        if num_replacements > 0 and verbose:
-            utils.log(
-                f"Replaced {num_replacements} instance(s) of FB '{old_fb}' with '{new_fb}'",
-                severity="INFO",
-            )
-        fb_replacements += num_replacements
-
     for old_fb, new_fb in fb_removal_mapping.items():
-        pattern = rf"\b{re.escape(old_fb)}\b"
         replacement = new_fb
-        if re.search(pattern, modified_content):
+        if old_fb in found:
             if "." in replacement:
                 parts = replacement.split(".")
                 utils.log(
@@ -150,30 +45,231 @@ def replace_fbs_and_types(
                     severity="MANDATORY",
                 )
 
-    # Replace types
-    for old_type, new_type in type_mapping.items():
-        pattern = rf"\b{re.escape(old_type)}\b"
-        replacement = new_type
-        modified_content, num_replacements = re.subn(
-            pattern, replacement, modified_content
-        )
+
+def count_replacements(counts: dict, mapping: dict, what: str, verbose=False) -> int:
+    """
+    Total number of replacements of a mapping in a file, logging every
+    replaced item in verbose mode.
+    """
+    total = 0
+    for old_item, new_item in mapping.items():
+        num_replacements = counts.get(old_item, 0)
         if num_replacements > 0 and verbose:
             utils.log(
-                f"Replaced {num_replacements} instance(s) of type '{old_type}' with '{new_type}'",
+                f"Replaced {num_replacements} {what} '{old_item}' with '{new_item}'",
                 severity="INFO",
             )
-        type_replacements += num_replacements
+        total += num_replacements
+    return total
+
+
+def build_rewriters(
+    input_mapping_warning: dict,
+    enum_mapping: dict,
+    dotted_input_mapping: dict,
+    fb_mapping: dict,
+    fb_removal_mapping: dict,
+    type_mapping: dict,
+) -> tuple[rewrite.Rewriter, rewrite.Rewriter]:
+    """
+    Compile the mappings into one rewrite pass for the code files (enumerators
+    and FB-inputs) and one for the declaration files (function blocks and types).
+    """
+    code = (
+        rewrite.Rewriter()
+        .find("input_warnings", input_mapping_warning, prefix="", suffix="")
+        .replace("enums", enum_mapping, prefix="", suffix="")
+        .replace("inputs", dotted_input_mapping)
+    )
+    declarations = (
+        rewrite.Rewriter()
+        .replace("function_blocks", fb_mapping)
+        .find("removed_function_blocks", fb_removal_mapping)
+        .replace("types", type_mapping)
+    )
+    return code, declarations
 
-    if utils.write_file_if_changed(
-        file_path, modified_content, original_encoding, original_bytes
-    ):
-        utils.log(
-            f"{fb_replacements + type_replacements:4d} change(s) written to: {file_path}",
-            severity="INFO",
+
+class MappMotionMigration(rewrite.Migration):
+    """
+    Updates mappMotion enumerators and FB-inputs in code files and function
+    blocks and types in declaration files for mappMotion 6.
+    """
+
+    name = "mappmotion"
+    libraries = ["McAxis", "MpAxis", "McBase", "McAcpAx", "McAcpTrak", "McAcpAx"]
+
+    def __init__(self, verbose: bool = False):
+        super().__init__(verbose)
+        input_mapping = {
+            "Parameter.AxesGroup": "Parameter.Component",
+            "StandBy": "Standby",
+            "DataAdress": "DataAddress",
+            "Info.AutoTuneDone": "AutoTuneDone",
+            "Info.MechDeviationCompState": "Info.AxisAdditionalInfo.MechDeviationCompState",
+            "Info.AutoTuneState": "Info.AxisAdditionalInfo.AutoTuneState",
+            "Info.CommunicationState": "Info.AxisAdditionalInfo.CommunicationState",
+            "Info.StartupCount": "Info.AxisAdditionalInfo.StartupCount",
+            "Info.DigitalInputStatus": "Info.AxisAdditionalInfo.DigitalInputStatus",
+            "Info.PLCopenState": "Info.AxisAdditionalInfo.PLCopenState",
+            "Info.ActualOffsetShift": "Info.Offset.ActualShift",
+            "Info.OffsetValid": "Info.Offset.Valid",
+            "Info.ActualPhaseShift": "Info.Phasing.ActualShift",
+            "Info.PhasingValid": "Info.Phasing.Valid",
+            "Common.AdvancedParameters.StartStateParam.StartState": "Common.StartStateParam.StartState",
+            "Common.AdvancedParameters.StartStateParam.MasterStartRelPos": "Common.StartStateParam.MasterStartPositionInCam",
+            "CompensationParameters.MasterCamLeadIn": "AdvancedParameters.MasterCamLeadIn",
+            "AdvancedParameters.ShuttleIndex": "AdvancedParameters.ShuttleID",
+            "AssemblyInfo.ShuttlesCount": "AssemblyInfo.ShuttleCount.Count",
+            "AssemblyInfo.ShuttlesInStandstillCount": "AssemblyInfo.ShuttleCount.InStandstill",
+            "AssemblyInfo.ShuttlesInDisabledCount": "AssemblyInfo.ShuttleCount.InDisabled",
+            "AssemblyInfo.ShuttlesInStoppingCount": "AssemblyInfo.ShuttleCount.InStopping",
+            "AssemblyInfo.ShuttlesInErrorStopCount": "AssemblyInfo.ShuttleCount.InErrorStop",
+            "AssemblyInfo.VirtualShuttlesCount": "AssemblyInfo.ShuttleCount.VirtualShuttles",
+            "AssemblyInfo.ConvoysCount": "AssemblyInfo.ShuttleCount.Convoys",
+            "AssemblyInfo.SegmentsInDisabledCount": "AssemblyInfo.SegmentCount.SegmentsInDisabled",
+            "AssemblyInfo.SegmentsInStoppingCount": "AssemblyInfo.SegmentCount.SegmentsInStopping",
+            "AssemblyInfo.SegmentsInErrorStopCount": "AssemblyInfo.SegmentCount.SegmentsInErrorStop",
+            "Distance.Junction": "Distance.Diverter",
+        }
+
+        input_mapping_warning = {"StopMode": "AdvancedParameters.StopMode"}
+
+        type_mapping = {
+            "MpAxisCouplingRecoveryParType": "MpAxisRecoveryParType",
+            "MpAxisSequencerRecoveryParType": "MpAxisRecoveryParType",
+            "McAcpAxCamAutDefineType": "McCamAutDefineType",
+            "McAcpTrakAdvSecAddShWithMovType": "McAcpTrakAdvSecAddShuttleType",
+        }
+
+        fb_mapping = {
+            "MC_BR_CamAutomatSetPar_AcpAx": "MC_BR_CamAutomatSetPar",
+            "MC_BR_CamAutomatGetPar_AcpAx": "MC_BR_CamAutomatGetPar",
+            "MC_BR_ShSetUserId_AcpTrak": "MC_BR_ShSetUserID_AcpTrak",
+            "MC_BR_TrgPointGetInfo_AcpTrak": "MC_BR_TrgPointReadInfo_AcpTrak",
+            "MC_BR_SecAddShWithMov_AcpTrak": "MC_BR_SecAddShuttle_AcpTrak",
+            "MC_BR_AsmGetShuttleSel_AcpTrak": "MC_BR_AsmGetShuttle_AcpTrak",
+            "MC_BR_SecGetShuttleSel_AcpTrak": "MC_BR_SecGetShuttle_AcpTrak",
+        }
+
+        fb_removal_mapping = {
+            "MC_BR_AsmSegGrpPowerOn_AcpTrak": "MC_BR_AsmPowerOn_AcpTrak.SegmentGroup",
+            "MC_BR_AsmSegGrpPowerOff_AcpTrak": "MC_BR_AsmPowerOff_AcpTrak.SegmentGroup",
+        }
+
+        enum_mapping = {
+            "mcAFDCSACOPOSMULTIDO_SS1X111": "mcAFDCSACOPOSMULTIDO_SS2X111",
+            "mcAFDCSACOPOSMULTIDO_SS1X113": "mcAFDCSACOPOSMULTIDO_SS2X113",
+            "mcAFDCSACOPOSMULTIDO_SS1X115": "mcAFDCSACOPOSMULTIDO_SS2X115",
+            "mcAFDCSACOPOSMULTIDO_SS1X116": "mcAFDCSACOPOSMULTIDO_SS2X116",
+        }
+
+        self.input_mapping_warning = input_mapping_warning
+        self.enum_mapping = enum_mapping
+        # We add the leading "." on both, old and new, to be sure to only replace elements of FBs
+        self.dotted_input_mapping = {
+            f".{old}": f".{new}" for old, new in input_mapping.items()
+        }
+        self.fb_mapping = fb_mapping
+        self.fb_removal_mapping = fb_removal_mapping
+        self.type_mapping = type_mapping
+        self.code_rewriter, self.declaration_rewriter = build_rewriters(
+            input_mapping_warning,
+            enum_mapping,
+            self.dotted_input_mapping,
+            fb_mapping,
+            fb_removal_mapping,
+            type_mapping,
         )
-        return fb_replacements, type_replacements, True
+        self.total_input_replacements = 0
+        self.total_function_replacements = 0
+        self.total_enums_replacements = 0
+        self.total_type_replacements = 0
+        self.total_files_changed = 0
 
-    return fb_replacements, type_replacements, False
+    def rewriter_for(self, file_path: Path) -> rewrite.Rewriter | None:
+        # For now, we skip all libraries, ideally we would also search and replace in user libraries
+        if "Libraries" in file_path.parts:
+            return None
+        if file_path.suffix in {".st", ".c", ".cpp", ".ab"}:
+            return self.code_rewriter
+        if file_path.suffix in {".typ", ".var", ".fun"}:
+            return self.declaration_rewriter
+        return None
+
+    def report(self, result: rewrite.FileRewrite) -> None:
+        if "enums" in result.counts:
+            warn_inputs(result.counts["input_warnings"], self.input_mapping_warning)
+            enum_replacements = count_replacements(
+                result.counts["enums"],
+                self.enum_mapping,
+                "occurrence(s) of",
+                self.verbose,
+            )
+            input_replacements = count_replacements(
+                result.counts["inputs"],
+                self.dotted_input_mapping,
+                "occurrence(s) of",
+                self.verbose,
+            )
+            if result.changed:
+                utils.log(
+                    f"{enum_replacements + input_replacements:4d} change(s) written to: {result.path}",
+                    severity="INFO",
+                )
+                self.total_enums_replacements += enum_replacements
+                self.total_input_replacements += input_replacements
+                self.total_files_changed += 1
+        else:
+            function_replacements = count_replacements(
+                result.counts["function_blocks"],
+                self.fb_mapping,
+                "instance(s) of FB",
+                self.verbose,
+            )
+            warn_removed_fbs(
+                result.counts["removed_function_blocks"], self.fb_removal_mapping
+            )
+            type_replacements = count_replacements(
+                result.counts["types"],
+                self.type_mapping,
+                "instance(s) of type",
+                self.verbose,
+            )
+            if result.changed:
+                utils.log(
+                    f"{function_replacements + type_replacements:4d} change(s) written to: {result.path}",
+                    severity="INFO",
+                )
+                self.total_type_replacements += type_replacements
+                self.total_function_replacements += function_replacements
+                self.total_files_changed += 1
+
+    def summary(self) -> None:
+        utils.log("─" * 80 + "\nSummary:")
+        utils.log(f"Total function blocks replaced: {self.total_function_replacements}")
+        utils.log(
+            f"Total function block inputs replaced: {self.total_input_replacements}"
+        )
+        utils.log(f"Total enumerators replaced: {self.total_enums_replacements}")
+        utils.log(f"Total types replaced: {self.total_type_replacements}")
+        utils.log(f"Total files changed: {self.total_files_changed}")
+
+        if all(
+            count == 0
+            for count in [
+                self.total_function_replacements,
+                self.total_enums_replacements,
+                self.total_type_replacements,
+                self.total_input_replacements,
+            ]
+        ):
+            utils.log(
+                "No functions, inputs or constants needed to be replaced.",
+                severity="INFO",
+            )
+        else:
+            utils.log("Replacement completed successfully.", severity="INFO")
 
 
 def check_for_library(project_path: Path, library_names: list):
@@ -203,6 +299,9 @@ def parse_args():
         help="Automation Studio 4.x path containing *.apj file",
     )
     parser.add_argument("-v", "--verbose", action="store_true", required=False)
+    rewrite.add_arguments(parser)
+    project_index.add_arguments(parser)
+    change_set.add_arguments(parser)
 
     return parser.parse_args()
 
@@ -215,8 +314,7 @@ def main():
     utils.log(f"Project path validated: {project_path}")
     utils.log(f"Using project file: {apj_file}\n")
 
-    library_names = ["McAxis", "MpAxis", "McBase", "McAcpAx", "McAcpTrak", "McAcpAx"]
-    found_libraries = check_for_library(project_path, library_names)
+    found_libraries = check_for_library(project_path, MappMotionMigration.libraries)
 
     utils.log(
         "This script will search for usages of mappMotion function blocks, types and enumerators and update the naming.",
@@ -227,147 +325,47 @@ def main():
         severity="WARNING",
     )
 
+    changes = change_set.start(args, Path(project_path))
+    if changes is None:
+        return
+
+    # A dry run changes nothing, so it runs without asking
+    proceed = "y"
     if not found_libraries:
         utils.log(
             "None of the libraries supported by the script were found.", severity="INFO"
         )
-        proceed = utils.ask_user(
-            "Do you want to proceed with replacing functions and constants anyway? (y/n) [y]: ",
-            extra_note="After conversion, the project will no longer compile in Automation Studio 4.",
-        )
+        if not args.dry_run:
+            proceed = utils.ask_user(
+                "Do you want to proceed with replacing functions and constants anyway? (y/n) [y]: ",
+                extra_note="After conversion, the project will no longer compile in Automation Studio 4.",
+            )
         if proceed not in ("", "y"):
             utils.log("Operation cancelled. No changes were made.", severity="WARNING")
             return
     else:
         utils.log(f"Libraries found: {', '.join(found_libraries)}.\n", severity="INFO")
-        proceed = utils.ask_user(
-            "Do you want to continue? (y/n) [y]: ",
-            extra_note="After conversion, the project will no longer compile in Automation Studio 4.",
-        )
+        if not args.dry_run:
+            proceed = utils.ask_user(
+                "Do you want to continue? (y/n) [y]: ",
+                extra_note="After conversion, the project will no longer compile in Automation Studio 4.",
+            )
         if proceed not in ("", "y"):
             utils.log("Operation cancelled. No changes were made.", severity="WARNING")
             return
 
-    input_mapping = {
-        "Parameter.AxesGroup": "Parameter.Component",
-        "StandBy": "Standby",
-        "DataAdress": "DataAddress",
-        "Info.AutoTuneDone": "AutoTuneDone",
-        "Info.MechDeviationCompState": "Info.AxisAdditionalInfo.MechDeviationCompState",
-        "Info.AutoTuneState": "Info.AxisAdditionalInfo.AutoTuneState",
-        "Info.CommunicationState": "Info.AxisAdditionalInfo.CommunicationState",
-        "Info.StartupCount": "Info.AxisAdditionalInfo.StartupCount",
-        "Info.DigitalInputStatus": "Info.AxisAdditionalInfo.DigitalInputStatus",
-        "Info.PLCopenState": "Info.AxisAdditionalInfo.PLCopenState",
-        "Info.ActualOffsetShift": "Info.Offset.ActualShift",
-        "Info.OffsetValid": "Info.Offset.Valid",
-        "Info.ActualPhaseShift": "Info.Phasing.ActualShift",
-        "Info.PhasingValid": "Info.Phasing.Valid",
-        "Common.AdvancedParameters.StartStateParam.StartState": "Common.StartStateParam.StartState",
-        "Common.AdvancedParameters.StartStateParam.MasterStartRelPos": "Common.StartStateParam.MasterStartPositionInCam",
-        "CompensationParameters.MasterCamLeadIn": "AdvancedParameters.MasterCamLeadIn",
-        "AdvancedParameters.ShuttleIndex": "AdvancedParameters.ShuttleID",
-        "AssemblyInfo.ShuttlesCount": "AssemblyInfo.ShuttleCount.Count",
-        "AssemblyInfo.ShuttlesInStandstillCount": "AssemblyInfo.ShuttleCount.InStandstill",
-        "AssemblyInfo.ShuttlesInDisabledCount": "AssemblyInfo.ShuttleCount.InDisabled",
-        "AssemblyInfo.ShuttlesInStoppingCount": "AssemblyInfo.ShuttleCount.InStopping",
-        "AssemblyInfo.ShuttlesInErrorStopCount": "AssemblyInfo.ShuttleCount.InErrorStop",
-        "AssemblyInfo.VirtualShuttlesCount": "AssemblyInfo.ShuttleCount.VirtualShuttles",
-        "AssemblyInfo.ConvoysCount": "AssemblyInfo.ShuttleCount.Convoys",
-        "AssemblyInfo.SegmentsInDisabledCount": "AssemblyInfo.SegmentCount.SegmentsInDisabled",
-        "AssemblyInfo.SegmentsInStoppingCount": "AssemblyInfo.SegmentCount.SegmentsInStopping",
-        "AssemblyInfo.SegmentsInErrorStopCount": "AssemblyInfo.SegmentCount.SegmentsInErrorStop",
-        "Distance.Junction": "Distance.Diverter",
-    }
-
-    input_mapping_warning = {"StopMode": "AdvancedParameters.StopMode"}
-
-    type_mapping = {
-        "MpAxisCouplingRecoveryParType": "MpAxisRecoveryParType",
-        "MpAxisSequencerRecoveryParType": "MpAxisRecoveryParType",
-        "McAcpAxCamAutDefineType": "McCamAutDefineType",
-        "McAcpTrakAdvSecAddShWithMovType": "McAcpTrakAdvSecAddShuttleType",
-    }
-
-    fb_mapping = {
-        "MC_BR_CamAutomatSetPar_AcpAx": "MC_BR_CamAutomatSetPar",
-        "MC_BR_CamAutomatGetPar_AcpAx": "MC_BR_CamAutomatGetPar",
-        "MC_BR_ShSetUserId_AcpTrak": "MC_BR_ShSetUserID_AcpTrak",
-        "MC_BR_TrgPointGetInfo_AcpTrak": "MC_BR_TrgPointReadInfo_AcpTrak",
-        "MC_BR_SecAddShWithMov_AcpTrak": "MC_BR_SecAddShuttle_AcpTrak",
-        "MC_BR_AsmGetShuttleSel_AcpTrak": "MC_BR_AsmGetShuttle_AcpTrak",
-        "MC_BR_SecGetShuttleSel_AcpTrak": "MC_BR_SecGetShuttle_AcpTrak",
-    }
-
-    fb_removal_mapping = {
-        "MC_BR_AsmSegGrpPowerOn_AcpTrak": "MC_BR_AsmPowerOn_AcpTrak.SegmentGroup",
-        "MC_BR_AsmSegGrpPowerOff_AcpTrak": "MC_BR_AsmPowerOff_AcpTrak.SegmentGroup",
-    }
-
-    enum_mapping = {
-        "mcAFDCSACOPOSMULTIDO_SS1X111": "mcAFDCSACOPOSMULTIDO_SS2X111",
-        "mcAFDCSACOPOSMULTIDO_SS1X113": "mcAFDCSACOPOSMULTIDO_SS2X113",
-        "mcAFDCSACOPOSMULTIDO_SS1X115": "mcAFDCSACOPOSMULTIDO_SS2X115",
-        "mcAFDCSACOPOSMULTIDO_SS1X116": "mcAFDCSACOPOSMULTIDO_SS2X116",
-    }
-
+    migration = MappMotionMigration(args.verbose)
     logical_path = Path(project_path) / "Logical"
-    total_input_replacements = 0
-    total_function_replacements = 0
-    total_enums_replacements = 0
-    total_type_replacements = 0
-    total_files_changed = 0
+    excludes = project_index.ExcludeRules.for_project(project_path, args.exclude)
 
-    # Loop through the files in the "Logical" directory and process .st, .c, .cpp and .ab files
+    with change_set.recording(changes):
+        # Loop through the files in the "Logical" directory and process .st, .c, .cpp and .ab files
+        files = project_index.iter_files(project_path, excludes, under=logical_path)
+        rewrite.run_migrations([migration], files, args.jobs)
 
-    for file_path in logical_path.rglob("*"):
-        # For now, we skip all libraries, ideally we would also search and replace in user libraries
-        if "Libraries" in file_path.parts:
-            continue
-        if file_path.suffix in {".st", ".c", ".cpp", ".ab"}:
-            warn_inputs(file_path, input_mapping_warning)
-            enum_replacements, changed = replace_enums(
-                file_path, enum_mapping, args.verbose
-            )
-            if changed:
-                total_enums_replacements += enum_replacements
-                total_files_changed += 1
-            input_replacements, changed = replace_inputs(
-                file_path, input_mapping, args.verbose
-            )
-            if changed:
-                total_input_replacements += input_replacements
-                total_files_changed += 1
-        elif file_path.suffix in {".typ", ".var", ".fun"}:
-            function_replacements, type_replacements, changed = replace_fbs_and_types(
-                file_path, fb_mapping, type_mapping, fb_removal_mapping, args.verbose
-            )
-            if changed:
-                total_type_replacements += type_replacements
-                total_function_replacements += function_replacements
-                total_files_changed += 1
-
-    utils.log("─" * 80 + "\nSummary:")
-    utils.log(f"Total function blocks replaced: {total_function_replacements}")
-    utils.log(f"Total function block inputs replaced: {total_input_replacements}")
-    utils.log(f"Total enumerators replaced: {total_enums_replacements}")
-    utils.log(f"Total types replaced: {total_type_replacements}")
-    utils.log(f"Total files changed: {total_files_changed}")
-
-    if all(
-        count == 0
-        for count in [
-            total_function_replacements,
-            total_enums_replacements,
-            total_type_replacements,
-            total_input_replacements,
-        ]
-    ):
-        utils.log(
-            "No functions, inputs or constants needed to be replaced.", severity="INFO"
-        )
-    else:
-        utils.log("Replacement completed successfully.", severity="INFO")
+    migration.summary()
+
+    change_set.finish(changes, args, Path(project_path))
 
 
 if __name__ == "__main__":
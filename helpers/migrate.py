@@ -0,0 +1,130 @@
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# Ensure repository root is on sys.path so 'from helpers import ...' works when
+# this script is executed directly (e.g., from the helpers directory).
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from utils import change_set, project_index, rewrite, utils
+
+from helpers.asmath_to_asbrmath import AsMathMigration
+from helpers.asopcua_update import OpcUaMigration
+from helpers.asstring_to_asbrstr import AsStringMigration
+from helpers.mappmotion_update import MappMotionMigration
+
+# All migrations, in the order they are applied to a file
+MIGRATIONS = [AsStringMigration, AsMathMigration, OpcUaMigration, MappMotionMigration]
+
+
+def find_libraries(project_path: Path, migrations: list) -> dict[str, list[str]]:
+    """
+    Returns the libraries of every migration that are used in the project.
+    """
+    pkg_file = project_path / "Logical" / "Libraries" / "Package.pkg"
+    if not pkg_file.is_file():
+        utils.log(f"Could not find Package.pkg file in: {pkg_file}", severity="ERROR")
+        return {migration.name: [] for migration in migrations}
+
+    content = utils.read_file(pkg_file)
+    return {
+        migration.name: [lib for lib in migration.libraries if lib in content]
+        for migration in migrations
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Runs several helper migrations in one pass over the project"
+    )
+    parser.add_argument(
+        "project_path",
+        nargs="?",
+        type=str,
+        default=os.getcwd(),
+        help="Automation Studio 4.x path containing *.apj file",
+    )
+    parser.add_argument(
+        "--migrations",
+        nargs="+",
+        choices=[migration.name for migration in MIGRATIONS],
+        default=[migration.name for migration in MIGRATIONS],
+        metavar="NAME",
+        help="Migrations to run: "
+        + ", ".join(migration.name for migration in MIGRATIONS)
+        + ". Defaults to all of them.",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", required=False)
+    rewrite.add_arguments(parser)
+    project_index.add_arguments(parser)
+    change_set.add_arguments(parser)
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    project_path = Path(args.project_path)
+    apj_file = utils.get_and_check_project_file(project_path)
+
+    utils.log(f"Project path validated: {project_path}")
+    utils.log(f"Using project file: {apj_file}\n")
+
+    selected = [m for m in MIGRATIONS if m.name in args.migrations]
+    found_libraries = find_libraries(project_path, selected)
+
+    utils.log(
+        f"This script will run the migrations {', '.join(m.name for m in selected)} in one pass over the project.",
+        severity="INFO",
+    )
+    for migration in selected:
+        found = found_libraries[migration.name]
+        utils.log(
+            f"{migration.name}: "
+            + (
+                f"libraries found: {', '.join(found)}."
+                if found
+                else "none of its libraries were found."
+            ),
+            severity="INFO",
+        )
+    utils.log(
+        "Before proceeding, make sure you have a backup or are using version control (e.g., Git).",
+        severity="WARNING",
+    )
+
+    changes = change_set.start(args, project_path)
+    if changes is None:
+        return
+
+    # A dry run changes nothing, so it runs without asking
+    if not args.dry_run:
+        proceed = utils.ask_user(
+            "Do you want to continue? (y/n) [y]: ",
+            extra_note="After conversion, the project will no longer compile in Automation Studio 4. "
+            "Libraries like AsMath and AsString must be swapped manually in the library manager.",
+        )
+        if proceed not in ("", "y"):
+            utils.log("Operation cancelled. No changes were made.", severity="WARNING")
+            return
+
+    migrations = [migration(args.verbose) for migration in selected]
+    logical_path = project_path / "Logical"
+    excludes = project_index.ExcludeRules.for_project(project_path, args.exclude)
+
+    with change_set.recording(changes):
+        files = project_index.iter_files(project_path, excludes, under=logical_path)
+        rewrite.run_migrations(migrations, files, args.jobs)
+
+    for migration in migrations:
+        utils.log(f"\nResults of {migration.name}:")
+        migration.summary()
+
+    change_set.finish(changes, args, project_path)
+
+
+if __name__ == "__main__":
+    main()
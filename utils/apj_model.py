@@ -0,0 +1,128 @@
+# Parsed Automation Studio project file (.apj), shared by the checks
+import os
+import re
+import threading
+from pathlib import Path
+from typing import NamedTuple
+
+from lxml import etree
+
+from utils import utils
+from utils.xml_cache import xml_cache
+
+# Attributes of the <?AutomationStudio ...?> processing instruction
+_instruction_pattern = re.compile(r"<\?AutomationStudio\s([^?]*)\?>")
+_version_pattern = re.compile(r'(?<!Working)Version="([\d.]+)')
+_working_version_pattern = re.compile(r'WorkingVersion="([\d.]+)')
+_package_pattern = re.compile(r'<(\w+)\s+Version="([^"]*)"')
+
+
+class TechnologyPackage(NamedTuple):
+    name: str
+    version: str
+
+    @property
+    def major_minor(self) -> tuple[int, int] | None:
+        """(major, minor) of the version, None if it does not start with two numbers."""
+        match = re.match(r"(\d+)\.(\d+)", self.version)
+        return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+class ApjModel:
+    """
+    The parts of a project file the checks need: the Automation Studio version
+    it was saved with, the technology packages with their versions and the
+    configurations of the project (from Physical/Physical.pkg).
+
+    If the .apj is not valid XML, error holds the parse error and the versions
+    and packages are taken from the plain text instead.
+    """
+
+    def __init__(self, apj_path: Path):
+        self.path = Path(apj_path)
+        self.version: str | None = None
+        self.working_version: str | None = None
+        # Technology packages by element name (e.g. "mappView"), in file order
+        self.packages: dict[str, TechnologyPackage] = {}
+        self.configurations: list[str] = []
+        self.error: Exception | None = None
+
+        try:
+            self._parse(xml_cache.parse(self.path))
+        except Exception as e:
+            self.error = e
+            self._scan_text(utils.read_file(self.path))
+        self._read_configurations()
+
+    def _parse(self, tree: etree._ElementTree) -> None:
+        root = tree.getroot()
+        for node in root.itersiblings(preceding=True):
+            if isinstance(node, etree._ProcessingInstruction):
+                if node.target == "AutomationStudio":
+                    self._read_versions(node.text or "")
+        packages = root.find("{*}TechnologyPackages")
+        if packages is None:
+            return
+        for package in packages:
+            if not isinstance(package.tag, str):
+                continue
+            name = etree.QName(package).localname
+            self.packages[name] = TechnologyPackage(name, package.get("Version", ""))
+
+    def _scan_text(self, content: str) -> None:
+        instruction = _instruction_pattern.search(content)
+        if instruction:
+            self._read_versions(instruction.group(1))
+        start = content.find("<TechnologyPackages")
+        end = content.find("</TechnologyPackages>", start)
+        if start == -1:
+            return
+        section = content[start:end] if end != -1 else content[start:]
+        for name, version in _package_pattern.findall(section):
+            self.packages[name] = TechnologyPackage(name, version)
+
+    def _read_versions(self, attributes: str) -> None:
+        match = _version_pattern.search(attributes)
+        if match:
+            self.version = match.group(1)
+        match = _working_version_pattern.search(attributes)
+        if match:
+            self.working_version = match.group(1)
+
+    def _read_configurations(self) -> None:
+        pkg_file = self.path.parent / "Physical" / "Physical.pkg"
+        if not pkg_file.is_file():
+            return
+        try:
+            root = xml_cache.parse(pkg_file).getroot()
+        except Exception:
+            return
+        for node in root.iterfind(".//{*}Object"):
+            if node.get("Type") == "Configuration" and node.text:
+                self.configurations.append(node.text.strip())
+
+    def package(self, name: str) -> TechnologyPackage | None:
+        """The technology package with the given element name, None if not used."""
+        return self.packages.get(name)
+
+
+_models: dict[str, tuple[tuple[int, int], ApjModel]] = {}
+_lock = threading.Lock()
+
+
+def load_apj(apj_path: Path) -> ApjModel:
+    """
+    Return the ApjModel of a project file. The model is built once per run and
+    shared by all checks, as long as the file is unchanged.
+    """
+    st = os.stat(apj_path)
+    stamp = (st.st_size, st.st_mtime_ns)
+    key = os.fspath(apj_path)
+    with _lock:
+        entry = _models.get(key)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+    model = ApjModel(apj_path)
+    with _lock:
+        _models[key] = (stamp, model)
+    return model
@@ -0,0 +1,535 @@
+# Pending file changes of the helper scripts, written in one transaction at the
+# end of a run or previewed instead (--dry-run)
+import contextlib
+import difflib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+# Change set that file writes and reads go through, None to use the disk directly
+_active = None
+
+# Directory in the project root that holds the rollback data of a commit in progress
+JOURNAL_DIR = ".migration_journal"
+MANIFEST_FILE = "manifest.json"
+
+# Permissions of a newly created file, staged files get them instead of 0600
+_umask = os.umask(0)
+os.umask(_umask)
+_NEW_FILE_MODE = 0o666 & ~_umask
+
+
+class FileChange:
+    """
+    A file's content before and after the pending changes. path is where the
+    file ends up, original_path where it is on disk (they differ after a rename).
+    The new content is held in memory (new_bytes) or, for files written
+    outside the change set (e.g. converted line by line), in a staged file.
+    """
+
+    def __init__(self, path: Path, encoding: str):
+        self.path = path
+        self.original_path = path
+        self.existed = path.exists()
+        self.encoding = encoding
+        self.modified = False
+        self.new_bytes: bytes | None = None
+        self.staged: Path | None = None
+
+    @property
+    def old_bytes(self) -> bytes | None:
+        # Read on demand, so renaming a large file does not load it
+        return self.original_path.read_bytes() if self.existed else None
+
+    def content(self) -> bytes | None:
+        """The new content, None if the file does not exist afterwards."""
+        if self.staged is not None:
+            return self.staged.read_bytes()
+        if self.modified:
+            return self.new_bytes
+        return self.old_bytes
+
+    @property
+    def changed(self) -> bool:
+        if self.path != self.original_path or self.staged is not None:
+            return True
+        return self.modified and self.new_bytes != self.old_bytes
+
+    def lines(self) -> tuple[list[str], list[str]]:
+        """Old and new content as lines, for diffing."""
+        old = (self.old_bytes or b"").decode(self.encoding, errors="replace")
+        new = (self.content() or b"").decode(self.encoding, errors="replace")
+        return old.splitlines(keepends=True), new.splitlines(keepends=True)
+
+
+class ChangeSet:
+    """
+    Collects the writes and renames of a helper script in memory. While it is
+    active (see recording), later reads of a changed file return the pending
+    content, so the script runs exactly as if it had written the files.
+
+    A dry run only reports the changes; otherwise commit writes them all at
+    the end of the run as one transaction. The lookups never iterate over the
+    changes, so other threads may read files while the changes are recorded.
+    """
+
+    def __init__(self, dry_run: bool = False):
+        self.dry_run = dry_run
+        self.changes: dict[Path, FileChange] = {}
+        # Original paths of renamed files
+        self.renamed: set[Path] = set()
+
+    def read_bytes(self, path: Path) -> bytes | None:
+        """Pending content of a file, None if it is not changed."""
+        change = self.changes.get(Path(path))
+        return None if change is None else change.content()
+
+    def exists(self, path: Path) -> bool:
+        path = Path(path)
+        if path in self.changes:
+            change = self.changes[path]
+            return change.existed or change.modified or change.staged is not None
+        if path in self.renamed:
+            return False
+        return path.exists()
+
+    def disk_path(self, path: Path) -> Path | None:
+        """
+        The file on disk that holds the pending content of path, None if the
+        content is only held in memory.
+        """
+        path = Path(path)
+        change = self.changes.get(path)
+        if change is None:
+            return path
+        if change.staged is not None:
+            return change.staged
+        if change.modified or not change.existed:
+            return None
+        return change.original_path
+
+    def _change(self, path: Path, encoding: str) -> FileChange:
+        path = Path(path)
+        change = self.changes.get(path)
+        if change is None:
+            change = self.changes[path] = FileChange(path, encoding)
+        return change
+
+    def write_bytes(self, path: Path, data: bytes, encoding: str) -> None:
+        change = self._change(path, encoding)
+        self._drop_staged(change)
+        change.new_bytes = data
+        change.modified = True
+        change.encoding = encoding
+
+    def write_staged(self, path: Path, staged: Path, encoding: str) -> None:
+        """
+        Take a file that already holds the new content of path. It must be in
+        the directory of path and is renamed into place on commit.
+        """
+        change = self._change(path, encoding)
+        self._drop_staged(change)
+        change.new_bytes = None
+        change.modified = True
+        change.staged = Path(staged)
+        change.encoding = encoding
+
+    @staticmethod
+    def _drop_staged(change: FileChange) -> None:
+        if change.staged is not None:
+            change.staged.unlink(missing_ok=True)
+            change.staged = None
+
+    def rename(self, source: Path, target: Path) -> None:
+        source = Path(source)
+        change = self._change(source, "utf-8")
+        change.path = Path(target)
+        self.changes[change.path] = change
+        del self.changes[source]
+        self.renamed.add(change.original_path)
+
+    def merge(self, other: "ChangeSet") -> None:
+        """Add the changes collected by another (e.g. a worker process's) change set."""
+        self.changes.update(other.changes)
+        self.renamed.update(other.renamed)
+
+    def discard(self) -> None:
+        """Drop all pending changes and remove their staged files."""
+        for change in self.changes.values():
+            self._drop_staged(change)
+        self.changes = {}
+        self.renamed = set()
+
+    def changed_files(self) -> list[FileChange]:
+        return [c for c in self.changes.values() if c.changed]
+
+    def commit(self, root: Path) -> int:
+        """
+        Write all changes to disk as one transaction:
+
+        1. write the new content of every file to a temporary file next to it
+           and flush it to disk,
+        2. keep the files that get replaced or removed in a journal in root
+           (hard links where the file system supports them, else copies)
+           and write its manifest,
+        3. rename the temporary files into place and remove renamed originals.
+
+        The journal is deleted once all files are in place. A failure within
+        this call restores the previous state right away; if the run is
+        interrupted, rollback(root) does it later.
+        Returns the number of files changed.
+        """
+        changed = self.changed_files()
+        if not changed:
+            self.discard()
+            return 0
+
+        root = Path(root)
+        journal = root / JOURNAL_DIR
+        # Fails if the journal of an interrupted run is still there
+        journal.mkdir()
+
+        targets = {change.path for change in changed}
+        touched = [c.original_path for c in changed if c.existed] + list(targets)
+        entries = [
+            {
+                "path": _relative(path, root),
+                "backup": f"{n}.bak" if path.exists() else None,
+            }
+            for n, path in enumerate(dict.fromkeys(touched))
+        ]
+        staged = {}
+        created = []
+        try:
+            for change in changed:
+                if change.staged is not None:
+                    staged[change.path] = change.staged
+                elif change.modified:
+                    staged[change.path] = staging_path(change.path)
+                    created.append(staged[change.path])
+            manifest = {
+                "state": "staging",
+                "files": entries,
+                "staged": [_relative(path, root) for path in staged.values()],
+            }
+            _write_manifest(journal, manifest)
+        except BaseException:
+            for path in created:
+                path.unlink(missing_ok=True)
+            shutil.rmtree(journal)
+            raise
+
+        try:
+            for change in changed:
+                if change.staged is not None:
+                    _fsync_file(change.staged)
+                elif change.modified:
+                    _write_synced(staged[change.path], change.new_bytes)
+            for entry in entries:
+                if entry["backup"] is not None:
+                    _link_or_copy(root / entry["path"], journal / entry["backup"])
+            manifest["state"] = "applying"
+            _write_manifest(journal, manifest)
+
+            # Plain renames first, their source may be the target of another change
+            for change in changed:
+                if change.path not in staged:
+                    os.replace(change.original_path, change.path)
+            for path, staged_path in staged.items():
+                os.replace(staged_path, path)
+            for change in changed:
+                if (
+                    change.path in staged
+                    and change.existed
+                    and change.original_path not in targets
+                ):
+                    change.original_path.unlink()
+            _fsync_directories({change.path.parent for change in changed})
+        except BaseException:
+            rollback(root)
+            raise
+        finally:
+            from utils.file_cache import content_cache
+
+            for path in dict.fromkeys(touched):
+                content_cache.invalidate(path)
+
+        shutil.rmtree(journal)
+        self.changes = {}
+        self.renamed = set()
+        return len(changed)
+
+    def to_json(self, root: Path) -> list[dict]:
+        """One entry per changed file, with its hunks in unified diff form."""
+        result = []
+        for change in self.changed_files():
+            old_lines, new_lines = change.lines()
+            hunks = list(_hunks(old_lines, new_lines))
+            entry = {
+                "path": _relative(change.path, root),
+                "lines_added": sum(
+                    1 for h in hunks for line in h["lines"] if line[0] == "+"
+                ),
+                "lines_removed": sum(
+                    1 for h in hunks for line in h["lines"] if line[0] == "-"
+                ),
+                "hunks": hunks,
+            }
+            if change.path != change.original_path:
+                entry["renamed_from"] = _relative(change.original_path, root)
+            result.append(entry)
+        return result
+
+    def to_unified_diff(self, root: Path) -> str:
+        out = []
+        for change in self.changed_files():
+            old_lines, new_lines = change.lines()
+            out.append(f"--- a/{_relative(change.original_path, root)}\n")
+            out.append(f"+++ b/{_relative(change.path, root)}\n")
+            for hunk in _hunks(old_lines, new_lines):
+                out.append(
+                    f"@@ -{hunk['old_start']},{hunk['old_lines']} "
+                    f"+{hunk['new_start']},{hunk['new_lines']} @@\n"
+                )
+                for line in hunk["lines"]:
+                    if line.endswith("\n"):
+                        out.append(line)
+                    else:
+                        out.append(line + "\n\\ No newline at end of file\n")
+        return "".join(out)
+
+    def report(self, diff_format: str, root: Path, stream=None) -> None:
+        """Write the changes as unified diff or JSON (to stdout by default)."""
+        stream = stream or sys.stdout
+        if diff_format == "json":
+            stream.write(json.dumps(self.to_json(root), indent=2) + "\n")
+        else:
+            stream.write(self.to_unified_diff(root))
+
+
+def staging_path(path: Path) -> Path:
+    """
+    Create an empty file next to path for its new content, under a unique
+    hidden name (.<name>.<random>.as6tmp), so no file of the project is
+    overwritten or deleted with it.
+    """
+    fd, name = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".as6tmp"
+    )
+    os.close(fd)
+    # It replaces path later, so it gets the permissions path has (or would get)
+    if path.exists():
+        shutil.copymode(path, name)
+    else:
+        os.chmod(name, _NEW_FILE_MODE)
+    return Path(name)
+
+
+def _relative(path: Path, root: Path) -> str:
+    try:
+        return Path(os.path.relpath(path, root)).as_posix()
+    except ValueError:
+        return Path(path).as_posix()  # Other drive on Windows
+
+
+def _hunks(old_lines: list[str], new_lines: list[str], context: int = 3):
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines)
+    for group in matcher.get_grouped_opcodes(context):
+        old_start, old_end = group[0][1], group[-1][2]
+        new_start, new_end = group[0][3], group[-1][4]
+        lines = []
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                lines.extend(" " + line for line in old_lines[i1:i2])
+                continue
+            lines.extend("-" + line for line in old_lines[i1:i2])
+            lines.extend("+" + line for line in new_lines[j1:j2])
+        yield {
+            # Line numbers are 1-based, an empty range starts before the line
+            "old_start": old_start + 1 if old_end > old_start else old_start,
+            "old_lines": old_end - old_start,
+            "new_start": new_start + 1 if new_end > new_start else new_start,
+            "new_lines": new_end - new_start,
+            "lines": lines,
+        }
+
+
+def _write_synced(path: Path, data: bytes) -> None:
+    with open(path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _fsync_file(path: Path) -> None:
+    with open(path, "r+b") as f:
+        os.fsync(f.fileno())
+
+
+def _fsync_directories(directories) -> None:
+    # Makes the renames durable; directories cannot be opened on Windows
+    if os.name == "nt":
+        return
+    for directory in directories:
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def _link_or_copy(source: Path, target: Path) -> None:
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+def _write_manifest(journal: Path, manifest: dict) -> None:
+    tmp_file = journal / (MANIFEST_FILE + ".tmp")
+    _write_synced(tmp_file, json.dumps(manifest, indent=2).encode("utf-8"))
+    os.replace(tmp_file, journal / MANIFEST_FILE)
+    _fsync_directories([journal])
+
+
+def rollback(root: Path) -> int:
+    """
+    Undo the changes of an interrupted commit in root with the files kept in
+    its journal, then delete the journal.
+    Returns the number of files restored.
+    """
+    journal = Path(root) / JOURNAL_DIR
+    manifest_file = journal / MANIFEST_FILE
+    restored = 0
+    if manifest_file.exists():
+        manifest = json.loads(manifest_file.read_text(encoding="utf-8"))
+        if manifest["state"] == "applying":
+            for entry in manifest["files"]:
+                path = Path(root) / entry["path"]
+                if entry["backup"] is None:
+                    path.unlink(missing_ok=True)
+                else:
+                    os.replace(journal / entry["backup"], path)
+                restored += 1
+        for staged in manifest["staged"]:
+            (Path(root) / staged).unlink(missing_ok=True)
+    shutil.rmtree(journal)
+    return restored
+
+
+def active() -> ChangeSet | None:
+    """The change set file operations currently go to, None if not recording."""
+    return _active
+
+
+@contextlib.contextmanager
+def recording(change_set: ChangeSet | None):
+    """
+    Route writes, renames and reads of the helper scripts through change_set
+    for the duration of the block. With None, files are written as usual.
+    If the block fails, the changes recorded so far are discarded.
+    """
+    global _active
+    previous = _active
+    _active = change_set
+    try:
+        yield change_set
+    except BaseException:
+        if change_set is not None:
+            change_set.discard()
+        raise
+    finally:
+        _active = previous
+
+
+def add_arguments(parser) -> None:
+    """Add the --dry-run and --rollback options to a helper script's argument parser."""
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Compute all changes without writing any file and print them as a diff",
+    )
+    parser.add_argument(
+        "--diff-format",
+        choices=("unified", "json"),
+        default="unified",
+        help="Output format of --dry-run (default: unified)",
+    )
+    parser.add_argument(
+        "--diff-output",
+        metavar="FILE",
+        help="Write the --dry-run output to FILE instead of the console",
+    )
+    parser.add_argument(
+        "--rollback",
+        action="store_true",
+        help="Undo the changes of an interrupted run and exit",
+    )
+
+
+def start(args, root: Path) -> ChangeSet | None:
+    """
+    Begin a run of a helper script in root. Returns the change set to record
+    the run in, or None if the script must stop: after --rollback, or because
+    an interrupted run has to be rolled back first.
+    """
+    from utils import utils
+
+    journal = Path(root) / JOURNAL_DIR
+    if args.rollback:
+        if not journal.exists():
+            utils.log(
+                "No interrupted run found, nothing to roll back.", severity="INFO"
+            )
+        else:
+            restored = rollback(root)
+            utils.log(
+                f"Interrupted run rolled back, {restored} file(s) restored.",
+                severity="INFO",
+            )
+        return None
+    if journal.exists():
+        utils.log(
+            f"A previous run was interrupted while writing its changes ({journal}). "
+            "Run the script again with --rollback to undo them.",
+            severity="ERROR",
+        )
+        return None
+    return ChangeSet(dry_run=args.dry_run)
+
+
+def finish(changes: ChangeSet, args, root: Path) -> None:
+    """End a helper run: report the changes of a dry run, else commit them."""
+    from utils import utils
+
+    if changes.dry_run:
+        report_dry_run(changes, args, root)
+        return
+    try:
+        written = changes.commit(root)
+    except Exception as e:
+        utils.log(
+            f"Writing the changes failed, no file was changed: {e}", severity="ERROR"
+        )
+        return
+    if written:
+        utils.log(f"Changes written to {written} file(s).", severity="INFO")
+
+
+def report_dry_run(changes: ChangeSet, args, root: Path) -> None:
+    """Log the outcome of a dry run and write its changes as requested by args."""
+    from utils import utils
+
+    utils.log(
+        f"Dry run: {len(changes.changed_files())} file(s) would be changed, no file was written.",
+        severity="INFO",
+    )
+    if args.diff_output:
+        with open(args.diff_output, "w", encoding="utf-8", newline="") as f:
+            changes.report(args.diff_format, root, f)
+        utils.log(f"Changes written to: {args.diff_output}", severity="INFO")
+    else:
+        changes.report(args.diff_format, root)
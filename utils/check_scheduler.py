@@ -0,0 +1,92 @@
+# Runs independent analyzer checks concurrently, keeping the report order
+import concurrent.futures
+import time
+from typing import Callable
+
+from utils import perf, utils
+
+
+class CheckScheduler:
+    """
+    Runs the checks of the analyzer side by side. Every check logs into its own
+    buffer; the buffers are written to the real log in SECTION_METADATA order,
+    each as soon as it and all sections before it are complete. The report thus
+    looks the same as with the checks run one after another.
+
+    The wall time of every check is recorded in durations, by section id.
+    With max_workers=1 the checks run one after another in the calling thread.
+    """
+
+    def __init__(self, log: Callable, max_workers: int | None = None):
+        self.log = log
+        self.max_workers = max_workers
+        self.checks: dict[str, Callable] = {}
+        self.durations: dict[str, float] = {}
+
+    def add(self, section_id: str, check: Callable) -> None:
+        """
+        Register a check as check(log) for the section it reports under.
+        """
+        if section_id in self.checks:
+            raise ValueError(f"Check for section '{section_id}' is already registered")
+        self.checks[section_id] = check
+
+    def _run_check(self, section_id: str, check: Callable) -> list[tuple]:
+        buffer = []
+
+        def buffered_log(message, when="", severity=""):
+            buffer.append((message, when, severity))
+
+        start = time.perf_counter()
+        try:
+            with perf.profiler.measure(section_id):
+                check(buffered_log)
+        except Exception as e:
+            # Keep what was logged before the failure, it is replayed first
+            e.buffered_messages = buffer
+            raise
+        finally:
+            self.durations[section_id] = time.perf_counter() - start
+        return buffer
+
+    def run(self) -> None:
+        """
+        Run all registered checks and write their output in report order.
+        An exception of a check is raised after the output of all sections
+        before it (and its own output up to the failure) has been written.
+        """
+        order = sorted(
+            self.checks,
+            key=lambda s: utils.SECTION_METADATA.get(s, {}).get("order", 99),
+        )
+        if self.max_workers == 1:
+            for section_id in order:
+                self._write(
+                    lambda: self._run_check(section_id, self.checks[section_id])
+                )
+            return
+
+        with concurrent.futures.ThreadPoolExecutor(self.max_workers) as executor:
+            futures = {
+                section_id: executor.submit(
+                    self._run_check, section_id, self.checks[section_id]
+                )
+                for section_id in order
+            }
+            try:
+                for section_id in order:
+                    self._write(futures[section_id].result)
+            except Exception:
+                for future in futures.values():
+                    future.cancel()
+                raise
+
+    def _write(self, get_buffer: Callable) -> None:
+        try:
+            buffer = get_buffer()
+        except Exception as e:
+            for message in getattr(e, "buffered_messages", []):
+                self.log(*message)
+            raise
+        for message in buffer:
+            self.log(*message)
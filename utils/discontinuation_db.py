@@ -0,0 +1,99 @@
+# Indexed view of the discontinuation data, loaded once per process
+import hashlib
+import json
+import threading
+from pathlib import Path
+
+from utils import utils
+
+_DB = None
+_DB_LOCK = threading.Lock()
+
+
+def _lowercase_index(entries: dict) -> dict[str, tuple[str, str]]:
+    """Map lowercase name -> (name as listed, description); the first spelling wins."""
+    index = {}
+    for name, description in entries.items():
+        index.setdefault(name.lower(), (name, description))
+    return index
+
+
+class DiscontinuationDB:
+    """
+    All files of the discontinuations/ folder, loaded once and indexed for
+    constant-time lookups per token instead of scanning the lists.
+    """
+
+    def __init__(self, folder: Path):
+        self.folder = folder
+        self.raw: dict = {}
+        digest = hashlib.sha256()
+        for file_path in sorted(folder.glob("*.json")):
+            data = file_path.read_bytes()
+            digest.update(file_path.name.encode("utf-8") + b"\0" + data)
+            try:
+                self.raw[file_path.stem] = json.loads(data.decode("utf-8"))
+            except Exception as e:
+                utils.log(
+                    f"Error loading JSON file '{file_path.stem}': {e}", severity="ERROR"
+                )
+                self.raw[file_path.stem] = {}
+        # Changes whenever any discontinuation file changes
+        self.version = digest.hexdigest()
+
+        hardware = dict(self.raw.get("unsupported_hw", {}))
+        self.special_handling_hw: dict[str, str] = hardware.pop("special_handling", {})
+        # Reverse index: hardware type -> all reasons listing it
+        self.unsupported_hw: dict[str, list[str]] = {}
+        for reason, items in hardware.items():
+            for hw_type in items:
+                reasons = self.unsupported_hw.setdefault(hw_type, [])
+                if reason not in reasons:
+                    reasons.append(reason)
+
+        self.obsolete_libs = _lowercase_index(self.raw.get("obsolete_libs", {}))
+        self.manual_process_libs = _lowercase_index(
+            self.raw.get("manual_process_libs", {})
+        )
+        self.obsolete_fbks = _lowercase_index(self.raw.get("obsolete_fbks", {}))
+        self.obsolete_funcs = _lowercase_index(self.raw.get("obsolete_funcs", {}))
+        self.binary_lib_whitelist = {
+            str(name).lower() for name in self.raw.get("binary_lib_whitelist", [])
+        }
+        self.deprecated_string_functions: list[str] = self.raw.get(
+            "deprecated_string_functions", []
+        )
+        self.deprecated_math_functions: list[str] = self.raw.get(
+            "deprecated_math_functions", []
+        )
+
+    def unsupported_hw_reasons(self, hw_type: str) -> list[str]:
+        return self.unsupported_hw.get(hw_type, [])
+
+    def obsolete_library(self, name: str) -> tuple[str, str] | None:
+        return self.obsolete_libs.get(name.lower())
+
+    def manual_process_library(self, name: str) -> tuple[str, str] | None:
+        return self.manual_process_libs.get(name.lower())
+
+    def obsolete_function_block(self, name: str) -> tuple[str, str] | None:
+        return self.obsolete_fbks.get(name.lower())
+
+    def obsolete_function(self, name: str) -> tuple[str, str] | None:
+        return self.obsolete_funcs.get(name.lower())
+
+    def is_whitelisted_binary(self, library_name: str) -> bool:
+        return library_name.lower() in self.binary_lib_whitelist
+
+
+def get_discontinuation_db() -> DiscontinuationDB:
+    """
+    Return the process-wide DiscontinuationDB, loading it on first use.
+    """
+    global _DB
+    if _DB is None:
+        with _DB_LOCK:
+            if _DB is None:
+                root_path = Path(__file__).resolve().parent.parent
+                _DB = DiscontinuationDB(root_path / "discontinuations")
+    return _DB
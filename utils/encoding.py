@@ -0,0 +1,59 @@
+# Encoding detection for the files the helpers rewrite
+import re
+
+# Byte order marks, longest first (the UTF-32 LE mark starts with the UTF-16 LE one).
+# The explicit byte order codecs keep the mark as U+FEFF in the text, so writing
+# the text back reproduces it.
+_BOMS = [
+    (b"\x00\x00\xfe\xff", "utf_32_be"),
+    (b"\xff\xfe\x00\x00", "utf_32_le"),
+    (b"\xef\xbb\xbf", "utf_8_sig"),
+    (b"\xfe\xff", "utf_16_be"),
+    (b"\xff\xfe", "utf_16_le"),
+]
+
+# Control characters other than tab, line feed, form feed and carriage return
+# do not occur in the text files of a project
+_BINARY = re.compile(rb"[\x00-\x08\x0b\x0e-\x1f\x7f]")
+
+# Three non-ASCII bytes in a row: western text rarely has them (umlauts and
+# accents sit between ASCII letters, as in "Größe"), other single-byte scripts
+# like Cyrillic or Greek have them in almost every word
+_NON_ASCII_RUN = re.compile(rb"[\x80-\xff]{3}")
+
+
+def detect_encoding(data: bytes) -> str:
+    """
+    Detect the encoding of a file's content, from the cheapest test to the most
+    expensive one: byte order mark, pure ASCII, strict UTF-8, western single-byte
+    text (latin-1, or cp1252 if it uses the cp1252 characters at 0x80-0x9F), and
+    only then charset_normalizer. Falls back to utf-8.
+    """
+    for bom, encoding in _BOMS:
+        if data.startswith(bom):
+            return encoding
+
+    if data.isascii():
+        return "ascii"
+
+    try:
+        data.decode("utf-8")
+        return "utf_8"
+    except UnicodeDecodeError:
+        pass
+
+    if not _BINARY.search(data) and not _NON_ASCII_RUN.search(data):
+        if not re.search(rb"[\x80-\x9f]", data):
+            return "latin_1"
+        try:
+            data.decode("cp1252")
+            return "cp1252"
+        except UnicodeDecodeError:
+            pass
+
+    from charset_normalizer import from_bytes
+
+    result = from_bytes(data).best()
+    if result:
+        return result.encoding
+    return "utf-8"
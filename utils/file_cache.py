@@ -0,0 +1,159 @@
+# Shared cache for file contents read during a run
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from utils import change_set, perf
+from utils.encoding import detect_encoding
+
+# Upper limit for the cached raw and decoded content, in bytes (approximate for text)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class FileContentCache:
+    """
+    Keeps raw and decoded file contents in memory so a file that is needed by
+    several checks is only read and decoded once.
+
+    Entries are keyed by path and validated against the file size and
+    modification time, so a changed file is read again. The least recently
+    used entries are evicted once the byte budget is exceeded.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stamp(path: Path) -> tuple[int, int]:
+        st = os.stat(path)
+        return st.st_size, st.st_mtime_ns
+
+    def _get(self, key, stamp):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] != stamp:
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def _put(self, key, stamp, value, cost: int) -> None:
+        if cost > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (stamp, value, cost)
+            self._size += cost
+            while self._size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+
+    def _drop(self, key) -> None:
+        _, _, cost = self._entries.pop(key)
+        self._size -= cost
+
+    @staticmethod
+    def _pending(path: Path) -> bytes | None:
+        # Content written during a dry run, not on disk
+        recording = change_set.active()
+        if recording is None:
+            return None
+        data = recording.read_bytes(path)
+        if data is None and not recording.exists(path):
+            raise FileNotFoundError(f"No such file: '{path}'")
+        return data
+
+    def read_bytes(self, path: Path) -> bytes:
+        """Return the raw content of a file."""
+        pending = self._pending(path)
+        if pending is not None:
+            return pending
+        stamp = self._stamp(path)
+        key = ("bytes", os.fspath(path))
+        data = self._get(key, stamp)
+        if data is None:
+            data = Path(path).read_bytes()
+            self._put(key, stamp, data, len(data))
+            perf.count_file(path, len(data))
+        else:
+            perf.count_file(path)
+        return data
+
+    def read_head(self, path: Path, size: int) -> bytes:
+        """
+        Return the first size bytes of a file, e.g. to probe its header. Taken
+        from the cached content if the whole file is cached, otherwise read
+        from disk without caching it.
+        """
+        pending = self._pending(path)
+        if pending is not None:
+            return pending[:size]
+        data = self._get(("bytes", os.fspath(path)), self._stamp(path))
+        if data is not None:
+            perf.count_file(path)
+            return data[:size]
+        with open(path, "rb") as f:
+            head = f.read(size)
+        perf.count_file(path, len(head))
+        return head
+
+    def read_text(self, path: Path, encoding: str = "utf-8", errors="strict") -> str:
+        """
+        Return the decoded content of a file, with universal newlines like
+        Path.read_text.
+        """
+        pending = self._pending(path)
+        if pending is not None:
+            text = pending.decode(encoding, errors)
+            return text.replace("\r\n", "\n").replace("\r", "\n")
+        stamp = self._stamp(path)
+        key = ("text", os.fspath(path), encoding, errors)
+        text = self._get(key, stamp)
+        if text is not None:
+            perf.count_file(path)
+        else:
+            text = self.read_bytes(path).decode(encoding, errors)
+            if "\r" in text:
+                text = text.replace("\r\n", "\n").replace("\r", "\n")
+            self._put(key, stamp, text, len(text))
+        return text
+
+    def encoding(self, path: Path) -> str:
+        """
+        Return the detected encoding of a file (see detect_encoding). The result
+        is kept as long as the file is unchanged, so a file is only examined once
+        per run.
+        """
+        pending = self._pending(path)
+        if pending is not None:
+            return detect_encoding(pending)
+        stamp = self._stamp(path)
+        key = ("encoding", os.fspath(path))
+        encoding = self._get(key, stamp)
+        if encoding is None:
+            encoding = detect_encoding(self.read_bytes(path))
+            self._put(key, stamp, encoding, 0)
+        return encoding
+
+    def invalidate(self, path: Path) -> None:
+        """Forget everything cached for a file, e.g. after writing to it."""
+        path_str = os.fspath(path)
+        with self._lock:
+            for key in [k for k in self._entries if k[1] == path_str]:
+                self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+# Cache instance shared by all checks and helpers of the current process
+content_cache = FileContentCache()
@@ -0,0 +1,138 @@
+# Compact model of a hardware configuration (.hw), shared by the checks
+import os
+import re
+import threading
+from pathlib import Path
+from xml.sax.saxutils import unescape
+
+from utils.file_cache import content_cache
+
+# Start and end of a <Module>, and <Parameter ID="..." Value="...">
+_tag_pattern = re.compile(
+    r"<(?:Module\b(?P<attributes>[^>]*?)(?P<empty>/?)>"
+    r"|(?P<end>/Module)\s*>"
+    r'|Parameter\s+ID="(?P<id>[^"]*)"\s+Value="(?P<value>[^"]*)")'
+)
+_attribute_pattern = re.compile(r'(\w+)\s*=\s*"([^"]*)"')
+_entities = {"&quot;": '"', "&apos;": "'"}
+_file_device_name = re.compile(r"FileDeviceName(\d+)")
+
+
+class HwModule:
+    """
+    A <Module> of a hardware configuration: its name, type and version, and the
+    values of all its parameters by ID, including those of its connectors.
+    If an ID occurs more than once in a module, the first value is kept.
+    """
+
+    __slots__ = ("name", "type", "version", "parameters")
+
+    def __init__(self, name: str, type: str, version: str):
+        self.name = name
+        self.type = type
+        self.version = version
+        self.parameters: dict[str, str] = {}
+
+
+class HardwareConfig:
+    """
+    The modules of one .hw file, read in a single pass over its text. Only the
+    module attributes and the parameters are kept, not an XML tree, so even
+    large hardware files cost little memory and time. Like the hardware
+    files Automation Studio writes, a <Parameter> is expected to list its ID
+    before its Value.
+    """
+
+    def __init__(self, hw_path: Path):
+        self.path = Path(hw_path)
+        self.modules: list[HwModule] = []
+        # Values of every parameter ID in all modules, in file order
+        self._values: dict[str, list[str]] = {}
+        self._parse(content_cache.read_bytes(self.path).decode("utf-8", "ignore"))
+
+    def _parse(self, text: str) -> None:
+        stack: list[HwModule] = []
+        for match in _tag_pattern.finditer(text):
+            parameter_id = match.group("id")
+            if parameter_id is not None:
+                if stack:
+                    value = match.group("value")
+                    if "&" in value:
+                        value = unescape(value, _entities)
+                    if parameter_id not in stack[-1].parameters:
+                        stack[-1].parameters[parameter_id] = value
+                        self._values.setdefault(parameter_id, []).append(value)
+            elif match.group("end"):
+                if stack:
+                    stack.pop()
+            else:
+                attributes = dict(_attribute_pattern.findall(match.group("attributes")))
+                module = HwModule(
+                    unescape(attributes.get("Name", ""), _entities),
+                    unescape(attributes.get("Type", ""), _entities),
+                    attributes.get("Version", ""),
+                )
+                self.modules.append(module)
+                if not match.group("empty"):
+                    stack.append(module)
+
+    def module_types(self) -> list[str]:
+        """The Type of every module, in file order."""
+        return [module.type for module in self.modules if module.type]
+
+    def parameter_values(self, parameter_id: str) -> list[str]:
+        """The values of a parameter in all modules that set it."""
+        return list(self._values.get(parameter_id, ()))
+
+    def parameter(self, parameter_id: str) -> str | None:
+        """The value of a parameter in the first module that sets it, None if none does."""
+        values = self.parameter_values(parameter_id)
+        return values[0] if values else None
+
+    def find_parameters(self, pattern: str) -> list[tuple[str, str]]:
+        """(ID, value) of all parameters whose ID matches the regex pattern completely."""
+        regex = re.compile(pattern)
+        return [
+            (parameter_id, value)
+            for parameter_id, values in self._values.items()
+            if regex.fullmatch(parameter_id)
+            for value in values
+        ]
+
+    def file_devices(self) -> list[tuple[str, str]]:
+        """(name, path) of every file device (FileDeviceName<N>/FileDevicePath<N>)."""
+        numbers = [
+            match.group(1)
+            for match in map(_file_device_name.fullmatch, self._values)
+            if match
+        ]
+        devices = []
+        for module in self.modules:
+            for number in numbers:
+                name = module.parameters.get(f"FileDeviceName{number}")
+                if name is not None:
+                    path = module.parameters.get(f"FileDevicePath{number}", "")
+                    devices.append((name, path))
+        return devices
+
+
+_configs: dict[str, tuple[tuple[int, int], HardwareConfig]] = {}
+_lock = threading.Lock()
+
+
+def load_hardware(hw_path: Path) -> HardwareConfig:
+    """
+    Return the HardwareConfig of a .hw file. It is built once per run and shared
+    by all checks of the configuration, as long as the file is unchanged.
+    """
+    st = os.stat(hw_path)
+    stamp = (st.st_size, st.st_mtime_ns)
+    key = os.fspath(hw_path)
+    with _lock:
+        entry = _configs.get(key)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+    config = HardwareConfig(hw_path)
+    with _lock:
+        _configs[key] = (stamp, config)
+    return config
@@ -0,0 +1,119 @@
+# Compiled multi-keyword matcher for discontinuation lookups and replacements
+import functools
+import re
+from typing import Iterable
+
+
+def trie_pattern(words: Iterable[str]) -> str:
+    """
+    Build a regex alternation shaped like a prefix tree, e.g. ["strcat", "strcpy"]
+    becomes "str(?:cat|cpy)". The regex engine then walks each position of the text
+    once through the tree instead of trying every keyword on its own.
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        is_end = "" in node
+        branches = [re.escape(ch) + build(child) for ch, child in node.items() if ch]
+        if not branches:
+            return ""
+        if len(branches) == 1 and not is_end:
+            return branches[0]
+        group = "(?:" + "|".join(branches) + ")"
+        # Optional group is greedy, so the longest keyword is preferred
+        return group + "?" if is_end else group
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """
+    Finds or replaces any of a fixed set of keywords in one pass over a text.
+
+    Each match consists of an optional prefix, the keyword and a suffix, all given
+    as regex fragments, e.g. prefix=r"\\b", suffix=r"\\s*\\(" for function calls.
+    """
+
+    def __init__(
+        self,
+        keywords: Iterable[str],
+        prefix: str = r"\b",
+        suffix: str = r"\b",
+        ignore_case: bool = False,
+    ):
+        self.ignore_case = ignore_case
+        # Canonical spelling of every keyword, keyed like the matched text is looked up
+        self.keywords = {self._key(k): k for k in keywords}
+        flags = re.IGNORECASE if ignore_case else 0
+        if self.keywords:
+            self.pattern = re.compile(
+                f"{prefix}(?P<kw>{trie_pattern(self.keywords)})(?P<tail>{suffix})",
+                flags,
+            )
+        else:
+            # Never matches anything
+            self.pattern = re.compile(r"(?!)")
+
+    def _key(self, word: str) -> str:
+        return word.lower() if self.ignore_case else word
+
+    def search(self, text: str) -> str | None:
+        """Return the first keyword found in the text, or None."""
+        match = self.pattern.search(text)
+        return self.keywords[self._key(match["kw"])] if match else None
+
+    def find_all(self, text: str) -> dict[str, int]:
+        """Return the number of occurrences for every keyword found in the text."""
+        counts: dict[str, int] = {}
+        for match in self.pattern.finditer(text):
+            keyword = self.keywords[self._key(match["kw"])]
+            counts[keyword] = counts.get(keyword, 0) + 1
+        return counts
+
+    def replace(
+        self, text: str, mapping: dict, tail: str | None = None
+    ) -> tuple[str, dict[str, int]]:
+        """
+        Replace every matched keyword by mapping[keyword]. The matched suffix is kept,
+        unless a replacement for it is given as tail (e.g. "(" for function calls).
+
+        Returns:
+            tuple[str, dict[str, int]]: (new_text, replacements per keyword)
+        """
+        counts: dict[str, int] = {}
+
+        def substitute(match: re.Match) -> str:
+            keyword = self.keywords[self._key(match["kw"])]
+            counts[keyword] = counts.get(keyword, 0) + 1
+            return (
+                match.string[match.start() : match.start("kw")]
+                + mapping[keyword]
+                + (match["tail"] if tail is None else tail)
+            )
+
+        return self.pattern.sub(substitute, text), counts
+
+
+@functools.lru_cache(maxsize=None)
+def _cached_matcher(
+    keywords: tuple, prefix: str, suffix: str, ignore_case: bool
+) -> KeywordMatcher:
+    return KeywordMatcher(keywords, prefix, suffix, ignore_case)
+
+
+def get_matcher(
+    keywords: Iterable[str],
+    prefix: str = r"\b",
+    suffix: str = r"\b",
+    ignore_case: bool = False,
+) -> KeywordMatcher:
+    """
+    Return a compiled KeywordMatcher. Matchers are cached, so building one
+    per file for the same keyword set only compiles the pattern once.
+    """
+    return _cached_matcher(tuple(keywords), prefix, suffix, ignore_case)
@@ -0,0 +1,62 @@
+# Widget types used in mappView content files (.content), shared by the checks
+import os
+import threading
+from collections import Counter
+from pathlib import Path
+
+from lxml import etree
+
+from utils import perf
+
+_WIDGET = "{http://www.br-automation.com/iat2015/contentDefinition/v2}Widget"
+_XSI_TYPE = "{http://www.w3.org/2001/XMLSchema-instance}type"
+
+
+def _count_widgets(content_path: Path, size: int) -> Counter:
+    perf.count_file(content_path, size)
+    perf.count_xml_parse()
+    counts: Counter = Counter()
+    for _, widget in etree.iterparse(
+        os.fspath(content_path), events=("end",), tag=_WIDGET, huge_tree=True
+    ):
+        widget_type = widget.get(_XSI_TYPE)
+        if widget_type:
+            counts[widget_type] += 1
+        # Nested widgets are done as well, only the counts are kept. Emptied
+        # widgets stay attached to their parent, so the ones before are dropped.
+        widget.clear(keep_tail=True)
+        while widget.getprevious() is not None:
+            del widget.getparent()[0]
+    return counts
+
+
+# Counts per file, or the details of its parse error
+_histograms: dict[str, tuple[tuple[int, int], Counter | tuple]] = {}
+_lock = threading.Lock()
+
+
+def widget_types(content_path: Path) -> Counter:
+    """
+    Return how often every widget type (the xsi:type of the <Widget> elements,
+    e.g. "widgets.brease.Button") is used in a .content file, nested widgets
+    included. The file is parsed incrementally once per run and every widget
+    is dropped once counted, so memory stays small even for large pages; a
+    file that is not valid XML raises an etree.XMLSyntaxError every time.
+    """
+    st = os.stat(content_path)
+    stamp = (st.st_size, st.st_mtime_ns)
+    key = os.fspath(content_path)
+    with _lock:
+        entry = _histograms.get(key)
+    if entry is None or entry[0] != stamp:
+        try:
+            result = _count_widgets(content_path, st.st_size)
+        except etree.XMLSyntaxError as e:
+            # Only the details are kept; every caller gets an error of its own
+            result = (e.msg, e.code, *e.position, e.filename)
+        entry = (stamp, result)
+        with _lock:
+            _histograms[key] = entry
+    if isinstance(entry[1], tuple):
+        raise etree.XMLSyntaxError(*entry[1])
+    return entry[1]
@@ -0,0 +1,108 @@
+# Optional per-check instrumentation: wall time, files, bytes and parse counts
+import contextlib
+import contextvars
+import os
+import threading
+import time
+
+# Stats of the measurement the current thread is running in, if any
+_current = contextvars.ContextVar("perf_stats", default=None)
+
+
+class PerfStats:
+    """
+    Counters for one measured step (a check, the index walk, the scan pass).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.wall_time = 0.0
+        self.files: set[str] = set()
+        self.bytes_read = 0
+        self.xml_parses = 0
+        self.rule_evals = 0
+        self._lock = threading.Lock()
+
+    def add_file(self, path, nbytes: int = 0) -> None:
+        with self._lock:
+            self.files.add(os.fspath(path))
+            self.bytes_read += nbytes
+
+    def add_xml_parse(self) -> None:
+        with self._lock:
+            self.xml_parses += 1
+
+    def add_rule_evals(self, count: int) -> None:
+        with self._lock:
+            self.rule_evals += count
+
+
+class Profiler:
+    """
+    Collects PerfStats by name while enabled. Disabled, measure() only keeps
+    the wall time and the counting hooks cost a single context lookup.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.stats: dict[str, PerfStats] = {}
+        self._lock = threading.Lock()
+
+    def reset(self, enabled: bool = False) -> None:
+        """Drop all measurements, e.g. before the next analyzer run."""
+        with self._lock:
+            self.enabled = enabled
+            self.stats = {}
+
+    def get(self, name: str) -> PerfStats:
+        with self._lock:
+            return self.stats.setdefault(name, PerfStats(name))
+
+    @contextlib.contextmanager
+    def measure(self, name: str):
+        """
+        Attribute all file reads and parses of the current thread to name.
+        """
+        stats = self.get(name)
+        token = _current.set(stats if self.enabled else None)
+        start = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            stats.wall_time += time.perf_counter() - start
+            _current.reset(token)
+
+    def report(self) -> str:
+        """
+        Plain text table of all measurements, in the order they were started.
+        """
+        header = f"{'Step':<20}{'Time [s]':>10}{'Files':>8}{'Read [KiB]':>12}{'XML parses':>12}{'Rule evals':>12}"
+        lines = [header]
+        for stats in self.stats.values():
+            lines.append(
+                f"{stats.name:<20}{stats.wall_time:>10.3f}{len(stats.files):>8}"
+                f"{stats.bytes_read / 1024:>12.1f}{stats.xml_parses:>12}{stats.rule_evals:>12}"
+            )
+        return "\n".join(lines)
+
+
+def current() -> PerfStats | None:
+    """The stats the current thread counts into, None if not measured."""
+    return _current.get()
+
+
+def count_file(path, nbytes: int = 0) -> None:
+    """Record a file access (nbytes read from disk, 0 if served from a cache)."""
+    stats = _current.get()
+    if stats is not None:
+        stats.add_file(path, nbytes)
+
+
+def count_xml_parse() -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.add_xml_parse()
+
+
+# Profiler shared by the analyzer and the caches of the current process
+profiler = Profiler()
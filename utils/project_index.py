@@ -0,0 +1,234 @@
+# Single-pass file index of an Automation Studio project
+import fnmatch
+import os
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+# Build output folders of Automation Studio, relative to the project folder
+DEFAULT_EXCLUDES = ("/Temp", "/Binaries", "/Diagnosis")
+
+# File in the project folder with additional exclude patterns, one per line
+EXCLUDE_FILE = ".as6migrationignore"
+
+
+def _fold(text: str) -> str:
+    # Patterns match case-insensitively on Windows, like file names do
+    return text.lower() if os.name == "nt" else text
+
+
+class ExcludeRules:
+    """
+    Glob patterns of files and folders that no walk over the project enters.
+
+    A pattern containing a "/" is matched against the path relative to the
+    walked folder (a leading "/" is optional), e.g. "/Temp" or "Logical/*/Old".
+    Any other pattern is matched against the name of every file and folder at
+    any depth, e.g. "*.bak". An excluded folder is pruned with everything in it.
+    """
+
+    def __init__(self, patterns: Iterable[str] = DEFAULT_EXCLUDES):
+        self.patterns: list[str] = []
+        self._paths: list[str] = []
+        self._names: list[str] = []
+        for pattern in patterns:
+            pattern = pattern.strip().replace("\\", "/").rstrip("/")
+            if not pattern or pattern.startswith("#"):
+                continue
+            self.patterns.append(pattern)
+            if "/" in pattern:
+                self._paths.append(_fold(pattern.lstrip("/")))
+            else:
+                self._names.append(_fold(pattern))
+
+    @classmethod
+    def for_project(cls, root: Path, patterns: Iterable[str] = ()) -> "ExcludeRules":
+        """
+        The default excludes, the patterns of the project's exclude file (if any)
+        and the given patterns, e.g. from the command line.
+        """
+        combined = list(DEFAULT_EXCLUDES)
+        exclude_file = Path(root) / EXCLUDE_FILE
+        if exclude_file.is_file():
+            combined += exclude_file.read_text(
+                encoding="utf-8", errors="ignore"
+            ).splitlines()
+        combined += patterns or ()
+        return cls(combined)
+
+    def excluded(self, rel: str, name: str) -> bool:
+        """Whether the entry at the relative path rel (with os.sep) is excluded."""
+        name = _fold(name)
+        if any(fnmatch.fnmatchcase(name, p) for p in self._names):
+            return True
+        if self._paths:
+            rel = _fold(rel.replace(os.sep, "/"))
+            return any(fnmatch.fnmatchcase(rel, p) for p in self._paths)
+        return False
+
+
+def scan(
+    root: Path, excludes: Optional[ExcludeRules] = None, start: Optional[Path] = None
+) -> Iterator[tuple[str, os.DirEntry, bool]]:
+    """
+    Walk the tree below start (default: root) with os.scandir, sorted by name,
+    skipping excluded entries without listing excluded folders. Yields
+    (path relative to root, entry, is_dir) for every file and folder.
+    """
+    root_str = str(root)
+    if excludes is None:
+        excludes = ExcludeRules.for_project(root)
+    rel_start = "" if start is None else os.path.relpath(start, root_str)
+    if rel_start == os.curdir:
+        rel_start = ""
+    stack = [(str(start or root), rel_start)]
+    while stack:
+        dir_path, rel_dir = stack.pop()
+        try:
+            with os.scandir(dir_path) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+
+        subdirs = []
+        for entry in entries:
+            rel = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+            if excludes.excluded(rel, entry.name):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    yield rel, entry, True
+                    subdirs.append((entry.path, rel))
+                    continue
+                if not entry.is_file():
+                    continue
+            except OSError:
+                continue
+            yield rel, entry, False
+
+        # Reverse so the stack pops sub directories in sorted order
+        stack.extend(reversed(subdirs))
+
+
+def iter_files(
+    root: Path, excludes: Optional[ExcludeRules] = None, under: Optional[Path] = None
+) -> Iterator[Path]:
+    """
+    All files of the project folder root, or of its sub folder under, without
+    the excluded ones. Use this instead of Path.rglob for walks over a project.
+    """
+    for _, entry, is_dir in scan(root, excludes, under):
+        if not is_dir:
+            yield Path(entry.path)
+
+
+def add_arguments(parser) -> None:
+    """Add the --exclude option to a script's argument parser."""
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        default=[],
+        metavar="PATTERN",
+        help="Glob pattern of files or folders to skip, in addition to the build output "
+        f"folders ({', '.join(DEFAULT_EXCLUDES)}) and the patterns in {EXCLUDE_FILE}. "
+        "Patterns with a '/' are relative to the project folder. Can be given several times.",
+    )
+
+
+class ProjectIndex:
+    """
+    Walks a project folder once with os.scandir and keeps the result in memory,
+    so the individual checks can look files up instead of walking the tree again.
+    Excluded files and folders (build output by default, see ExcludeRules) are
+    left out.
+
+    Files are bucketed by suffix, by exact file name and by the top-level
+    configuration folder under Physical/. Directories are bucketed by name.
+    Name and suffix lookups follow the case sensitivity of the platform
+    (case-insensitive on Windows), like Path.rglob does.
+    """
+
+    def __init__(self, root: Path, excludes: Optional[ExcludeRules] = None):
+        self.root = Path(root)
+        self._root_str = str(self.root)
+        self.excludes = excludes or ExcludeRules.for_project(self.root)
+        # Each entry is (relative path key, Path) so sub-tree filtering is a string prefix test
+        self._files: list[tuple[str, Path]] = []
+        self._by_suffix: dict[str, list[tuple[str, Path]]] = {}
+        self._by_name: dict[str, list[tuple[str, Path]]] = {}
+        self._dirs_by_name: dict[str, list[tuple[str, Path]]] = {}
+        self._by_config: dict[str, list[tuple[str, Path]]] = {}
+        self._physical_key = os.path.normcase("Physical")
+        self._walk()
+
+    def _walk(self) -> None:
+        for rel, entry, is_dir in scan(self.root, self.excludes):
+            key = os.path.normcase(rel)
+            if is_dir:
+                self._dirs_by_name.setdefault(os.path.normcase(entry.name), []).append(
+                    (key, Path(entry.path))
+                )
+            else:
+                self._add_file(key, Path(entry.path))
+
+    def _add_file(self, key: str, path: Path) -> None:
+        item = (key, path)
+        self._files.append(item)
+        self._by_suffix.setdefault(os.path.normcase(path.suffix), []).append(item)
+        self._by_name.setdefault(os.path.normcase(path.name), []).append(item)
+
+        parts = key.split(os.sep)
+        if len(parts) > 2 and parts[0] == self._physical_key:
+            self._by_config.setdefault(path.parts[-len(parts) + 1], []).append(item)
+
+    def _prefix(self, under: Optional[Path]) -> Optional[str]:
+        """Return the relative key prefix for a sub directory, None for the whole project."""
+        if under is None:
+            return None
+        rel = os.path.relpath(under, self._root_str)
+        if rel == os.curdir:
+            return None
+        return os.path.normcase(rel) + os.sep
+
+    @staticmethod
+    def _filter(items: list[tuple[str, Path]], prefix: Optional[str]) -> list[Path]:
+        if prefix is None:
+            return [path for _, path in items]
+        return [path for key, path in items if key.startswith(prefix)]
+
+    def files(self, *suffixes: str, under: Optional[Path] = None) -> list[Path]:
+        """
+        Return all files with one of the given suffixes (e.g. ".hw"), optionally
+        restricted to a sub directory. Without suffixes, all files are returned.
+        """
+        prefix = self._prefix(under)
+        if not suffixes:
+            return self._filter(self._files, prefix)
+
+        result = []
+        for suffix in suffixes:
+            result.extend(
+                self._filter(self._by_suffix.get(os.path.normcase(suffix), []), prefix)
+            )
+        return result
+
+    def named(self, name: str, under: Optional[Path] = None) -> list[Path]:
+        """Return all files with the exact given name (e.g. "Cpu.pkg")."""
+        items = self._by_name.get(os.path.normcase(name), [])
+        return self._filter(items, self._prefix(under))
+
+    def dirs_named(self, name: str, under: Optional[Path] = None) -> list[Path]:
+        """Return all directories with the exact given name (e.g. "mappView")."""
+        items = self._dirs_by_name.get(os.path.normcase(name), [])
+        return self._filter(items, self._prefix(under))
+
+    def configurations(self) -> list[str]:
+        """Return the names of all configurations below Physical/ that contain files."""
+        return list(self._by_config)
+
+    def config_files(self, config: str, *suffixes: str) -> list[Path]:
+        """Return the files of one configuration, optionally filtered by suffix."""
+        items = self._by_config.get(config, [])
+        if suffixes:
+            wanted = {os.path.normcase(s) for s in suffixes}
+            items = [i for i in items if os.path.normcase(i[1].suffix) in wanted]
+        return [path for _, path in items]
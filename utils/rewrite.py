@@ -0,0 +1,227 @@
+# Combined search-and-replace pass of the helper scripts and the file walker running it
+import abc
+import concurrent.futures
+import os
+import re
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, NamedTuple
+
+from utils import utils
+from utils.keyword_matcher import trie_pattern
+
+
+class _RuleSet:
+    def __init__(
+        self, name: str, keywords: Iterable[str], mapping: dict | None, tail: str | None
+    ):
+        self.name = name
+        self.keywords = list(keywords)
+        self.mapping = mapping
+        self.tail = tail
+        # Alternative of the combined pattern, None without any keyword
+        self.fragment: str | None = None
+
+
+class Rewriter:
+    """
+    All replacements a helper applies to one class of files. Every rule set is
+    a mapping of keywords with the regex fragments around them (like
+    KeywordMatcher); all rule sets are compiled into a single alternation of
+    prefix trees, so apply() rewrites a text in one pass, however many rules
+    there are.
+
+    At a given position the longest keyword of the first matching rule set wins.
+    Replacements are not matched again, so one rule never rewrites the output
+    of another. Prefixes must not consume characters (e.g. r"\b" or ""): the
+    pattern starts with a lookahead for the first characters of all keywords,
+    which lets the regex engine skip ahead to the next candidate position.
+    """
+
+    def __init__(self):
+        self.rule_sets: list[_RuleSet] = []
+        self._pattern = None
+
+    def replace(
+        self,
+        name: str,
+        mapping: dict,
+        prefix: str = r"\b",
+        suffix: str = r"\b",
+        tail: str | None = None,
+    ) -> "Rewriter":
+        """
+        Replace every keyword of mapping by its value. The matched suffix is kept,
+        unless a replacement for it is given as tail (e.g. "(" for function calls).
+        """
+        return self._add(_RuleSet(name, mapping, mapping, tail), prefix, suffix)
+
+    def find(
+        self,
+        name: str,
+        keywords: Iterable[str],
+        prefix: str = r"\b",
+        suffix: str = r"\b",
+    ) -> "Rewriter":
+        """Only count the keywords, e.g. to warn about them, and leave them as they are."""
+        return self._add(_RuleSet(name, keywords, None, None), prefix, suffix)
+
+    def _add(self, rule_set: _RuleSet, prefix: str, suffix: str) -> "Rewriter":
+        if rule_set.keywords:
+            n = len(self.rule_sets)
+            rule_set.fragment = (
+                f"(?P<r{n}>{prefix}(?P<k{n}>{trie_pattern(rule_set.keywords)})"
+                f"(?P<t{n}>{suffix}))"
+            )
+        self.rule_sets.append(rule_set)
+        self._pattern = None
+        return self
+
+    @property
+    def pattern(self) -> re.Pattern:
+        if self._pattern is None:
+            fragments = [r.fragment for r in self.rule_sets if r.fragment]
+            first = {k[0] for r in self.rule_sets for k in r.keywords}
+            if fragments:
+                chars = "".join(re.escape(ch) for ch in sorted(first))
+                self._pattern = re.compile(f"(?=[{chars}])(?:{'|'.join(fragments)})")
+            else:
+                # Never matches anything
+                self._pattern = re.compile(r"(?!)")
+        return self._pattern
+
+    def apply(self, text: str) -> tuple[str, dict[str, dict[str, int]]]:
+        """
+        Rewrite text in one pass.
+
+        Returns:
+            tuple[str, dict[str, dict[str, int]]]: (new_text, matches per keyword
+            for every rule set name)
+        """
+        counts: dict[str, dict[str, int]] = {r.name: {} for r in self.rule_sets}
+
+        def substitute(match: re.Match) -> str:
+            n = int(match.lastgroup[1:])
+            rule_set = self.rule_sets[n]
+            keyword = match[f"k{n}"]
+            found = counts[rule_set.name]
+            found[keyword] = found.get(keyword, 0) + 1
+            if rule_set.mapping is None:
+                return match.group()
+            return (
+                match.string[match.start() : match.start(f"k{n}")]
+                + rule_set.mapping[keyword]
+                + (match[f"t{n}"] if rule_set.tail is None else rule_set.tail)
+            )
+
+        return self.pattern.sub(substitute, text), counts
+
+
+class FileRewrite(NamedTuple):
+    path: Path
+    counts: dict[str, dict[str, int]]
+    changed: bool
+
+    def total(self, name: str) -> int:
+        """Number of matches of the rule set name."""
+        return sum(self.counts[name].values())
+
+
+def _rewrite(path: Path, rewriters: list[Rewriter | None]) -> tuple:
+    content, encoding, original_bytes = utils.read_file_with_encoding(path)
+    steps = []
+    for rewriter in rewriters:
+        if rewriter is None:
+            steps.append(None)
+            continue
+        new_content, counts = rewriter.apply(content)
+        steps.append((counts, new_content != content))
+        content = new_content
+    return content, encoding, original_bytes, steps
+
+
+def rewrite_files(
+    files: Iterable[Path],
+    rewriters_for: list[Callable[[Path], Rewriter | None]],
+    jobs: int | None = None,
+) -> Iterator[list[FileRewrite | None]]:
+    """
+    Rewrite every file for which any of rewriters_for returns a Rewriter. A
+    file is read and decoded once, its rewriters are applied one after
+    another in memory and it is written once.
+
+    The files are read and rewritten in a pool of jobs threads (default:
+    number of CPUs); the results are written and yielded in the order of
+    files, from the calling thread, so the log and the recorded changes are
+    the same as when rewriting one file after another. Every result lists
+    a FileRewrite per entry of rewriters_for (None if it skipped the file),
+    changed telling whether that rewriter changed the text.
+    """
+    items = []
+    for path in files:
+        rewriters = [rewriter_for(path) for rewriter_for in rewriters_for]
+        if any(rewriter is not None for rewriter in rewriters):
+            items.append((path, rewriters))
+
+    jobs = jobs or os.cpu_count() or 1
+    with concurrent.futures.ThreadPoolExecutor(max(1, min(jobs, len(items)))) as pool:
+        futures = [pool.submit(_rewrite, path, rewriters) for path, rewriters in items]
+        try:
+            for (path, _), future in zip(items, futures):
+                new_content, encoding, original_bytes, steps = future.result()
+                utils.write_file_if_changed(path, new_content, encoding, original_bytes)
+                yield [
+                    None if step is None else FileRewrite(path, *step) for step in steps
+                ]
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+class Migration(abc.ABC):
+    """
+    The rewriting part of a helper script, so that several helpers can run in
+    one walk over the project (see helpers/migrate.py). A subclass selects the
+    Rewriter for a file, logs what it changed in a file and sums it up at the end;
+    a subclass that lacks one of these cannot be instantiated.
+    """
+
+    # Short name to select the migration by, and the libraries it migrates
+    name = ""
+    libraries: list[str] = []
+
+    def __init__(self, verbose: bool = False):
+        self.verbose = verbose
+
+    @abc.abstractmethod
+    def rewriter_for(self, file_path: Path) -> Rewriter | None:
+        """The Rewriter for a file, None to leave the file alone."""
+
+    @abc.abstractmethod
+    def report(self, result: FileRewrite) -> None:
+        """Log the changes made in a file and add them to the totals."""
+
+    @abc.abstractmethod
+    def summary(self) -> None:
+        """Log the totals of the run."""
+
+
+def run_migrations(
+    migrations: list[Migration], files: Iterable[Path], jobs: int | None = None
+) -> None:
+    """Apply the migrations to the files in one walk (see rewrite_files)."""
+    rewriters_for = [migration.rewriter_for for migration in migrations]
+    for results in rewrite_files(files, rewriters_for, jobs):
+        for migration, result in zip(migrations, results):
+            if result is not None:
+                migration.report(result)
+
+
+def add_arguments(parser) -> None:
+    """Add the --jobs option to a helper script's argument parser."""
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Number of threads reading and rewriting files. Defaults to the number of CPUs.",
+    )
@@ -0,0 +1,188 @@
+# Persistent per-file scan results, reused by the next analyzer run
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+from utils import utils
+
+CACHE_FORMAT = 1
+
+# Packages whose code produces the scan results
+_SOURCE_PACKAGES = ("checks", "utils")
+
+
+def source_fingerprint() -> str:
+    """
+    Identifies the code of the checks and of the utils they use. A rule's own
+    fingerprint does not see changes to the functions it calls, so any change
+    to these sources invalidates the whole cache. In a frozen build there are
+    no sources and the tool version decides alone.
+    """
+    root = Path(__file__).resolve().parent.parent
+    digest = hashlib.md5()
+    for package in _SOURCE_PACKAGES:
+        for source in sorted((root / package).glob("*.py")):
+            digest.update(source.name.encode("utf-8"))
+            digest.update(source.read_bytes())
+    return digest.hexdigest()
+
+
+def default_cache_file(project_path: Path) -> Path:
+    """
+    Location of the cache for a project: one file per project folder in the
+    user's ~/.as6_migration_tools directory, so the project itself stays untouched.
+    """
+    project_key = hashlib.md5(
+        os.path.normcase(str(Path(project_path).resolve())).encode("utf-8")
+    ).hexdigest()
+    return Path.home() / ".as6_migration_tools" / "scan_cache" / f"{project_key}.json"
+
+
+def rule_fingerprint(callback) -> str:
+    """
+    Identifies the implementation of a rule callback, so results are recomputed
+    once the rule itself changes.
+    """
+    code = getattr(callback, "__code__", None)
+    digest = hashlib.md5(f"{callback.__module__}.{callback.__qualname__}".encode())
+    if code is not None:
+        digest.update(code.co_code)
+        digest.update(repr(code.co_consts).encode("utf-8", "replace"))
+    return digest.hexdigest()
+
+
+def _encode(value):
+    # JSON only knows lists and string keyed objects, so tag everything else
+    if isinstance(value, Path):
+        return {"p": str(value)}
+    if isinstance(value, tuple):
+        return {"t": [_encode(v) for v in value]}
+    if isinstance(value, list):
+        return [_encode(v) for v in value]
+    if isinstance(value, dict):
+        return {"d": [[_encode(k), _encode(v)] for k, v in value.items()]}
+    return value
+
+
+def _decode(value):
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    if isinstance(value, dict):
+        if "p" in value:
+            return Path(value["p"])
+        if "t" in value:
+            return tuple(_decode(v) for v in value["t"])
+        return {_decode(k): _decode(v) for k, v in value["d"]}
+    return value
+
+
+class ScanResultCache:
+    """
+    Stores the results of every scan rule per file on disk. A file is considered
+    unchanged while its size and modification time are the same; if those differ,
+    the content hash decides, so touching a file does not invalidate its results.
+
+    The whole cache is discarded when the tool version, the source of the checks,
+    the discontinuation data or the Python version differ from the run that
+    wrote it, and the results of a single rule are dropped when its
+    implementation changed.
+    """
+
+    def __init__(self, cache_file: Path, project_root: Path, data_version: str):
+        self.cache_file = Path(cache_file)
+        self.project_root = Path(project_root)
+        self.meta = {
+            "format": CACHE_FORMAT,
+            "tool_version": utils.get_version(),
+            "source": source_fingerprint(),
+            "data_version": data_version,
+            "python": sys.version,
+        }
+        self.rules: dict[str, str] = {}
+        self.files: dict[str, dict] = {}
+        self._seen: set[str] = set()
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.cache_file.read_text(encoding="utf-8"))
+        except Exception:
+            return  # Missing or unreadable cache, start from scratch
+        if not isinstance(data, dict) or data.get("meta") != self.meta:
+            return
+        self.rules = data.get("rules", {})
+        self.files = data.get("files", {})
+
+    def _key(self, path: Path) -> str:
+        return os.path.relpath(path, self.project_root)
+
+    def set_rules(self, fingerprints: dict[str, str]) -> None:
+        """
+        Register the rules of the current run; cached results of rules whose
+        fingerprint changed are forgotten.
+        """
+        changed = {
+            name
+            for name, fingerprint in fingerprints.items()
+            if self.rules.get(name) != fingerprint
+        }
+        if changed:
+            for entry in self.files.values():
+                for name in changed:
+                    entry["rules"].pop(name, None)
+        self.rules = dict(fingerprints)
+
+    def lookup(self, path: Path) -> tuple[tuple[int, int], dict[str, list]]:
+        """
+        Returns the current (size, mtime) stamp of the file and the cached
+        results per rule name, which are empty if the file changed.
+        """
+        key = self._key(path)
+        self._seen.add(key)
+        st = os.stat(path)
+        stamp = (st.st_size, st.st_mtime_ns)
+
+        entry = self.files.get(key)
+        if entry is None:
+            return stamp, {}
+        if tuple(entry["stamp"]) != stamp:
+            if entry["hash"] != utils.calculate_file_hash(path):
+                del self.files[key]
+                return stamp, {}
+            entry["stamp"] = list(stamp)
+        return stamp, {name: _decode(v) for name, v in entry["rules"].items()}
+
+    def store(self, path: Path, stamp: tuple[int, int], results: dict) -> None:
+        """
+        Remember the results of the given rules for a file.
+        """
+        key = self._key(path)
+        entry = self.files.get(key)
+        if entry is None or tuple(entry["stamp"]) != stamp:
+            entry = self.files[key] = {
+                "stamp": list(stamp),
+                "hash": utils.calculate_file_hash(path),
+                "rules": {},
+            }
+        for name, value in results.items():
+            entry["rules"][name] = _encode(value)
+
+    def save(self) -> None:
+        """
+        Write the cache back to disk, without the files that were not part of
+        this run. Failing to write the cache is not fatal.
+        """
+        data = {
+            "meta": self.meta,
+            "rules": self.rules,
+            "files": {k: v for k, v in self.files.items() if k in self._seen},
+        }
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.cache_file.with_suffix(".tmp")
+            tmp_file.write_text(json.dumps(data), encoding="utf-8")
+            os.replace(tmp_file, self.cache_file)
+        except Exception as e:
+            utils.log(f"Could not write the scan cache: {e}", severity="WARNING")
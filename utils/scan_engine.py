@@ -0,0 +1,201 @@
+# Single-pass scanner that feeds every project file to all interested rules
+import concurrent.futures
+import contextvars
+import math
+import os
+from pathlib import Path
+from typing import Callable
+
+from utils import perf, utils
+from utils.project_index import ProjectIndex
+from utils.scan_cache import ScanResultCache, rule_fingerprint
+
+EXECUTORS = ("threads", "processes", "serial")
+
+# Files are handed to the workers in batches of up to this many files or bytes
+CHUNK_FILES = 64
+CHUNK_BYTES = 1024 * 1024
+
+
+class ScanRule:
+    """
+    A per-file check: the callback is called as callback(file_path, content, *args)
+    for every file below root with one of the given extensions and returns a list
+    of findings. Rules that set needs_content=False get None as content.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        root: Path,
+        extensions: list[str],
+        callback: Callable,
+        args: tuple = (),
+        needs_content: bool = True,
+    ):
+        self.name = name
+        self.root = root
+        self.extensions = extensions
+        self.callback = callback
+        self.args = args
+        self.needs_content = needs_content
+
+
+def _process_chunk(chunk: list) -> list[dict[str, list]]:
+    """
+    Evaluates the rules for a batch of (path, rules) items and returns the
+    results per rule name for every file, in the order of the batch.
+    Runs in a worker, so it must stay a module level function.
+    """
+    chunk_results = []
+    for path, rules in chunk:
+        content = None
+        if any(rule.needs_content for rule in rules):
+            content = utils.read_file(path)
+        chunk_results.append(
+            {rule.name: rule.callback(path, content, *rule.args) for rule in rules}
+        )
+    return chunk_results
+
+
+class ScanEngine:
+    """
+    Collects scan rules from the checks and runs them in one pass over the project:
+    every file is enumerated once from the project index, read once and handed to
+    all rules that registered for it. Results are grouped per rule name, in the
+    order the files of each rule are listed by the index.
+
+    With a ScanResultCache, rules are only evaluated for files that changed since
+    the run that filled the cache; the results for all other files are reused.
+
+    The files are evaluated in batches by a pool of threads, a pool of processes
+    (for the mostly regex bound rules, which hold the GIL) or serially. Rule
+    callbacks run in the worker, so for the process pool they must be module
+    level functions with picklable arguments and results.
+    """
+
+    def __init__(
+        self,
+        index: ProjectIndex,
+        cache: ScanResultCache | None = None,
+        executor: str = "threads",
+        jobs: int | None = None,
+    ):
+        if executor not in EXECUTORS:
+            raise ValueError(
+                f"Unknown executor '{executor}', expected one of {', '.join(EXECUTORS)}"
+            )
+        self.index = index
+        self.cache = cache
+        self.executor = executor
+        self.jobs = jobs or os.cpu_count() or 1
+        self.rules: dict[str, ScanRule] = {}
+
+    def add(
+        self,
+        name: str,
+        root: Path,
+        extensions: list[str],
+        callback: Callable,
+        *args,
+        needs_content: bool = True,
+    ) -> None:
+        if name in self.rules:
+            raise ValueError(f"Scan rule '{name}' is already registered")
+        self.rules[name] = ScanRule(
+            name, root, extensions, callback, args, needs_content
+        )
+
+    def run(self) -> dict[str, list]:
+        rule_files = {
+            name: self.index.files(*rule.extensions, under=rule.root)
+            for name, rule in self.rules.items()
+        }
+
+        # Invert to file -> interested rules, keeping the first-seen file order
+        file_rules: dict[Path, list[ScanRule]] = {}
+        for name, files in rule_files.items():
+            for path in files:
+                file_rules.setdefault(path, []).append(self.rules[name])
+
+        # Results reused from the cache and the file stamps to store new ones under
+        cached: dict[Path, dict[str, list]] = {}
+        stamps: dict[Path, tuple[int, int]] = {}
+        if self.cache is not None:
+            self.cache.set_rules(
+                {name: rule_fingerprint(r.callback) for name, r in self.rules.items()}
+            )
+            for path, rules in list(file_rules.items()):
+                stamps[path], hits = self.cache.lookup(path)
+                cached[path] = {r.name: hits[r.name] for r in rules if r.name in hits}
+                file_rules[path] = [r for r in rules if r.name not in hits]
+                if not file_rules[path]:
+                    del file_rules[path]
+
+        sizes = {}
+        for path in file_rules:
+            try:
+                sizes[path] = os.path.getsize(path)
+            except OSError:
+                sizes[path] = 0
+        chunks = self._chunks(list(file_rules.items()), sizes)
+
+        # Account the work here, as the workers do not share the caller's stats
+        stats = perf.current()
+        if stats is not None:
+            for path, rules in file_rules.items():
+                stats.add_file(path, sizes[path])
+                stats.add_rule_evals(len(rules))
+
+        if self.executor == "serial" or self.jobs == 1 or len(chunks) <= 1:
+            # Run in an empty context, so the reads are not counted a second time
+            chunk_results = [
+                contextvars.Context().run(_process_chunk, chunk) for chunk in chunks
+            ]
+        else:
+            pool_class = (
+                concurrent.futures.ProcessPoolExecutor
+                if self.executor == "processes"
+                else concurrent.futures.ThreadPoolExecutor
+            )
+            with pool_class(max_workers=min(self.jobs, len(chunks))) as pool:
+                chunk_results = list(pool.map(_process_chunk, chunks))
+
+        # The results per rule are assembled in index order below, whatever the backend
+        per_file = {}
+        for chunk, results in zip(chunks, chunk_results):
+            for (path, _), file_results in zip(chunk, results):
+                per_file[path] = file_results
+
+        if self.cache is not None:
+            for path, file_results in per_file.items():
+                self.cache.store(path, stamps[path], file_results)
+            self.cache.save()
+            for path, file_results in cached.items():
+                per_file.setdefault(path, {}).update(file_results)
+
+        results = {}
+        for name, files in rule_files.items():
+            merged = []
+            for path in files:
+                merged.extend(per_file[path][name])
+            results[name] = merged
+        return results
+
+    def _chunks(self, items: list, sizes: dict[Path, int]) -> list[list]:
+        """
+        Split the (path, rules) items into batches, so many small files are
+        handled by one worker task, while still leaving several batches per worker.
+        """
+        max_files = min(CHUNK_FILES, max(1, math.ceil(len(items) / (self.jobs * 4))))
+        chunks, chunk, chunk_bytes = [], [], 0
+        for item in items:
+            size = sizes[item[0]]
+            if chunk and (len(chunk) >= max_files or chunk_bytes + size > CHUNK_BYTES):
+                chunks.append(chunk)
+                chunk, chunk_bytes = [], 0
+            chunk.append(item)
+            chunk_bytes += size
+        if chunk:
+            chunks.append(chunk)
+        return chunks
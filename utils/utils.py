@@ -1,16 +1,17 @@
 # Utilities to call in multiple files
-import concurrent.futures
 import hashlib
 import json
 import os
 import re
 import sys
 from pathlib import Path
-from typing import Callable, Union
 
 from charset_normalizer import from_path
 from CTkMessagebox import CTkMessagebox
 
+from utils import change_set
+from utils.file_cache import content_cache
+
 _CACHED_LINKS = None
 
 # Section marker system for HTML report generation
@@ -151,6 +152,13 @@ SECTION_METADATA = {
         "icon": "check-circle",
         "title": "Migration Summary",
     },
+    "performance": {
+        "order": 100,
+        "category": "Diagnostics",
+        "icon": "clock",
+        "title": "Performance",
+        "collapsed": True,
+    },
 }
 
 
@@ -302,11 +310,9 @@ def calculate_file_hash(file_path):
     """
     Calculates the hash (MD5) of a file for comparison purposes.
     """
-    md5 = hashlib.md5()
-    with open(file_path, "rb") as f:
-        while chunk := f.read(4096):
-            md5.update(chunk)
-    return md5.hexdigest()
+    # Served from the content cache, so hashing a file that is scanned anyway
+    # does not read it from disk a second time
+    return hashlib.md5(content_cache.read_bytes(file_path)).hexdigest()
 
 
 def ask_user(message, default="y", parent=None, extra_note=""):
@@ -356,49 +362,6 @@ def ask_user_gui(message: str, extra_note: str = "") -> bool:
     return response == "Yes"
 
 
-def scan_files_parallel(
-    root_dir: Path,
-    extensions: list,
-    process_functions: Union[Callable, list[Callable]],
-    *args,
-):
-    """
-    Scans files in a directory tree in parallel for specific content.
-
-    Args:
-        root_dir (Path): The root directory to search in.
-        extensions (list): File extensions to include.
-        process_functions (callable or list): The function to apply on each file.
-        *args: Additional arguments to pass to the process_function.
-
-    Returns:
-        dict or list: Aggregated results from all scanned files.
-    """
-    single_function_mode = not isinstance(process_functions, list)
-    if single_function_mode:
-        process_functions = [process_functions]
-
-    results = {func.__name__: [] for func in process_functions}
-
-    files = []
-    for ext in extensions:
-        files.extend(p for p in root_dir.rglob(f"*{ext}") if p.is_file())
-
-    def process_file(path):
-        return {func.__name__: func(path, *args) for func in process_functions}
-
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        for func_results in executor.map(process_file, files):
-            for func_name, result in func_results.items():
-                results[func_name].extend(result)
-
-    if single_function_mode:
-        # Flatten results if only one function was used
-        return results[process_functions[0].__name__]
-    else:
-        return results
-
-
 def load_discontinuation_info(filename):
     return load_file_info("discontinuations", filename)
 
@@ -464,8 +427,12 @@ def build_web_path(links, url):
 
 
 def read_file(file: Path):
+    """
+    Read a text file as utf-8. The content is served from the shared content cache,
+    so repeated reads of the same unchanged file do not touch the disk again.
+    """
     try:
-        return file.read_text(encoding="utf-8", errors="ignore")
+        return content_cache.read_text(file, encoding="utf-8", errors="ignore")
     except Exception:
         result = from_path(file).best()
         if result:
@@ -479,22 +446,14 @@ def read_file_with_encoding(file: Path) -> tuple[str, str, bytes]:
     This is useful when you need to write back to the file using the same encoding,
     and verify that the file actually changed at the byte level.
 
+    The encoding is detected once per run and file (see utils.encoding).
+
     Returns:
         tuple[str, str, bytes]: (content, encoding, original_bytes)
     """
-    from charset_normalizer import from_bytes
-
-    original_bytes = file.read_bytes()
-
-    # Use charset_normalizer to detect the actual encoding from bytes (no re-read)
-    result = from_bytes(original_bytes).best()
-    if result:
-        encoding = result.encoding
-        content = original_bytes.decode(encoding, errors="ignore")
-        return content, encoding, original_bytes
-
-    # Fallback to utf-8 with error handling
-    return original_bytes.decode("utf-8", errors="ignore"), "utf-8", original_bytes
+    original_bytes = content_cache.read_bytes(file)
+    encoding = content_cache.encoding(file)
+    return original_bytes.decode(encoding, errors="ignore"), encoding, original_bytes
 
 
 def write_file_if_changed(
@@ -510,7 +469,12 @@ def write_file_if_changed(
     new_bytes = content.encode(encoding, errors="ignore")
     if new_bytes == original_bytes:
         return False
+    recording = change_set.active()
+    if recording is not None:
+        recording.write_bytes(file, new_bytes, encoding)
+        return True
     file.write_bytes(new_bytes)
+    content_cache.invalidate(file)
     return True
 
 
@@ -0,0 +1,151 @@
+# Shared cache for parsed XML trees and compiled XPath expressions
+import io
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from lxml import etree
+
+from utils import perf
+from utils.file_cache import content_cache
+
+# Upper limit for the estimated memory of the cached trees, in MiB. It can be
+# changed with the environment variable below or the analyzer's --xml-cache-mb.
+DEFAULT_MAX_MB = 512
+MAX_MB_ENV = "AS6_XML_CACHE_MB"
+
+# Rough memory of a parsed lxml tree: the text of the source is kept several
+# times over (names, attribute values, text nodes), plus a fixed cost per element
+_BYTES_PER_SOURCE_BYTE = 4
+_BYTES_PER_ELEMENT = 400
+
+
+def _estimate_size(tree: etree._ElementTree, source_size: int) -> int:
+    elements = sum(1 for _ in tree.getroot().iter())
+    return source_size * _BYTES_PER_SOURCE_BYTE + elements * _BYTES_PER_ELEMENT
+
+
+def _configured_max_bytes() -> int:
+    try:
+        max_mb = float(os.environ.get(MAX_MB_ENV, DEFAULT_MAX_MB))
+    except ValueError:
+        max_mb = DEFAULT_MAX_MB
+    return int(max_mb * 1024 * 1024)
+
+
+class XmlTreeCache:
+    """
+    Parses every XML file at most once per run and hands out the same tree to
+    all checks. The returned trees are shared and must be treated as read-only.
+
+    Entries are keyed by path and parser, validated against size and mtime of
+    the file and evicted least recently used once the estimated memory of the
+    cached trees exceeds max_bytes. Files that fail to parse are cached as well
+    and raise an equal error again.
+    """
+
+    def __init__(self, max_bytes: int | None = None):
+        if max_bytes is None:
+            max_bytes = _configured_max_bytes()
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def parse(self, path: Path, parser: etree.XMLParser | None = None):
+        """
+        Return the parsed etree.ElementTree for a file, like etree.parse(path, parser).
+        """
+        st = os.stat(path)
+        stamp = (st.st_size, st.st_mtime_ns)
+        key = (os.fspath(path), id(parser))
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                result = entry[2]
+            else:
+                result = None
+
+        if result is None:
+            data = content_cache.read_bytes(path)
+            perf.count_xml_parse()
+            try:
+                result = etree.parse(io.BytesIO(data), parser, base_url=str(path))
+                cost = _estimate_size(result, len(data))
+            except etree.XMLSyntaxError as e:
+                # Only the details are kept; every caller gets an error of its own
+                result = (e.msg, e.code, *e.position, e.filename)
+                cost = len(data)
+            self._put(key, stamp, parser, result, cost)
+
+        if isinstance(result, tuple):
+            raise etree.XMLSyntaxError(*result)
+        return result
+
+    def _put(self, key, stamp, parser, result, cost: int) -> None:
+        if cost > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old[3]
+            # Keep a reference to the parser so its id cannot be reused while cached
+            self._entries[key] = (stamp, parser, result, cost)
+            self._size += cost
+            while self._size > self.max_bytes:
+                _, oldest = self._entries.popitem(last=False)
+                self._size -= oldest[3]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+# Cache instance shared by all checks of the current process
+xml_cache = XmlTreeCache()
+
+
+def add_arguments(parser) -> None:
+    """Adds the --xml-cache-mb option to an argparse parser."""
+    parser.add_argument(
+        "--xml-cache-mb",
+        type=float,
+        default=None,
+        metavar="MB",
+        help="Memory limit for the parsed XML files kept during a run, in MiB "
+        f"(default: {DEFAULT_MAX_MB}, or the {MAX_MB_ENV} environment variable).",
+    )
+
+
+def configure(args) -> None:
+    """
+    Applies --xml-cache-mb to the shared cache. The limit is passed on through
+    the environment, so the workers of a process executor use it as well.
+    """
+    if args.xml_cache_mb is None:
+        return
+    os.environ[MAX_MB_ENV] = str(args.xml_cache_mb)
+    xml_cache.max_bytes = _configured_max_bytes()
+
+
+_xpath_registry = threading.local()
+
+
+def xpath(expression: str, namespaces: dict | None = None) -> etree.XPath:
+    """
+    Return a compiled etree.XPath for the expression, compiled once per thread.
+    """
+    registry = getattr(_xpath_registry, "compiled", None)
+    if registry is None:
+        registry = _xpath_registry.compiled = {}
+
+    key = (expression, tuple(sorted((namespaces or {}).items())))
+    compiled = registry.get(key)
+    if compiled is None:
+        compiled = etree.XPath(expression, namespaces=namespaces)
+        registry[key] = compiled
+    return compiled